@@ -0,0 +1,153 @@
+# aggregates.py
+# Building- and floor-level aggregates maintained incrementally per reading
+#
+# Every zone contributes its latest reading to its building and to its
+# floor within the building. A new reading replaces the zone's previous
+# contribution (subtract old, add new), so sums, averages and HVAC mode
+# counts cost O(1) per reading however many zones a building has. The
+# worst (highest) CO2 only needs a rescan of the group when its current
+# holder improves, and that rescan is deferred until someone reads it.
+
+import math
+import threading
+from collections import Counter
+
+# Aggregated field -> reading key
+FIELDS = {
+    'temperature': 'temperature_celsius',
+    'humidity': 'humidity_percent',
+    'co2': 'co2_ppm'
+}
+UNKNOWN_BUILDING = "unknown"
+
+
+def _number(value):
+    """A reading value as a finite float (None stays None); raises ValueError/TypeError"""
+    if value is None:
+        return None
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"not a finite number: {value}")
+    return value
+
+
+class GroupAggregate:
+    """Running aggregate over the latest readings of a set of zones"""
+
+    __slots__ = ('members', 'counts', 'sums', 'hvac_status', 'co2_max', 'co2_max_zone', 'stale')
+
+    def __init__(self):
+        self.members = {}    # zone -> (values, hvac status) it contributes
+        self.counts = dict.fromkeys(FIELDS, 0)
+        self.sums = dict.fromkeys(FIELDS, 0.0)
+        self.hvac_status = Counter()
+        self.co2_max = None
+        self.co2_max_zone = None
+        self.stale = False   # co2_max needs a rescan
+
+    def add(self, zone_id, values, status):
+        """Add a zone's contribution (``values`` already converted by ``_number``)"""
+        for field, value in values.items():
+            if value is not None:
+                self.counts[field] += 1
+                self.sums[field] += value
+        self.members[zone_id] = (values, status)
+        if status:
+            self.hvac_status[status] += 1
+        co2 = values.get('co2')
+        if co2 is None:
+            return
+        if self.stale:
+            if zone_id == self.co2_max_zone and co2 >= self.co2_max:
+                self.co2_max, self.stale = co2, False  # The worst zone got worse
+        elif self.co2_max is None or co2 > self.co2_max:
+            self.co2_max, self.co2_max_zone = co2, zone_id
+
+    def remove(self, zone_id):
+        values, status = self.members.pop(zone_id)
+        for field, value in values.items():
+            if value is not None:
+                self.counts[field] -= 1
+                self.sums[field] -= value
+        if status:
+            self.hvac_status[status] -= 1
+            if not self.hvac_status[status]:
+                del self.hvac_status[status]
+        if zone_id == self.co2_max_zone:
+            self.stale = True
+
+    def _rescan(self):
+        self.co2_max = self.co2_max_zone = None
+        for zone_id, (values, _) in self.members.items():
+            co2 = values.get('co2')
+            if co2 is not None and (self.co2_max is None or co2 > self.co2_max):
+                self.co2_max, self.co2_max_zone = co2, zone_id
+        self.stale = False
+
+    def to_dict(self):
+        if self.stale:
+            self._rescan()
+        result = {'zones': len(self.members)}
+        for field in FIELDS:
+            count = self.counts[field]
+            result[field + '_avg'] = round(self.sums[field] / count, 2) if count else None
+        result['co2_max'] = self.co2_max
+        result['co2_max_zone'] = self.co2_max_zone
+        result['hvac_status'] = dict(self.hvac_status)
+        return result
+
+    def __len__(self):
+        return len(self.members)
+
+
+class AggregateEngine:
+    """Per-building and per-floor aggregates of the zones' latest readings
+
+    ``record`` is called once per reading with the zone's registry entry
+    (for building and floor); ``snapshot`` returns the aggregates for
+    ``/api/aggregates`` and the ``aggregates`` Socket.IO channel.
+    ``version`` changes whenever a reading has been recorded. A reading
+    with a non-numeric value raises before any aggregate is changed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.groups = {}     # (building, floor or None) -> GroupAggregate
+        self.placement = {}  # zone -> [group keys it contributes to]
+        self.version = 0
+
+    def record(self, zone_id, data, info=None):
+        building = data.get('building_id') or (info and info.building_id) or UNKNOWN_BUILDING
+        floor = data.get('floor', info.floor if info else None)
+        keys = [(building, None)]
+        if floor is not None:
+            keys.append((building, floor))
+        # Convert and check everything before touching the groups
+        values = {field: _number(data.get(key)) for field, key in FIELDS.items()}
+        status = data.get('hvac_status') or None
+        if status is not None and not isinstance(status, str):
+            raise TypeError(f"hvac_status must be a string, not {type(status).__name__}")
+
+        with self.lock:
+            for key in self.placement.get(zone_id, ()):
+                group = self.groups[key]
+                group.remove(zone_id)
+                if not group:
+                    del self.groups[key]
+            for key in keys:
+                group = self.groups.get(key)
+                if group is None:
+                    group = self.groups[key] = GroupAggregate()
+                group.add(zone_id, values, status)
+            self.placement[zone_id] = keys
+            self.version += 1
+
+    def snapshot(self):
+        """``{'version', 'buildings': {building: {..., 'floors': {floor: {...}}}}}``"""
+        with self.lock:
+            buildings = {building: dict(group.to_dict(), floors={})
+                         for (building, floor), group in self.groups.items() if floor is None}
+            for (building, floor), group in self.groups.items():
+                if floor is not None:
+                    buildings[building]['floors'][str(floor)] = group.to_dict()
+            return {'version': self.version, 'buildings': buildings}
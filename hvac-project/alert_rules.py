@@ -0,0 +1,173 @@
+# alert_rules.py
+# Declarative alert rules with per-zone thresholds, hysteresis and suppression
+
+import json
+import operator
+import os
+import threading
+from datetime import datetime
+
+from storage import to_epoch
+
+OPERATORS = {'>': operator.gt, '<': operator.lt}
+
+# Used when no rules file is configured (the original hard-coded thresholds)
+DEFAULT_RULES = {
+    "defaults": {"hysteresis": 0, "min_duration": 0, "suppress_seconds": 0},
+    "rules": [
+        {"id": "temperature_high", "field": "temperature_celsius", "op": ">", "threshold": 26,
+         "severity": "warning", "message": "High temperature: {value}°C"},
+        {"id": "temperature_low", "field": "temperature_celsius", "op": "<", "threshold": 18,
+         "severity": "warning", "message": "Low temperature: {value}°C"},
+        {"id": "co2_high", "field": "co2_ppm", "op": ">", "threshold": 1000,
+         "severity": "critical", "message": "High CO₂ levels: {value} PPM"},
+        {"id": "humidity_high", "field": "humidity_percent", "op": ">", "threshold": 70,
+         "severity": "info", "message": "High humidity: {value}%"},
+        {"id": "humidity_low", "field": "humidity_percent", "op": "<", "threshold": 30,
+         "severity": "info", "message": "Low humidity: {value}%"}
+    ],
+    "zones": {}
+}
+
+
+class Rule:
+    """A compiled rule as it applies to one zone"""
+
+    __slots__ = ('id', 'kind', 'field', 'op', 'compare', 'threshold', 'clear_at',
+                 'min_duration', 'suppress_seconds', 'severity', 'message')
+
+    def __init__(self, spec):
+        self.id = spec['id']
+        self.kind = spec.get('type', 'threshold')  # "threshold" or "rate" (per minute)
+        self.field = spec['field']
+        self.op = spec['op']
+        self.compare = OPERATORS[self.op]
+        self.threshold = spec['threshold']
+        hysteresis = spec.get('hysteresis', 0)
+        # Once active, a rule clears only after moving back past the hysteresis band
+        self.clear_at = self.threshold - hysteresis if self.op == '>' else self.threshold + hysteresis
+        self.min_duration = spec.get('min_duration', 0)
+        self.suppress_seconds = spec.get('suppress_seconds', 0)
+        self.severity = spec.get('severity', 'warning')
+        self.message = spec.get('message', self.id + ': {value}')
+
+
+class RuleState:
+    """Per (zone, rule) evaluation state"""
+
+    __slots__ = ('active', 'since', 'last_fired')
+
+    def __init__(self):
+        self.active = False
+        self.since = None       # when the condition started holding
+        self.last_fired = None
+
+
+def load_rules(path=None):
+    """Load a rules config (JSON) or fall back to DEFAULT_RULES"""
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return DEFAULT_RULES
+
+
+class AlertRuleEngine:
+    """Evaluate alert rules over batches of readings
+
+    Rules are resolved per zone once (global rules merged with that zone's
+    overrides) and cached, so a reading is only checked against the rules
+    that apply to its zone, however many zones the config covers.
+    """
+
+    def __init__(self, config=None):
+        self.lock = threading.Lock()  # Ingestion workers share the rule state
+        self.configure(config or DEFAULT_RULES)
+
+    def configure(self, config):
+        with self.lock:
+            self.defaults = config.get('defaults', {})
+            self.rules = config.get('rules', [])
+            self.zone_overrides = config.get('zones', {})
+            self.compiled = {}       # zone -> [Rule]
+            self.state = {}          # (zone, rule id) -> RuleState
+            self.previous = {}       # zone -> (epoch, reading) for rate rules
+
+    def rules_for(self, zone_id):
+        """The compiled rules of a zone (e.g. for StreamingAnalytics)"""
+        with self.lock:
+            return self._rules_for(zone_id)
+
+    def _rules_for(self, zone_id):
+        rules = self.compiled.get(zone_id)
+        if rules is None:
+            overrides = self.zone_overrides.get(zone_id, {})
+            rules = []
+            for spec in self.rules + overrides.get('rules', []):
+                merged = dict(self.defaults)
+                merged.update(spec)
+                merged.update(overrides.get(spec['id'], {}))
+                if merged.get('enabled', True):
+                    rules.append(Rule(merged))
+            self.compiled[zone_id] = rules
+        return rules
+
+    def evaluate(self, readings):
+        """Return the alerts raised by a batch of readings (in order)"""
+        with self.lock:
+            return self._evaluate(readings)
+
+    def _evaluate(self, readings):
+        alerts = []
+        for data in readings:
+            zone_id = data['zone_id']
+            now = to_epoch(data['timestamp'])
+            previous = self.previous.get(zone_id)
+            self.previous[zone_id] = (now, data)
+
+            for rule in self._rules_for(zone_id):
+                value = data.get(rule.field)
+                if value is None:
+                    continue
+                if rule.kind == 'rate':
+                    if previous is None or now <= previous[0] or previous[1].get(rule.field) is None:
+                        continue
+                    value = (value - previous[1][rule.field]) * 60 / (now - previous[0])
+
+                alert = self._check(zone_id, rule, value, now)
+                if alert:
+                    alerts.append(alert)
+        return alerts
+
+    def _check(self, zone_id, rule, value, now):
+        key = (zone_id, rule.id)
+        state = self.state.get(key)
+        if state is None:
+            state = self.state[key] = RuleState()
+
+        if state.active:
+            if not rule.compare(value, rule.clear_at):
+                state.active = False
+                state.since = None
+            return None
+
+        if not rule.compare(value, rule.threshold):
+            state.since = None
+            return None
+
+        if state.since is None:
+            state.since = now
+        if now - state.since < rule.min_duration:
+            return None
+
+        state.active = True
+        if state.last_fired is not None and now - state.last_fired < rule.suppress_seconds:
+            return None
+        state.last_fired = now
+
+        return {
+            'type': rule.id,
+            'zone': zone_id,
+            'message': rule.message.format(value=round(value, 2), threshold=rule.threshold),
+            'severity': rule.severity,
+            'timestamp': datetime.now().isoformat()
+        }
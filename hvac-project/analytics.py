@@ -0,0 +1,203 @@
+# analytics.py
+# Streaming per-zone forecasting and anomaly detection (O(1) per reading)
+#
+# Each zone and field keeps a Holt linear-trend model (smoothed level and
+# trend per second) and an exponentially weighted variance of its one-step
+# forecast errors. That is enough to:
+#
+#   - project the trend forward and warn when a threshold rule is predicted
+#     to fire within the forecast horizon
+#   - flag readings that are far outside what the model expected (z-score)
+#
+# without keeping or re-scanning any history. Model state is column-wise
+# (one array per quantity, one slot per zone), like the live history rings.
+
+import math
+import threading
+from array import array
+from datetime import datetime
+
+from storage import to_epoch
+
+# Field -> (name, label, unit, noise floor for the forecast error stddev).
+# The floor keeps sensor rounding in a steady zone from looking anomalous.
+FIELDS = {
+    'temperature_celsius': ('temperature', 'Temperature', '°C', 0.2),
+    'humidity_percent': ('humidity', 'Humidity', '%', 1.0),
+    'co2_ppm': ('co2', 'CO₂', ' PPM', 15.0),
+}
+
+
+class FieldModel:
+    """Holt level/trend and forecast-error variance of one field for every zone"""
+
+    __slots__ = ('field', 'alpha', 'beta', 'gamma', 'floor',
+                 'count', 'level', 'trend', 'variance')
+
+    def __init__(self, field, alpha, beta, gamma, floor):
+        self.field = field
+        self.alpha = alpha   # level smoothing
+        self.beta = beta     # trend smoothing
+        self.gamma = gamma   # error variance smoothing
+        self.floor = floor
+        self.count = array('I')
+        self.level = array('d')
+        self.trend = array('d')     # units per second
+        self.variance = array('d')
+
+    def add_zone(self):
+        self.count.append(0)
+        self.level.append(0.0)
+        self.trend.append(0.0)
+        self.variance.append(0.0)
+
+    def update(self, i, value, dt):
+        """Feed one reading; returns its z-score against the forecast (None while unseeded)"""
+        count = self.count[i]
+        self.count[i] = count + 1
+        if count == 0:
+            self.level[i] = value
+            return None
+
+        level, trend = self.level[i], self.trend[i]
+        expected = level + trend * dt
+        error = value - expected
+        stddev = max(math.sqrt(self.variance[i]), self.floor)
+
+        new_level = expected + self.alpha * error
+        self.level[i] = new_level
+        if dt > 0:
+            self.trend[i] = self.beta * (new_level - level) / dt + (1 - self.beta) * trend
+        self.variance[i] = (1 - self.gamma) * (self.variance[i] + self.gamma * error * error)
+        return error / stddev
+
+    def eta(self, i, threshold):
+        """Seconds until the trend reaches ``threshold`` (None if it is moving away)"""
+        trend = self.trend[i]
+        if trend == 0:
+            return None
+        seconds = (threshold - self.level[i]) / trend
+        return seconds if seconds > 0 else None
+
+
+class StreamingAnalytics:
+    """Forecast and anomaly alerts for batches of readings
+
+    ``rules_for(zone_id)`` gives the zone's compiled alert rules (see
+    AlertRuleEngine); its threshold rules are the levels forecasts are
+    checked against, so per-zone overrides apply to predictions too.
+    Alerts use the rule engine's format, fire once when the condition
+    starts and are not repeated for a zone within ``suppress_seconds``.
+    """
+
+    def __init__(self, rules_for, horizon=900, alpha=0.1, beta=0.01, gamma=0.05,
+                 z_threshold=4.0, warmup=20, min_duration=120, suppress_seconds=600):
+        self.rules_for = rules_for
+        self.lock = threading.Lock()  # Ingestion workers share the models
+        self.horizon = horizon
+        self.min_duration = min_duration
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.suppress_seconds = suppress_seconds
+        self.index = {}              # zone -> slot
+        self.last = array('d')       # epoch of each zone's last reading
+        self.models = [FieldModel(field, alpha, beta, gamma, floor)
+                       for field, (_, _, _, floor) in FIELDS.items()]
+        self.since = {}              # (zone, alert type) -> epoch the condition started
+        self.active = set()          # (zone, alert type) raised and still holding
+        self.last_fired = {}         # (zone, alert type) -> epoch
+
+    def slot(self, zone_id):
+        """Model slot of a zone, allocated on first use (call with ``lock`` held)"""
+        i = self.index.get(zone_id)
+        if i is None:
+            i = self.index[zone_id] = len(self.last)
+            self.last.append(0.0)
+            for model in self.models:
+                model.add_zone()
+        return i
+
+    def update(self, readings):
+        """Update the models with a batch of readings; returns the alerts raised"""
+        with self.lock:
+            return self._update(readings)
+
+    def _update(self, readings):
+        alerts = []
+        for data in readings:
+            zone_id = data['zone_id']
+            now = to_epoch(data['timestamp'])
+            i = self.slot(zone_id)
+            if now < self.last[i]:
+                continue  # Late reading, the models have moved past it
+            dt = now - self.last[i] if self.last[i] else 0.0
+            self.last[i] = now
+
+            for model in self.models:
+                value = data.get(model.field)
+                if value is None:
+                    continue
+                z = model.update(i, value, dt)
+                if z is None or model.count[i] <= self.warmup:
+                    continue
+                self._check_anomaly(alerts, zone_id, model, value, z, now)
+                self._check_forecast(alerts, zone_id, i, model, value, now)
+        return alerts
+
+    def _check_anomaly(self, alerts, zone_id, model, value, z, now):
+        name, label, unit, _ = FIELDS[model.field]
+        if self._starts(zone_id, name + '_anomaly', abs(z) >= self.z_threshold, now):
+            alerts.append(self._alert(
+                name + '_anomaly', zone_id, 'warning',
+                f"{label} anomaly: {round(value, 2)}{unit} ({abs(z):.1f}σ from forecast)"))
+
+    def _check_forecast(self, alerts, zone_id, i, model, value, now):
+        _, label, unit, _ = FIELDS[model.field]
+        for rule in self.rules_for(zone_id):
+            if rule.kind != 'threshold' or rule.field != model.field:
+                continue
+            eta = None
+            if not rule.compare(value, rule.threshold):  # Once breached the rule itself alerts
+                eta = model.eta(i, rule.threshold)
+            key = (zone_id, 'predicted_' + rule.id)
+            if key in self.active:
+                predicted = eta is not None and eta <= 2 * self.horizon  # Hysteresis
+            else:
+                predicted = eta is not None and eta <= self.horizon
+            if self._starts(zone_id, 'predicted_' + rule.id, predicted, now, self.min_duration):
+                alerts.append(self._alert(
+                    'predicted_' + rule.id, zone_id, rule.severity,
+                    f"{label} predicted to reach {rule.threshold}{unit} in {max(1, round(eta / 60))} min"))
+
+    def _starts(self, zone_id, kind, holding, now, min_duration=0):
+        """Track whether a condition holds; True when it is to be raised
+
+        That is once it has held for ``min_duration`` seconds, unless the
+        same alert was raised for the zone within ``suppress_seconds``.
+        """
+        key = (zone_id, kind)
+        if not holding:
+            self.since.pop(key, None)
+            self.active.discard(key)
+            return False
+        if key in self.active:
+            return False
+        since = self.since.setdefault(key, now)
+        if now - since < min_duration:
+            return False
+        self.active.add(key)
+        last = self.last_fired.get(key)
+        if last is not None and now - last < self.suppress_seconds:
+            return False
+        self.last_fired[key] = now
+        return True
+
+    @staticmethod
+    def _alert(kind, zone_id, severity, message):
+        return {
+            'type': kind,
+            'zone': zone_id,
+            'message': message,
+            'severity': severity,
+            'timestamp': datetime.now().isoformat()
+        }
@@ -1,300 +1,274 @@
 # app.py
 # Flask Dashboard for HVAC AWS IoT System
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response
 from flask_socketio import SocketIO, emit
 import json
-import ssl
-import paho.mqtt.client as mqtt
-from datetime import datetime, timedelta
+import os
 import threading
 import time
-from collections import defaultdict, deque
 from aws_config import *
+from broadcaster import DeltaBroadcaster
+from ingestion import create_pipeline
+from transport import create_mqtt_client, broker_address, ReconnectBackoff
+from dashboard_core import DashboardCore
+from hvac_logging import configure_logging, get_logger
+from cluster import StatePublisher, StatsReplica, STATE_TOPIC, request_sync
+import metrics
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'hvac-dashboard-secret-key'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-class HVACDashboard:
+configure_logging(LOG_LEVEL, LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_INTERVAL)
+log = get_logger("dashboard")
+
+class HVACDashboard(DashboardCore):
     def __init__(self):
         self.mqtt_client = None
-        self.connected = False
-        self.sensor_data = defaultdict(lambda: {
-            'latest': None,
-            'history': deque(maxlen=50)  # Keep last 50 readings
-        })
-        self.alerts = deque(maxlen=20)  # Keep last 20 alerts
-        self.zones = ["lobby", "office_floor_1", "office_floor_2", "conference_room"]
+        self.started = False
+        self.start_lock = threading.Lock()
+        super().__init__(DeltaBroadcaster(socketio, BROADCAST_INTERVAL))
         
-        # Statistics
-        self.stats = {
-            'total_messages': 0,
-            'connected_zones': 0,
-            'active_alerts': 0,
-            'last_update': None
-        }
-        
-        self.setup_mqtt_client()
-        self.start_mqtt_connection()
+        self.pipeline = None  # Created by start()
     
-    def setup_mqtt_client(self):
-        """Setup MQTT client for receiving data"""
-        try:
-            # Use callback_api_version=2 to fix deprecation warning
-            self.mqtt_client = mqtt.Client(
-                client_id="hvac-dashboard-receiver",  # Different client ID
-                callback_api_version=mqtt.CallbackAPIVersion.VERSION2
-            )
+    def start(self):
+        """Open storage, start ingestion and connect to MQTT (once, on the first request or at launch)
+
+        Nothing touches the disk, the network or the TLS certificates before
+        this and no threads are started, so importing ``app`` has no side
+        effects beyond restoring the checkpoint. Concurrent callers wait
+        until the dashboard is fully started.
+        """
+        with self.start_lock:
+            if self.started:
+                return
+            self.open_resources()
             
-            # Setup SSL/TLS
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_REQUIRED
+            # Decouple the MQTT network thread from message processing
+            self.pipeline = create_pipeline(self.process_batch,
+                                            workers=INGEST_WORKERS,
+                                            max_size=INGEST_QUEUE_SIZE,
+                                            batch_size=INGEST_BATCH_SIZE,
+                                            policy=INGEST_BACKPRESSURE,
+                                            spill_path=INGEST_SPILL_PATH)
+            metrics.REGISTRY.register(metrics.Gauge(
+                "hvac_ingest_queue_depth", "Messages waiting in the ingestion queue",
+                function=lambda: self.pipeline.get_stats()['queue_depth']))
+            metrics.REGISTRY.register(metrics.Gauge(
+                "hvac_ingest_dropped", "Messages dropped by the ingestion backpressure policy",
+                function=lambda: self.pipeline.dropped))
             
-            # Load certificates
-            context.load_verify_locations(ROOT_CA)
-            context.load_cert_chain(DEVICE_CERT, PRIVATE_KEY)
+            self.broadcaster.start()
+            self.start_checkpoints()
             
-            self.mqtt_client.tls_set_context(context)
+            # Multi-process mode: share processed batches with the web workers
+            if DASHBOARD_ROLE == "ingest":
+                self.state_publisher = StatePublisher(self.get_all_data)
+            
+            if self.setup_mqtt_client():
+                self.start_mqtt_connection()
+            self.started = True
+    
+    def create_client(self):
+        # Different client ID; a persistent session keeps QoS 1 readings queued at the broker while we're away
+        return create_mqtt_client("hvac-dashboard-receiver", clean_session=not MQTT_PERSISTENT_SESSION)
+    
+    def mqtt_address(self):
+        return broker_address()
+    
+    def subscription_topics(self):
+        # One wildcard subscription covers every zone, including new ones,
+        # and another every gateway publishing batched readings
+        return [f"{MQTT_TOPICS['sensors']}/+", f"{MQTT_TOPICS['batches']}/+"]
+    
+    def ingestion_stats(self):
+        return self.pipeline.get_stats() if self.pipeline is not None else {}
+    
+    def setup_mqtt_client(self):
+        """Setup MQTT client for receiving data"""
+        try:
+            # TLS (AWS) or plain TCP (local broker) depending on MQTT_TRANSPORT
+            self.mqtt_client = self.create_client()
             
             # Setup callbacks
             self.mqtt_client.on_connect = self.on_connect
             self.mqtt_client.on_message = self.on_message
             self.mqtt_client.on_disconnect = self.on_disconnect
+            self.mqtt_client.on_connect_fail = self.on_connect_fail
             self.mqtt_client.on_log = self.on_log  # Add logging
+            self.backoff = ReconnectBackoff(self.mqtt_client)
             
             return True
             
         except Exception as e:
-            print(f"❌ Error setting up MQTT client: {e}")
+            log.error("❌ Error setting up MQTT client: %s", e)
             return False
     
     def on_connect(self, client, userdata, flags, rc, properties=None):
         """MQTT connection callback"""
         if rc == 0:
             self.connected = True
-            print("✅ Dashboard connected to AWS IoT Core!")
+            metrics.MQTT_CONNECTS.inc("dashboard")
+            if self.has_connected:
+                metrics.MQTT_RECONNECTS.inc("dashboard")
+            self.has_connected = True
+            self.backoff.reset()
+            log.info("✅ Dashboard connected to MQTT broker%s",
+                     " (session resumed)" if flags.session_present else "")
             
-            # Subscribe to all sensor topics
-            for zone in self.zones:
-                topic = f"{MQTT_TOPICS['sensors']}/{zone}"
-                client.subscribe(topic)
-                print(f"📡 Subscribed to: {topic}")
+            # QoS 1 so a persistent session queues readings during a disconnect
+            topics = self.subscription_topics()
+            client.subscribe([(topic, 1) for topic in topics])
+            log.info("📡 Subscribed to: %s", ", ".join(topics))
             
             # Emit connection status to web clients
+            self.snapshots.invalidate()
+            self.publish_state({'connected': True})
             socketio.emit('connection_status', {'connected': True})
             
         else:
-            print(f"❌ Dashboard connection failed: {rc}")
+            log.error("❌ Dashboard connection failed: %s (retrying in %.1f seconds)",
+                      rc, self.backoff.failed())
             self.connected = False
+            self.snapshots.invalidate()
+            self.publish_state({'connected': False})
             socketio.emit('connection_status', {'connected': False})
     
     def on_disconnect(self, client, userdata, rc, reason_code=None, properties=None):
         """MQTT disconnect callback"""
         self.connected = False
-        print("🔌 Dashboard disconnected from AWS IoT Core")
-        if reason_code:
-            print(f"📋 Disconnect reason: {reason_code}")
+        metrics.MQTT_DISCONNECTS.inc("dashboard")
+        log.warning("🔌 Dashboard disconnected from MQTT broker (reason: %s), reconnecting in %.1f seconds",
+                    reason_code, self.backoff.failed())
+        self.snapshots.invalidate()
+        self.publish_state({'connected': False})
         socketio.emit('connection_status', {'connected': False})
     
+    def on_connect_fail(self, client, userdata):
+        """The broker could not be reached; paho retries after the backoff delay"""
+        log.warning("⏳ Dashboard could not reach the MQTT broker, retrying in %.1f seconds",
+                    self.backoff.failed())
+    
     def on_log(self, client, userdata, level, buf):
         """Log callback for debugging"""
         if "error" in buf.lower() or "failed" in buf.lower():
-            print(f"🔍 MQTT Log: {buf}")
+            log.warning("🔍 MQTT Log: %s", buf)
     
     def on_message(self, client, userdata, msg):
-        """Handle incoming sensor data"""
-        try:
-            # Parse message
-            topic = msg.topic
-            payload = msg.payload.decode()
-            print(f"🔔 Received message on topic: {topic}")
-            print(f"📦 Payload: {payload[:100]}...")  # First 100 chars
-            
-            data = json.loads(payload)
-            zone_id = data.get('zone_id')
-            
-            if zone_id:
-                # Store latest data
-                self.sensor_data[zone_id]['latest'] = data
-                self.sensor_data[zone_id]['history'].append({
-                    'timestamp': data['timestamp'],
-                    'temperature': data['temperature_celsius'],
-                    'humidity': data['humidity_percent'],
-                    'co2': data['co2_ppm']
-                })
-                
-                # Update statistics
-                self.stats['total_messages'] += 1
-                self.stats['last_update'] = datetime.now().isoformat()
-                self.stats['connected_zones'] = len([z for z in self.zones 
-                                                   if self.sensor_data[z]['latest']])
-                
-                # Check for alerts
-                self.check_alerts(data)
-                
-                # Emit to web clients
+        """Hand incoming messages to the ingestion pipeline (MQTT network thread)"""
+        if self.recorder is not None:
+            self.recorder.record(msg.topic, msg.payload, time.time())
+        self.pipeline.submit(msg.topic, msg.payload)
+    
+    def start_mqtt_connection(self):
+        """Connect in the background; paho's network thread reconnects on its own"""
+        host, port = self.mqtt_address()
+        self.mqtt_client.connect_async(host, port, 60)
+        self.mqtt_client.loop_start()
+
+
+class ReplicaDashboard(HVACDashboard):
+    """Web worker of a multi-process deployment (HVAC_ROLE=web)
+
+    Instead of subscribing to the sensors it mirrors the live state that
+    the ingestion process publishes on the state bus, and serves its own
+    Socket.IO clients from that copy.
+    """
+    
+    checkpoints = False  # The ingestion process owns the state
+    
+    def __init__(self):
+        self.source_connected = False
+        self.source_ingestion = {}
+        super().__init__()
+    
+    def create_stats_engine(self):
+        return StatsReplica()
+    
+    def open_resources(self):
+        """Nothing to open: the ingestion process owns the store and the recording"""
+    
+    def create_client(self):
+        return create_mqtt_client(f"hvac-dashboard-web-{os.getpid()}", STATE_BUS_TRANSPORT)
+    
+    def mqtt_address(self):
+        return broker_address(STATE_BUS_TRANSPORT)
+    
+    def subscription_topics(self):
+        return [STATE_TOPIC]
+    
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        super().on_connect(client, userdata, flags, rc, properties)
+        if rc == 0:
+            request_sync(client)  # Catch up on everything published before we joined
+    
+    def process_batch(self, batch):
+        """Apply state updates from the ingestion process (ingestion worker thread)"""
+        with metrics.BATCH_SECONDS.time():
+            for topic, payload, received_at in batch:
                 try:
-                    socketio.emit('sensor_update', {
-                        'zone': zone_id,
-                        'data': data,
-                        'stats': self.stats
-                    })
-                    print(f"✅ Emitted data to web clients for zone: {zone_id}")
-                except Exception as emit_error:
-                    print(f"❌ Error emitting to web: {emit_error}")
-                
-                print(f"📨 Received data from {zone_id}: "
-                      f"🌡️{data['temperature_celsius']}°C "
-                      f"💧{data['humidity_percent']}% "
-                      f"🫁{data['co2_ppm']}ppm")
-            else:
-                print(f"⚠️ No zone_id in message: {data}")
-                
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON decode error: {e}")
-            print(f"Raw payload: {msg.payload}")
-        except Exception as e:
-            print(f"❌ Error processing message: {e}")
-            print(f"Topic: {msg.topic}")
-            print(f"Payload: {msg.payload}")
+                    update = json.loads(payload)
+                except ValueError as e:
+                    metrics.INVALID_MESSAGES.inc()
+                    log.warning("❌ Invalid state update on %s: %s", topic, e)
+                    continue
+                self.apply_update(update, received_at)
     
-    def check_alerts(self, data):
-        """Check for alert conditions"""
-        alerts = []
-        zone_id = data['zone_id']
-        
-        # Temperature alerts
-        if data['temperature_celsius'] > 26:
-            alerts.append({
-                'type': 'temperature_high',
-                'zone': zone_id,
-                'message': f'High temperature: {data["temperature_celsius"]}°C',
-                'severity': 'warning',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif data['temperature_celsius'] < 18:
-            alerts.append({
-                'type': 'temperature_low',
-                'zone': zone_id,
-                'message': f'Low temperature: {data["temperature_celsius"]}°C',
-                'severity': 'warning',
-                'timestamp': datetime.now().isoformat()
-            })
+    def apply_update(self, update, received_at=None):
+        zones = set()
+        if update.get('full'):
+            for zone_id, data in update.get('sensors', {}).items():
+                self.registry.add(zone_id)
+                self.sensor_data.replace(zone_id, data['latest'], data['history'])
+                if data['latest']:
+                    self.aggregates.record(zone_id, data['latest'], self.registry.get(zone_id))
+                    self.broadcaster.update(zone_id, data['latest'])
+                zones.add(zone_id)
+            self.alerts.replace(update.get('alerts', []))
         
-        # CO2 alerts
-        if data['co2_ppm'] > 1000:
-            alerts.append({
-                'type': 'co2_high',
-                'zone': zone_id,
-                'message': f'High CO₂ levels: {data["co2_ppm"]} PPM',
-                'severity': 'critical',
-                'timestamp': datetime.now().isoformat()
-            })
+        for data in update.get('readings', []):
+            zone_id = data['zone_id']
+            self.sensor_data.record(zone_id, data)
+            if self.registry.observe(zone_id, data):
+                log.info("🆕 New zone registered: %s", zone_id)
+            self.aggregates.record(zone_id, data, self.registry.get(zone_id))
+            self.broadcaster.update(zone_id, data, received_at)
+            zones.add(zone_id)
         
-        # Humidity alerts
-        if data['humidity_percent'] > 70:
-            alerts.append({
-                'type': 'humidity_high',
-                'zone': zone_id,
-                'message': f'High humidity: {data["humidity_percent"]}%',
-                'severity': 'info',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif data['humidity_percent'] < 30:
-            alerts.append({
-                'type': 'humidity_low',
-                'zone': zone_id,
-                'message': f'Low humidity: {data["humidity_percent"]}%',
-                'severity': 'info',
-                'timestamp': datetime.now().isoformat()
-            })
+        if not update.get('full'):
+            for alert in update.get('alerts', []):
+                self.alerts.append(alert)
+                self.broadcaster.add_alert(alert)
         
-        # Add alerts and emit to clients
-        for alert in alerts:
-            self.alerts.append(alert)
-            socketio.emit('new_alert', alert)
+        self.stats_engine.apply(update)
+        if 'stats' in update:
+            self.broadcaster.update_stats(self.stats)
+        if 'ingestion' in update:
+            self.source_ingestion = update['ingestion']
+        if 'connected' in update and update['connected'] != self.source_connected:
+            self.source_connected = update['connected']
+            socketio.emit('connection_status', {'connected': self.source_connected})
         
-        # Update active alerts count
-        recent_alerts = [a for a in self.alerts 
-                        if datetime.fromisoformat(a['timestamp']) > 
-                        datetime.now() - timedelta(minutes=10)]
-        self.stats['active_alerts'] = len(recent_alerts)
+        if zones:
+            self.snapshots.mark_zones(zones)
+        else:
+            self.snapshots.invalidate()
     
-    def start_mqtt_connection(self):
-        """Start MQTT connection in background thread"""
-        def connect_loop():
-            retry_count = 0
-            max_retries = 3  # Reduced retries
-            
-            while True:
-                try:
-                    if not self.connected and retry_count < max_retries:
-                        print(f"🔄 Dashboard connecting to AWS IoT... (Attempt {retry_count + 1}/{max_retries})")
-                        
-                        # Stop any existing loop
-                        try:
-                            self.mqtt_client.loop_stop()
-                        except:
-                            pass
-                        
-                        # Fresh connection
-                        self.mqtt_client.connect(AWS_IOT_ENDPOINT, MQTT_PORT, 60)
-                        self.mqtt_client.loop_start()
-                        
-                        # Wait for connection result
-                        timeout = 15
-                        while not self.connected and timeout > 0:
-                            time.sleep(1)
-                            timeout -= 1
-                        
-                        if self.connected:
-                            print("🎉 Dashboard connected successfully!")
-                            retry_count = 0  # Reset retry count on successful connection
-                            time.sleep(60)   # Check connection every 60 seconds
-                        else:
-                            retry_count += 1
-                            wait_time = 10 * retry_count
-                            print(f"⏳ Dashboard connection failed, waiting {wait_time} seconds...")
-                            time.sleep(wait_time)
-                            
-                    elif self.connected:
-                        time.sleep(60)  # Check connection every 60 seconds
-                        retry_count = 0  # Reset retry count when connected
-                        
-                    else:
-                        # Max retries reached, wait longer before trying again
-                        print(f"⚠️ Dashboard max retries reached. Waiting 120 seconds...")
-                        time.sleep(120)
-                        retry_count = 0  # Reset retry count for next cycle
-                        
-                except Exception as e:
-                    print(f"❌ Dashboard connection error: {e}")
-                    time.sleep(30)
-        
-        thread = threading.Thread(target=connect_loop, daemon=True)
-        thread.start()
+    def ingestion_stats(self):
+        return self.source_ingestion
     
-    def get_all_data(self):
-        """Get all current sensor data"""
-        # Convert deques to lists for JSON serialization
-        sensors_data = {}
-        for zone, data in self.sensor_data.items():
-            sensors_data[zone] = {
-                'latest': data['latest'],
-                'history': list(data['history'])  # Convert deque to list
-            }
-        
-        return {
-            'sensors': sensors_data,
-            'alerts': list(self.alerts),  # Convert deque to list
-            'stats': self.stats,
-            'connected': self.connected
-        }
+    def snapshot_globals(self):
+        data = super().snapshot_globals()
+        data['connected'] = self.connected and self.source_connected
+        return data
 
-# Initialize dashboard
-dashboard = HVACDashboard()
+# Initialize dashboard (restores the checkpoint; MQTT starts with the first request)
+dashboard = ReplicaDashboard() if DASHBOARD_ROLE == "web" else HVACDashboard()
+
+@app.before_request
+def start_dashboard():
+    dashboard.start()
 
 @app.route('/')
 def index():
@@ -303,42 +277,98 @@ def index():
 
 @app.route('/api/data')
 def get_data():
-    """API endpoint for all data"""
-    return jsonify(dashboard.get_all_data())
+    """API endpoint for all data (served from the snapshot cache, supports If-None-Match)"""
+    version, body = dashboard.get_snapshot()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(dashboard.snapshots.etag(version))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics endpoint"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/zones')
 def get_zones():
-    """API endpoint for zones list"""
-    return jsonify(dashboard.zones)
+    """API endpoint for zones list (with metadata)"""
+    return jsonify(dashboard.registry.to_list())
+
+@app.route('/api/aggregates')
+def get_aggregates():
+    """API endpoint for building- and floor-level aggregates"""
+    return jsonify(dashboard.aggregates.snapshot())
 
 @app.route('/api/history/<zone>')
 def get_zone_history(zone):
-    """API endpoint for zone history"""
-    if zone in dashboard.sensor_data:
-        return jsonify(list(dashboard.sensor_data[zone]['history']))
-    return jsonify([])
+    """API endpoint for zone history
+
+    Without query parameters returns the live in-memory history. With
+    ``start``/``end`` (ISO or epoch), ``resolution`` (raw, 1m, 15m, 1h or
+    auto) and ``fields`` (comma separated) it queries the persistent store.
+    """
+    body, status, resolution = dashboard.query_history(zone, request.args)
+    response = jsonify(body)
+    response.status_code = status
+    if resolution:
+        response.headers['X-History-Resolution'] = resolution
+    return response
 
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     """Handle new client connection"""
-    print("🔌 New client connected to dashboard")
-    emit('initial_data', dashboard.get_all_data())
+    dashboard.start()
+    log.info("🔌 New client connected to dashboard")
+    if (auth or {}).get('view') == 'aggregates':
+        # Overview screens: aggregates only, no per-zone data
+        dashboard.broadcaster.subscribe_aggregates(request.sid, exclusive=True)
+        emit('aggregates', dashboard.aggregates.snapshot())
+        return
+    # Until the client subscribes to specific zones it receives all of them
+    dashboard.broadcaster.subscribe(request.sid)
+    emit('initial_data', dashboard.get_snapshot()[1])  # Pre-encoded JSON text
 
 @socketio.on('disconnect')
-def handle_disconnect():
+def handle_disconnect(*args):
     """Handle client disconnection"""
-    print("🔌 Client disconnected from dashboard")
+    dashboard.broadcaster.unsubscribe(request.sid)
+    log.info("🔌 Client disconnected from dashboard")
+
+@socketio.on('subscribe')
+def handle_subscribe(message=None):
+    """Limit a client to the zones it is viewing (empty list = all zones)"""
+    zones = (message or {}).get('zones')
+    zones = dashboard.broadcaster.subscribe(request.sid, zones)
+    emit('initial_data', dashboard.get_snapshot(zones)[1])
+
+@socketio.on('subscribe_aggregates')
+def handle_subscribe_aggregates(message=None):
+    """Also receive building/floor aggregates (``exclusive``: instead of zone frames)"""
+    exclusive = bool((message or {}).get('exclusive'))
+    dashboard.broadcaster.subscribe_aggregates(request.sid, exclusive)
+    emit('aggregates', dashboard.aggregates.snapshot())
 
 @socketio.on('request_data')
-def handle_data_request():
-    """Handle client data request"""
-    emit('initial_data', dashboard.get_all_data())
+def handle_data_request(message=None):
+    """Handle client data request (skipped if the client's ``version`` is current)"""
+    version, body = dashboard.get_snapshot(dashboard.broadcaster.zones_for(request.sid))
+    if (message or {}).get('version') == version:
+        return
+    emit('initial_data', body)
 
 if __name__ == '__main__':
     print("🚀 Starting HVAC Dashboard Server")
     print("=" * 50)
-    print("📊 Dashboard URL: http://localhost:5000")
-    print("🔗 Connecting to AWS IoT Core...")
+    print(f"📊 Dashboard URL: http://localhost:{DASHBOARD_PORT} (role: {DASHBOARD_ROLE})")
+    print(f"🔗 Connecting to MQTT broker ({MQTT_TRANSPORT})...")
     print("=" * 50)
     
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    dashboard.start()
+    if DASHBOARD_ROLE == "standalone":
+        socketio.run(app, host='0.0.0.0', port=DASHBOARD_PORT, debug=True)
+    else:
+        # No reloader in cluster mode: the launcher supervises the processes.
+        # Production workers need eventlet or gevent installed (used
+        # automatically); the Werkzeug dev server only runs when allowed.
+        socketio.run(app, host='0.0.0.0', port=DASHBOARD_PORT,
+                     allow_unsafe_werkzeug=ALLOW_UNSAFE_WERKZEUG)
\ No newline at end of file
@@ -0,0 +1,265 @@
+# async_app.py
+# asyncio variant of the dashboard: aiomqtt ingestion and a python-socketio AsyncServer on aiohttp
+#
+# Same state, processing, API and Socket.IO events as app.py, but MQTT
+# ingestion, batch processing and the broadcast tick run as cooperative
+# tasks on one event loop, so each web client costs a coroutine instead
+# of a thread. Needs the optional aiohttp and aiomqtt packages.
+
+import asyncio
+import os
+import time
+
+import aiomqtt
+import socketio
+from aiohttp import web
+
+from aws_config import *
+from broadcaster import AsyncDeltaBroadcaster
+from dashboard_core import DashboardCore
+from transport import backoff_delay, broker_address, get_ssl_context, uses_tls
+from hvac_logging import configure_logging, get_logger
+import metrics
+
+configure_logging(LOG_LEVEL, LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_INTERVAL)
+log = get_logger("async_dashboard")
+
+sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
+app = web.Application()
+sio.attach(app)
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'dashboard.html')
+
+
+class AsyncDashboard(DashboardCore):
+    """Dashboard whose ingestion, alerting and broadcasting are asyncio tasks
+
+    One aiomqtt connection feeds a bounded queue (oldest message dropped
+    when full) and a consumer task processes it in batches. A lost
+    connection ends the message iterator, which triggers the reconnect
+    straight away (with jittered exponential backoff) instead of being
+    noticed by a polling loop.
+    """
+
+    def __init__(self):
+        super().__init__(AsyncDeltaBroadcaster(sio, BROADCAST_INTERVAL))
+        self.queue = None  # Created on the running event loop
+        self.tasks = []
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+
+    def ingestion_stats(self):
+        return {
+            'policy': 'drop_oldest',
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'spill_depth': 0,
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'spilled': 0,
+            'batches': self.batches,
+            'errors': self.errors
+        }
+
+    async def start(self):
+        self.open_resources()
+        self.queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+        self.broadcaster.start()
+        self.start_checkpoints()
+        self.tasks = [asyncio.create_task(self.mqtt_loop()),
+                      asyncio.create_task(self.ingest_loop())]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def set_connected(self, connected):
+        self.connected = connected
+        self.snapshots.invalidate()
+        await sio.emit('connection_status', {'connected': connected})
+
+    def enqueue(self, topic, payload):
+        self.received += 1
+        received_at = time.time()
+        if self.recorder is not None:
+            self.recorder.record(topic, payload, received_at)
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((topic, payload, received_at))
+
+    async def mqtt_loop(self):
+        """Keep one MQTT connection up and feed the queue"""
+        host, port = broker_address()
+        tls_context = get_ssl_context() if uses_tls() else None
+        topics = [f"{MQTT_TOPICS['sensors']}/+", f"{MQTT_TOPICS['batches']}/+"]
+        attempt = 0
+
+        while True:
+            try:
+                async with aiomqtt.Client(host, port, identifier="hvac-dashboard-async",
+                                          tls_context=tls_context, keepalive=60,
+                                          clean_session=not MQTT_PERSISTENT_SESSION) as client:
+                    metrics.MQTT_CONNECTS.inc("dashboard")
+                    if self.has_connected:
+                        metrics.MQTT_RECONNECTS.inc("dashboard")
+                    self.has_connected = True
+                    attempt = 0
+                    log.info("✅ Dashboard connected to MQTT broker")
+
+                    for topic in topics:
+                        await client.subscribe(topic, qos=1)  # Queued at the broker while we're away
+                    log.info("📡 Subscribed to: %s", ", ".join(topics))
+                    await self.set_connected(True)
+
+                    async for message in client.messages:
+                        self.enqueue(str(message.topic), message.payload)
+            except aiomqtt.MqttError as e:
+                log.warning("🔌 Dashboard MQTT connection failed or lost: %s", e)
+
+            if self.connected:
+                metrics.MQTT_DISCONNECTS.inc("dashboard")
+                await self.set_connected(False)
+            wait = backoff_delay(attempt)
+            attempt += 1
+            log.info("🔄 Reconnecting in %.1f seconds...", wait)
+            await asyncio.sleep(wait)
+
+    async def ingest_loop(self):
+        """Process queued messages in batches"""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < INGEST_BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                self.errors += 1
+                log.error("❌ Error processing message batch: %s", e)
+            self.processed += len(batch)
+            self.batches += 1
+            await asyncio.sleep(0)  # Let Socket.IO run between batches
+
+
+# Initialize dashboard
+dashboard = AsyncDashboard()
+
+
+async def index(request):
+    """Main dashboard page"""
+    return web.FileResponse(TEMPLATE_PATH)
+
+
+async def get_data(request):
+    """API endpoint for all data (served from the snapshot cache, supports If-None-Match)"""
+    version, body = dashboard.get_snapshot()
+    etag = dashboard.snapshots.etag(version)
+    if any(tag.value == etag for tag in request.if_none_match or ()):
+        return web.Response(status=304, headers={'ETag': f'"{etag}"'})
+    response = web.Response(text=body, content_type='application/json',
+                            headers={'Cache-Control': 'no-cache'})
+    response.etag = etag
+    return response
+
+
+async def get_metrics(request):
+    """Prometheus metrics endpoint"""
+    return web.Response(body=metrics.REGISTRY.render().encode(),
+                        headers={'Content-Type': 'text/plain; version=0.0.4'})
+
+
+async def get_zones(request):
+    """API endpoint for zones list (with metadata)"""
+    return web.json_response(dashboard.registry.to_list())
+
+
+async def get_aggregates(request):
+    """API endpoint for building- and floor-level aggregates"""
+    return web.json_response(dashboard.aggregates.snapshot())
+
+
+async def get_zone_history(request):
+    """API endpoint for zone history (same parameters as app.py)"""
+    body, status, resolution = dashboard.query_history(request.match_info['zone'], request.query)
+    headers = {'X-History-Resolution': resolution} if resolution else None
+    return web.json_response(body, status=status, headers=headers)
+
+
+app.router.add_get('/', index)
+app.router.add_get('/api/data', get_data)
+app.router.add_get('/metrics', get_metrics)
+app.router.add_get('/api/zones', get_zones)
+app.router.add_get('/api/aggregates', get_aggregates)
+app.router.add_get('/api/history/{zone}', get_zone_history)
+
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    """Handle new client connection"""
+    log.info("🔌 New client connected to dashboard")
+    if (auth or {}).get('view') == 'aggregates':
+        # Overview screens: aggregates only, no per-zone data
+        await dashboard.broadcaster.subscribe_aggregates_async(sid, exclusive=True)
+        await sio.emit('aggregates', dashboard.aggregates.snapshot(), to=sid)
+        return
+    # Until the client subscribes to specific zones it receives all of them
+    await dashboard.broadcaster.subscribe_async(sid)
+    await sio.emit('initial_data', dashboard.get_snapshot()[1], to=sid)
+
+
+@sio.event
+async def disconnect(sid, *args):
+    """Handle client disconnection"""
+    await dashboard.broadcaster.unsubscribe_async(sid)
+    log.info("🔌 Client disconnected from dashboard")
+
+
+@sio.event
+async def subscribe(sid, message=None):
+    """Limit a client to the zones it is viewing (empty list = all zones)"""
+    zones = (message or {}).get('zones')
+    zones = await dashboard.broadcaster.subscribe_async(sid, zones)
+    await sio.emit('initial_data', dashboard.get_snapshot(zones)[1], to=sid)
+
+
+@sio.event
+async def subscribe_aggregates(sid, message=None):
+    """Also receive building/floor aggregates (``exclusive``: instead of zone frames)"""
+    exclusive = bool((message or {}).get('exclusive'))
+    await dashboard.broadcaster.subscribe_aggregates_async(sid, exclusive)
+    await sio.emit('aggregates', dashboard.aggregates.snapshot(), to=sid)
+
+
+@sio.event
+async def request_data(sid, message=None):
+    """Handle client data request (skipped if the client's ``version`` is current)"""
+    version, body = dashboard.get_snapshot(dashboard.broadcaster.zones_for(sid))
+    if (message or {}).get('version') == version:
+        return
+    await sio.emit('initial_data', body, to=sid)
+
+
+async def on_startup(app):
+    await dashboard.start()
+
+
+async def on_cleanup(app):
+    await dashboard.stop()
+
+
+app.on_startup.append(on_startup)
+app.on_cleanup.append(on_cleanup)
+
+
+if __name__ == '__main__':
+    print("🚀 Starting HVAC Dashboard Server (asyncio)")
+    print("=" * 50)
+    print(f"📊 Dashboard URL: http://localhost:{DASHBOARD_PORT}")
+    print(f"🔗 Connecting to MQTT broker ({MQTT_TRANSPORT})...")
+    print("=" * 50)
+
+    web.run_app(app, host='0.0.0.0', port=DASHBOARD_PORT)
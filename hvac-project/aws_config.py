@@ -16,11 +16,98 @@ AWS_IOT_ENDPOINT = "a1ipqemsvgkjmp-ats.iot.us-east-1.amazonaws.com"
 
 # הגדרות MQTT
 MQTT_PORT = 8883
+MQTT_TRANSPORT = os.environ.get("HVAC_MQTT_TRANSPORT", "aws")  # "aws" או "local"
+
+# ברוקר מקומי (TCP ללא TLS) לבדיקות ומדידות
+LOCAL_BROKER_HOST = os.environ.get("HVAC_LOCAL_BROKER_HOST", "127.0.0.1")
+LOCAL_BROKER_PORT = int(os.environ.get("HVAC_LOCAL_BROKER_PORT", "1883"))
 CLIENT_ID = "hvac-building-sensor"
 
+# התחברות מחדש: המתנה אקספוננציאלית עם רעש אקראי
+MQTT_RECONNECT_MIN_DELAY = 1.0  # שניות
+MQTT_RECONNECT_MAX_DELAY = 60.0  # שניות
+# סשן קבוע (clean_session=False): הברוקר שומר מנויים והודעות QoS 1 בזמן ניתוק
+MQTT_PERSISTENT_SESSION = os.environ.get("HVAC_MQTT_PERSISTENT_SESSION", "1") == "1"
+DEFAULT_BUILDING_ID = "smart-office-tlv"
+
+# פורמט הודעות החיישנים: "json" או "compact" (בינארי)
+PAYLOAD_FORMAT = os.environ.get("HVAC_PAYLOAD_FORMAT", "json")
+
 # נושאי MQTT
 MQTT_TOPICS = {
     "sensors": "hvac/building/sensors",
     "status": "hvac/building/status",
-    "alerts": "hvac/building/alerts"
-}
\ No newline at end of file
+    "alerts": "hvac/building/alerts",
+    "batches": "hvac/building/batches",  # הודעות מרובות קריאות מ-gateway
+    "state": "hvac/dashboard/state"  # עדכוני מצב מתהליך הקליטה לתהליכי הווב
+}
+
+# שער (gateway) שאורז קריאות של כמה אזורים להודעה אחת
+GATEWAY_ID = "hvac-gateway-1"
+GATEWAY_BATCH_SIZE = 1  # קריאות בהודעה (1 = הודעה לכל אזור)
+GATEWAY_BATCH_WINDOW = 1.0  # שניות מקסימום להמתנה לפני שליחת מנה חלקית
+
+# מנוע הסימולציה: זרע קבוע נותן אותן קריאות בכל הרצה (None = אקראי)
+SIMULATION_SEED = int(os.environ["HVAC_SIM_SEED"]) if os.environ.get("HVAC_SIM_SEED") else None
+
+# אחסון והעברה: קריאות שנוצרו בזמן ניתוק נשמרות בדיסק ונשלחות לאחר ההתחברות
+OFFLINE_BUFFER_PATH = "data/simulator_outbox.ring"
+OFFLINE_BUFFER_CAPACITY = 20000  # קריאות מקסימום (הישנות נדרסות)
+OFFLINE_DRAIN_RATE = 200  # קריאות לשנייה בזמן הריקון
+OFFLINE_DRAIN_BATCH = 50  # קריאות בכל הודעת ריקון
+
+# אזורי הבניין המוכרים מראש (אזורים חדשים נרשמים אוטומטית)
+DEFAULT_ZONES = ["lobby", "office_floor_1", "office_floor_2", "conference_room"]
+
+# אחסון היסטוריית חיישנים
+STORAGE_BACKEND = "sqlite"  # "sqlite" או "memory"
+STORAGE_PATH = "data/hvac_history.db"
+STORAGE_FLUSH_INTERVAL = 2.0  # שניות בין כתיבות לדיסק
+STORAGE_BATCH_SIZE = 500  # כתיבה מוקדמת כשמצטברות קריאות
+LIVE_HISTORY_SIZE = 50  # קריאות אחרונות בזיכרון לכל אזור
+HISTORY_MAX_POINTS = 500  # גודל תשובה מקסימלי ב-/api/history עם resolution=auto
+
+# שידור לדפדפנים
+BROADCAST_INTERVAL = 0.5  # שניות בין פריימים של עדכונים
+
+# צינור קליטת הודעות
+INGEST_QUEUE_SIZE = 10000  # הודעות מקסימום בתור
+INGEST_BATCH_SIZE = 200  # הודעות לעיבוד בכל מנה
+INGEST_BACKPRESSURE = "drop_oldest"  # "drop_oldest", "block" או "spill"
+INGEST_SPILL_PATH = "data/ingest_spill.log"
+INGEST_WORKERS = 1  # תהליכוני עיבוד (חלוקה לפי נושא MQTT)
+
+# הקלטת הודעות MQTT גולמיות להרצה חוזרת (replay.py); None = כבוי
+RECORD_PATH = os.environ.get("HVAC_RECORD_PATH")
+
+# מצב חי בזיכרון
+STATE_SHARDS = 16  # מחיצות עם נעילה נפרדת לכל קבוצת אזורים
+# נקודת שמירה של המצב החי לעלייה מהירה אחרי הפעלה מחדש; ריק = כבוי
+CHECKPOINT_PATH = os.environ.get("HVAC_CHECKPOINT_PATH", "data/dashboard_checkpoint.json.gz") or None
+CHECKPOINT_INTERVAL = 30.0  # שניות בין שמירות
+
+# פריסה מרובת תהליכים: "standalone", "ingest" (קליטה מ-MQTT) או "web" (שרת לקוחות)
+DASHBOARD_ROLE = os.environ.get("HVAC_ROLE", "standalone")
+DASHBOARD_PORT = int(os.environ.get("HVAC_DASHBOARD_PORT", "5000"))
+STATE_BUS_TRANSPORT = os.environ.get("HVAC_STATE_BUS_TRANSPORT", "local")  # ערוץ המצב בין התהליכים
+CLUSTER_WEB_WORKERS = 2  # תהליכי ווב כברירת מחדל
+# שרת הפיתוח של Werkzeug בתהליכי האשכול (לבדיקות מקומיות בלבד; בייצור להתקין eventlet או gevent)
+ALLOW_UNSAFE_WERKZEUG = os.environ.get("HVAC_ALLOW_UNSAFE_WERKZEUG", "0") == "1"
+
+# סטטיסטיקות
+ACTIVE_ALERT_WINDOW = 600  # שניות שבהן התראה נחשבת פעילה
+
+# כללי התראות
+ALERT_RULES_PATH = "alert_rules.json"
+
+# התראות חזויות וחריגות (analytics.py)
+PREDICTIVE_ALERTS = os.environ.get("HVAC_PREDICTIVE_ALERTS", "1") == "1"
+FORECAST_HORIZON = 900  # שניות קדימה לחיזוי חציית סף
+FORECAST_MIN_DURATION = 120  # שניות שהחיזוי חייב להחזיק לפני התראה
+ANOMALY_Z_THRESHOLD = 4.0  # סטיות תקן מהתחזית שנחשבות חריגה
+ANALYTICS_SUPPRESS_SECONDS = 600  # לא לחזור על אותה התראה לאזור בחלון זה
+
+# לוגים
+LOG_LEVEL = os.environ.get("HVAC_LOG_LEVEL", "INFO")  # DEBUG מפעיל לוג לכל הודעה
+LOG_RATE_LIMIT_BURST = 10  # הודעות זהות מקסימום בכל חלון
+LOG_RATE_LIMIT_INTERVAL = 10.0  # שניות
@@ -0,0 +1,161 @@
+# benchmark.py
+# Offline end-to-end benchmark: simulator -> local broker -> dashboard ingestion -> Socket.IO
+
+import argparse
+import contextlib
+import json
+import os
+import threading
+import time
+
+import aws_config
+
+
+def run_benchmark(num_zones=200, rate=500, connections=4, duration_seconds=30,
+                  port=18830, quiet=True, payload_format="json", batch_size=1, seed=1):
+    """Run the whole pipeline in-process and return latency/throughput figures"""
+    # Point everything at the local broker before the app modules load their config
+    aws_config.MQTT_TRANSPORT = "local"
+    aws_config.LOCAL_BROKER_HOST = "127.0.0.1"
+    aws_config.LOCAL_BROKER_PORT = port
+    aws_config.STORAGE_BACKEND = "memory"
+    aws_config.CHECKPOINT_PATH = None
+    if quiet:
+        aws_config.LOG_LEVEL = "WARNING"
+
+    import metrics
+    from local_broker import LocalBroker
+    from storage import to_epoch
+
+    def readings_processed():
+        return sum(metrics.MESSAGES.values.values())
+
+    broker = LocalBroker("127.0.0.1", port).start()
+    print(f"🧪 Local broker on 127.0.0.1:{port}")
+
+    output = open(os.devnull, "w") if quiet else None
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        import app
+        from hvac_aws_simulator import HVACAWSSimulator
+
+        dashboard = app.dashboard
+        dashboard.start()
+        deadline = time.time() + 20
+        while not dashboard.connected and time.time() < deadline:
+            time.sleep(0.05)
+    if not dashboard.connected:
+        print("❌ Dashboard did not connect to the local broker")
+        broker.stop()
+        return None
+
+    # A Socket.IO client measures when each reading reaches the browser side
+    client = app.socketio.test_client(app.app)
+    client.get_received()
+    latencies = []
+    progress = {'count': 0, 'first': None, 'last': None}  # ingestion activity window
+    stop = threading.Event()
+
+    def collect():
+        while not stop.is_set():
+            processed = dashboard.pipeline.processed
+            if processed > progress['count']:
+                now = time.perf_counter()
+                if progress['first'] is None:
+                    progress['first'] = now
+                progress['last'] = now
+                progress['count'] = processed
+            for event in client.get_received():
+                if event['name'] != 'sensor_frame':
+                    continue
+                now = time.time()
+                for delta in event['args'][0].get('zones', {}).values():
+                    if 'timestamp' in delta:
+                        latencies.append(now - to_epoch(delta['timestamp']))
+            time.sleep(0.002)
+
+    collector = threading.Thread(target=collect, daemon=True)
+    collector.start()
+
+    before = dashboard.pipeline.get_stats()
+    readings_before = readings_processed()
+    progress['count'] = before['processed']
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        simulator = HVACAWSSimulator(seed=seed)
+        simulator.payload_format = payload_format
+        simulator.batch_size = batch_size
+        publish_report = simulator.run_load_test(
+            num_zones=num_zones, rate=rate, connections=connections,
+            duration_seconds=duration_seconds)
+
+        # Let the dashboard drain whatever is still queued
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            stats = dashboard.pipeline.get_stats()
+            if stats['queue_depth'] == 0 and stats['processed'] >= stats['received']:
+                break
+            time.sleep(0.05)
+        time.sleep(aws_config.BROADCAST_INTERVAL * 2)
+
+    stop.set()
+    collector.join()
+    after = dashboard.pipeline.get_stats()
+    client.disconnect()
+    broker.stop()
+
+    from hvac_aws_simulator import percentile
+    latencies.sort()
+    processed = readings_processed() - readings_before
+    # Sustained throughput: readings over the window in which ingestion was busy
+    elapsed = (progress['last'] - progress['first']) if progress['first'] else 0
+    return {
+        'published': publish_report['published'] if publish_report else 0,
+        'publish_rate': publish_report['publish_rate'] if publish_report else 0,
+        'messages': after['processed'] - before['processed'],
+        'processed': processed,
+        'dropped': after['dropped'] - before['dropped'],
+        'throughput': round(processed / elapsed, 1) if elapsed else 0.0,
+        'frames_sampled': len(latencies),
+        'end_to_end_latency_ms': {
+            name: round(percentile(latencies, pct) * 1000, 1) if latencies else None
+            for name, pct in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end HVAC dashboard benchmark")
+    parser.add_argument("--zones", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=500, help="Target messages per second")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--duration", type=int, default=30, help="Seconds of load")
+    parser.add_argument("--port", type=int, default=18830, help="Local broker port")
+    parser.add_argument("--payload-format", choices=("json", "compact"), default="json")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Readings per MQTT message (gateway batching above 1)")
+    parser.add_argument("--seed", type=int, default=1, help="Simulation seed (same seed = same readings)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep dashboard/simulator output")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.zones, args.rate, args.connections, args.duration,
+                           args.port, quiet=not args.verbose,
+                           payload_format=args.payload_format,
+                           batch_size=args.batch_size, seed=args.seed)
+    if report is None:
+        return
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("📊 Benchmark results")
+    print("=" * 50)
+    print(f"📤 Published: {report['published']} ({report['publish_rate']} msg/s)")
+    print(f"📥 Processed: {report['processed']} ({report['throughput']} msg/s) "
+          f"in {report['messages']} MQTT messages, dropped: {report['dropped']}")
+    latency = report['end_to_end_latency_ms']
+    print(f"⏱️  End-to-end latency (ms): p50={latency['p50']} p95={latency['p95']} "
+          f"p99={latency['p99']} max={latency['max']}")
+
+
+if __name__ == "__main__":
+    main()
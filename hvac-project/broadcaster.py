@@ -0,0 +1,272 @@
+# broadcaster.py
+# Coalesced, delta-based Socket.IO broadcasting for the HVAC dashboard
+
+import hashlib
+import threading
+import time
+
+from flask_socketio import join_room, leave_room
+
+import metrics
+from hvac_logging import get_logger
+
+log = get_logger("broadcaster")
+
+# Room for clients that did not ask for specific zones
+ALL_ZONES_ROOM = "zones:all"
+# Room for clients of the building/floor aggregates channel
+AGGREGATES_ROOM = "aggregates"
+
+
+class DeltaBroadcaster:
+    """Collects sensor updates and sends one compact frame per tick
+
+    Every client is placed in a room shared by all clients with the same
+    zone subscription, so a tick costs one emit per distinct subscription
+    rather than one per client or per message. Frames only carry the
+    fields that changed since the previous tick.
+    """
+
+    def __init__(self, socketio, interval=0.5):
+        self.socketio = socketio
+        self.interval = interval
+        self.lock = threading.Lock()
+
+        self.latest = {}          # zone -> last reading seen
+        self.pending = {}         # zone -> changed fields since last tick
+        self.received_at = {}     # zone -> receive time of the oldest pending reading
+        self.pending_alerts = []
+        self.stats = {}
+        self.pending_stats = {}
+
+        self.rooms = {ALL_ZONES_ROOM: None}   # room -> set of zones (None = all)
+        self.room_members = {ALL_ZONES_ROOM: 0}
+        self.client_rooms = {}    # sid -> room
+
+        self.aggregates = None    # AggregateEngine behind the aggregates channel
+        self.aggregate_clients = set()
+        self.aggregates_sent = None  # version of the last aggregates emitted
+        self.started = False
+
+    def start(self):
+        """Start the background tick loop (once)"""
+        if not self.started:
+            self.started = True
+            self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("❌ Error broadcasting sensor frame: %s", e)
+
+    # ---- Updates from ingestion ----
+
+    def update(self, zone_id, data, received_at=None):
+        """Record a new reading; only fields that changed are queued"""
+        with self.lock:
+            if received_at is not None:
+                self.received_at.setdefault(zone_id, received_at)
+            previous = self.latest.get(zone_id) or {}
+            changes = {key: value for key, value in data.items() if previous.get(key) != value}
+            if changes:
+                self.pending.setdefault(zone_id, {}).update(changes)
+            self.latest[zone_id] = data
+
+    def update_stats(self, stats):
+        with self.lock:
+            for key, value in stats.items():
+                if self.stats.get(key) != value:
+                    self.pending_stats[key] = value
+            self.stats = dict(stats)
+
+    def add_alert(self, alert):
+        with self.lock:
+            self.pending_alerts.append(alert)
+
+    def collect_frames(self):
+        """Take the pending changes as ``[(room, frame)]``, one per room with news
+
+        Also returns the receive times of the readings involved, for
+        ``observe_latency`` once the frames are out.
+        """
+        with self.lock:
+            if not (self.pending or self.pending_alerts or self.pending_stats):
+                return [], {}
+            pending, self.pending = self.pending, {}
+            received_at, self.received_at = self.received_at, {}
+            alerts, self.pending_alerts = self.pending_alerts, []
+            stats, self.pending_stats = self.pending_stats, {}
+            rooms = list(self.rooms.items())
+
+        frames = []
+        for room, zones in rooms:
+            frame = {}
+            if zones is None:
+                frame_zones = pending
+                frame_alerts = alerts
+            else:
+                frame_zones = {z: d for z, d in pending.items() if z in zones}
+                frame_alerts = [a for a in alerts if a['zone'] in zones]
+            if frame_zones:
+                frame['zones'] = frame_zones
+            if frame_alerts:
+                frame['alerts'] = frame_alerts
+            if stats:
+                frame['stats'] = stats
+            if frame:
+                frames.append((room, frame))
+        return frames, received_at
+
+    def collect_aggregates(self):
+        """The aggregates to send this tick (None if unchanged or nobody is listening)"""
+        with self.lock:
+            if self.aggregates is None or not self.aggregate_clients:
+                return None
+        if self.aggregates.version == self.aggregates_sent:
+            return None
+        aggregates = self.aggregates.snapshot()
+        self.aggregates_sent = aggregates['version']
+        return aggregates
+
+    @staticmethod
+    def observe_latency(started, received_at):
+        metrics.EMIT_SECONDS.observe(time.perf_counter() - started)
+        now = time.time()
+        for zone_received_at in received_at.values():
+            metrics.RECEIVE_TO_EMIT_SECONDS.observe(now - zone_received_at)
+
+    def flush(self):
+        """Send one frame to every subscription room with pending changes"""
+        aggregates = self.collect_aggregates()
+        if aggregates is not None:
+            self.socketio.emit('aggregates', aggregates, to=AGGREGATES_ROOM)
+        frames, received_at = self.collect_frames()
+        if not (frames or received_at):
+            return
+        started = time.perf_counter()
+        for room, frame in frames:
+            self.socketio.emit('sensor_frame', frame, to=room)
+        self.observe_latency(started, received_at)
+
+    # ---- Client subscriptions (call from Socket.IO handlers) ----
+
+    def subscribe(self, sid, zones=None):
+        """Move a client to the room for its zone set (None = all zones)"""
+        old_room = self.release_room(sid)
+        if old_room is not None:
+            leave_room(old_room, sid=sid)
+        room, zones = self.assign_room(sid, zones)
+        join_room(room, sid=sid)
+        return zones
+
+    def unsubscribe(self, sid):
+        room = self.release_room(sid)
+        if room is not None:
+            leave_room(room, sid=sid)
+        self.release_aggregates(sid)
+
+    def subscribe_aggregates(self, sid, exclusive=False):
+        """Add a client to the aggregates channel (``exclusive``: and stop its zone frames)"""
+        if exclusive:
+            room = self.release_room(sid)
+            if room is not None:
+                leave_room(room, sid=sid)
+        with self.lock:
+            self.aggregate_clients.add(sid)
+        join_room(AGGREGATES_ROOM, sid=sid)
+
+    def release_aggregates(self, sid):
+        with self.lock:
+            self.aggregate_clients.discard(sid)
+
+    def assign_room(self, sid, zones=None):
+        """Record a client's subscription; returns ``(room, zones)`` to join"""
+        if zones:
+            zones = frozenset(zones)
+            key = ",".join(sorted(zones))
+            room = "zones:" + hashlib.sha1(key.encode()).hexdigest()[:16]
+        else:
+            zones = None
+            room = ALL_ZONES_ROOM
+
+        with self.lock:
+            self.rooms[room] = zones
+            self.room_members[room] = self.room_members.get(room, 0) + 1
+            self.client_rooms[sid] = room
+        return room, zones
+
+    def release_room(self, sid):
+        """Forget a client's subscription; returns the room to leave (or None)"""
+        with self.lock:
+            room = self.client_rooms.pop(sid, None)
+            if room is None:
+                return None
+            self.room_members[room] -= 1
+            if self.room_members[room] <= 0 and room != ALL_ZONES_ROOM:
+                del self.room_members[room]
+                del self.rooms[room]
+        return room
+
+    def zones_for(self, sid):
+        """Zones a client is subscribed to (None = all)"""
+        with self.lock:
+            return self.rooms.get(self.client_rooms.get(sid))
+
+
+class AsyncDeltaBroadcaster(DeltaBroadcaster):
+    """DeltaBroadcaster for a python-socketio ``AsyncServer``
+
+    Same frames and rooms; the tick loop is a coroutine and emits are
+    awaited instead of running on a background thread.
+    """
+
+    def start(self):
+        if not self.started:
+            self.started = True
+            self.socketio.start_background_task(self._run_async)
+
+    async def _run_async(self):
+        while True:
+            await self.socketio.sleep(self.interval)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                log.error("❌ Error broadcasting sensor frame: %s", e)
+
+    async def flush_async(self):
+        aggregates = self.collect_aggregates()
+        if aggregates is not None:
+            await self.socketio.emit('aggregates', aggregates, to=AGGREGATES_ROOM)
+        frames, received_at = self.collect_frames()
+        if not (frames or received_at):
+            return
+        started = time.perf_counter()
+        for room, frame in frames:
+            await self.socketio.emit('sensor_frame', frame, to=room)
+        self.observe_latency(started, received_at)
+
+    async def subscribe_async(self, sid, zones=None):
+        old_room = self.release_room(sid)
+        if old_room is not None:
+            await self.socketio.leave_room(sid, old_room)
+        room, zones = self.assign_room(sid, zones)
+        await self.socketio.enter_room(sid, room)
+        return zones
+
+    async def unsubscribe_async(self, sid):
+        room = self.release_room(sid)
+        if room is not None:
+            await self.socketio.leave_room(sid, room)
+        self.release_aggregates(sid)
+
+    async def subscribe_aggregates_async(self, sid, exclusive=False):
+        if exclusive:
+            room = self.release_room(sid)
+            if room is not None:
+                await self.socketio.leave_room(sid, room)
+        with self.lock:
+            self.aggregate_clients.add(sid)
+        await self.socketio.enter_room(sid, AGGREGATES_ROOM)
@@ -0,0 +1,103 @@
+# checkpoint.py
+# Periodic compact checkpoint of the dashboard's live state for fast restarts
+#
+# The live view (latest reading and hot history per zone, recent alerts,
+# statistics, zone metadata) is written as one gzipped JSON file every few
+# seconds while readings arrive. On boot the dashboard loads it before
+# serving anything, so a restart comes back with a full dashboard instead
+# of waiting for every zone to report again.
+
+import gzip
+import json
+import os
+import threading
+import time
+
+from hvac_logging import get_logger
+
+log = get_logger("checkpoint")
+
+FORMAT_VERSION = 1
+
+
+def save_checkpoint(path, state):
+    """Write ``state`` atomically: a crash mid-write leaves the previous checkpoint"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    state = dict(state, format=FORMAT_VERSION)
+    temp_path = path + ".tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+        json.dump(state, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path):
+    """The saved state, or None if there is no usable checkpoint"""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError) as e:
+        log.warning("⚠️ Ignoring unreadable checkpoint %s: %s", path, e)
+        return None
+    if state.get('format') != FORMAT_VERSION:
+        log.warning("⚠️ Ignoring checkpoint %s with format %s", path, state.get('format'))
+        return None
+    return state
+
+
+class Checkpointer:
+    """Save ``capture()`` to ``path`` every ``interval`` seconds
+
+    ``version()`` changes whenever there is something new to save, so an
+    idle dashboard does not rewrite the same checkpoint.
+    """
+
+    def __init__(self, path, capture, version, interval=30.0):
+        self.path = path
+        self.capture = capture
+        self.version = version
+        self.interval = interval
+        self.saved_version = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def load(self):
+        started = time.perf_counter()
+        state = load_checkpoint(self.path)
+        if state is not None:
+            log.info("♻️ Checkpoint from %s loaded in %.0f ms",
+                     time.strftime("%H:%M:%S", time.localtime(state.get('saved_at', 0))),
+                     (time.perf_counter() - started) * 1000)
+        return state
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.save()
+
+    def save(self):
+        """Write a checkpoint now if anything changed since the last one"""
+        with self.lock:
+            version = self.version()
+            if version == self.saved_version:
+                return False
+            try:
+                save_checkpoint(self.path, self.capture())
+            except Exception as e:
+                log.error("❌ Could not write checkpoint %s: %s", self.path, e)
+                return False
+            self.saved_version = version
+            return True
+
+    def stop(self):
+        """Stop the periodic saves and write a final checkpoint"""
+        self.stopped.set()
+        self.save()
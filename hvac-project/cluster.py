@@ -0,0 +1,157 @@
+# cluster.py
+# Multi-process deployment: one ingestion process and several web workers
+#
+#   sensors --MQTT--> ingest process --state bus (MQTT)--> web worker 1..N --> browsers
+#
+# The ingestion process (HVAC_ROLE=ingest) owns the sensor subscription,
+# storage and alerting, and publishes every processed batch to the state
+# bus. Each web worker (HVAC_ROLE=web) mirrors that live state and fans
+# frames out to its own Socket.IO clients, so client capacity grows with
+# the number of worker processes. The bus is a plain MQTT topic; by
+# default it runs on the local broker (local_broker.py).
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from aws_config import *
+from transport import create_mqtt_client, broker_address
+from hvac_logging import configure_logging, get_logger
+
+log = get_logger("cluster")
+
+STATE_TOPIC = MQTT_TOPICS['state']
+SYNC_TOPIC = f"{STATE_TOPIC}/sync"  # web workers ask for a full state here
+
+
+class StatePublisher:
+    """Ingestion side of the state bus
+
+    ``full_state`` returns the complete live state (``get_all_data``); it
+    is published whenever the bus (re)connects or a worker asks for it,
+    so workers that start late or miss updates catch up.
+    """
+
+    def __init__(self, full_state, client_id="hvac-dashboard-ingest"):
+        self.full_state = full_state
+        self.client = create_mqtt_client(client_id, STATE_BUS_TRANSPORT)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.client.connect_async(*broker_address(STATE_BUS_TRANSPORT), 60)
+        self.client.loop_start()  # paho reconnects on its own from here
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            log.info("✅ Ingestion connected to the state bus")
+            client.subscribe(SYNC_TOPIC)
+            self.publish_full_state()
+
+    def on_message(self, client, userdata, msg):
+        self.publish_full_state()
+
+    def publish_full_state(self):
+        state = self.full_state()
+        state['full'] = True
+        self.publish(state)
+
+    def publish(self, update):
+        """Send a state update to all web workers (dropped while disconnected)"""
+        self.client.publish(STATE_TOPIC, json.dumps(update, ensure_ascii=False), qos=0)
+
+
+class StatsReplica:
+    """Stand-in for ``StatsEngine`` in web workers, fed from state updates"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {'total_messages': 0, 'connected_zones': 0,
+                      'active_alerts': 0, 'last_update': None}
+        self.zone_stats = {}
+
+    def apply(self, update):
+        with self.lock:
+            if 'stats' in update:
+                self.stats = update['stats']
+            if update.get('full'):
+                self.zone_stats = dict(update.get('zone_stats', {}))
+            else:
+                self.zone_stats.update(update.get('zone_stats', {}))
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def zone_summary(self, zones=None):
+        with self.lock:
+            return {zone: stats for zone, stats in self.zone_stats.items()
+                    if zones is None or zone in zones}
+
+
+def request_sync(client):
+    """Ask the ingestion process to publish its full state"""
+    client.publish(SYNC_TOPIC, b"", qos=0)
+
+
+def spawn(role, port, cwd):
+    env = dict(os.environ, HVAC_ROLE=role, HVAC_DASHBOARD_PORT=str(port))
+    if role == "web":
+        env.pop("HVAC_RECORD_PATH", None)  # Only the ingestion process records
+    return subprocess.Popen([sys.executable, "app.py"], cwd=cwd, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the dashboard as one ingestion process and N web workers")
+    parser.add_argument("--workers", type=int, default=CLUSTER_WEB_WORKERS, help="Web worker processes")
+    parser.add_argument("--port", type=int, default=DASHBOARD_PORT,
+                        help="Port of the ingestion process (workers use the following ports)")
+    parser.add_argument("--with-broker", action="store_true",
+                        help="Run the local MQTT broker for the state bus in this process")
+    parser.add_argument("--dev-server", action="store_true",
+                        help="Allow the Werkzeug development server (local testing without eventlet/gevent)")
+    args = parser.parse_args()
+    if args.dev_server:
+        os.environ["HVAC_ALLOW_UNSAFE_WERKZEUG"] = "1"
+    configure_logging(LOG_LEVEL, LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_INTERVAL)
+
+    broker = None
+    if args.with_broker:
+        from local_broker import LocalBroker
+        broker = LocalBroker(LOCAL_BROKER_HOST, LOCAL_BROKER_PORT).start()
+        print(f"🧪 State bus broker on {LOCAL_BROKER_HOST}:{LOCAL_BROKER_PORT}")
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    processes = {("ingest", args.port): None}
+    for i in range(args.workers):
+        processes[("web", args.port + 1 + i)] = None
+
+    print(f"🚀 Ingestion on port {args.port}, {args.workers} web workers on ports "
+          f"{args.port + 1}-{args.port + args.workers}")
+    try:
+        while True:
+            # Start missing processes and restart any that exited
+            for (role, port), process in processes.items():
+                if process is None or process.poll() is not None:
+                    if process is not None:
+                        log.warning("⚠️ %s process on port %d exited (%s), restarting",
+                                    role, port, process.returncode)
+                    processes[(role, port)] = spawn(role, port, cwd)
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n⏹️ Stopping cluster")
+    finally:
+        for process in processes.values():
+            if process is not None and process.poll() is None:
+                process.terminate()
+        for process in processes.values():
+            if process is not None:
+                process.wait()
+        if broker:
+            broker.stop()
+
+
+if __name__ == "__main__":
+    main()
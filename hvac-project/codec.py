@@ -0,0 +1,171 @@
+# codec.py
+# Sensor payload encodings: verbose JSON (default) and a compact binary format
+#
+# Compact record layout (little-endian, 19 bytes + zone id):
+#   magic 0xB1 | version | flags | epoch float64 | temperature int16 (0.1°C)
+#   | humidity uint16 (0.1%) | co2 uint16 | air_quality u8 | hvac_status u8
+#   | zone_id (u8 length + utf-8) [| building_id] [| device_id]
+#
+# Derived/redundant fields are dropped: device_id defaults to
+# "hvac-sensor-<zone>" and building_id to DEFAULT_BUILDING_ID unless the
+# flags say they are present. The first byte tells the formats apart (a JSON
+# document never starts with 0xB1), so receivers accept both on any topic.
+#
+# Gateway batches carry many readings in one message:
+#   JSON:    {"gateway_id": ..., "readings": [reading, ...]}
+#   compact: magic 0xB2 | version | count uint16 | count compact records
+
+import json
+import struct
+from datetime import datetime
+
+from aws_config import DEFAULT_BUILDING_ID
+
+JSON = "json"
+COMPACT = "compact"
+FORMATS = (JSON, COMPACT)
+
+COMPACT_MAGIC = 0xB1
+COMPACT_VERSION = 1
+COMPACT_PREFIX = bytes([COMPACT_MAGIC])
+BATCH_MAGIC = 0xB2
+BATCH_PREFIX = bytes([BATCH_MAGIC])
+
+HAS_BUILDING_ID = 0x01
+HAS_DEVICE_ID = 0x02
+
+RECORD = struct.Struct("<BBBdhHHBB")
+BATCH_HEADER = struct.Struct("<BBH")
+MAX_BATCH_SIZE = 0xFFFF
+
+AIR_QUALITY = ("excellent", "good", "moderate", "poor")
+HVAC_STATUS = ("auto", "cooling_low", "cooling_high", "heating", "off")
+AIR_QUALITY_CODES = {name: code for code, name in enumerate(AIR_QUALITY)}
+HVAC_STATUS_CODES = {name: code for code, name in enumerate(HVAC_STATUS)}
+UNKNOWN = 255
+
+
+def _pack_string(value):
+    value = value.encode()
+    return bytes([len(value)]) + value
+
+
+def _unpack_string(payload, offset):
+    length = payload[offset]
+    end = offset + 1 + length
+    if end > len(payload):
+        raise ValueError("Truncated string field")
+    return payload[offset + 1:end].decode(), end
+
+
+def encode_compact(data):
+    """Encode one reading in the compact binary format"""
+    zone_id = data['zone_id']
+    timestamp = data['timestamp']
+    if not isinstance(timestamp, (int, float)):
+        timestamp = datetime.fromisoformat(timestamp).timestamp()
+
+    flags = 0
+    extra = b""
+    building_id = data.get('building_id')
+    if building_id and building_id != DEFAULT_BUILDING_ID:
+        flags |= HAS_BUILDING_ID
+        extra += _pack_string(building_id)
+    device_id = data.get('device_id')
+    if device_id and device_id != f"hvac-sensor-{zone_id}":
+        flags |= HAS_DEVICE_ID
+        extra += _pack_string(device_id)
+
+    return RECORD.pack(
+        COMPACT_MAGIC, COMPACT_VERSION, flags, timestamp,
+        int(round(data['temperature_celsius'] * 10)),
+        int(round(data['humidity_percent'] * 10)),
+        int(data['co2_ppm']),
+        AIR_QUALITY_CODES.get(data.get('air_quality'), UNKNOWN),
+        HVAC_STATUS_CODES.get(data.get('hvac_status'), UNKNOWN)
+    ) + _pack_string(zone_id) + extra
+
+
+def decode_compact(payload, offset=0):
+    """Decode one compact record; returns (reading dict, next offset)"""
+    magic, version, flags, timestamp, temp, humidity, co2, air, hvac = \
+        RECORD.unpack_from(payload, offset)
+    if magic != COMPACT_MAGIC or version != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact payload (magic {magic:#x}, version {version})")
+
+    zone_id, offset = _unpack_string(payload, offset + RECORD.size)
+    building_id = DEFAULT_BUILDING_ID
+    if flags & HAS_BUILDING_ID:
+        building_id, offset = _unpack_string(payload, offset)
+    device_id = f"hvac-sensor-{zone_id}"
+    if flags & HAS_DEVICE_ID:
+        device_id, offset = _unpack_string(payload, offset)
+
+    return {
+        "device_id": device_id,
+        "zone_id": zone_id,
+        "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+        "temperature_celsius": temp / 10,
+        "humidity_percent": humidity / 10,
+        "co2_ppm": co2,
+        "air_quality": AIR_QUALITY[air] if air < len(AIR_QUALITY) else None,
+        "hvac_status": HVAC_STATUS[hvac] if hvac < len(HVAC_STATUS) else None,
+        "building_id": building_id
+    }, offset
+
+
+def encode_payload(data, payload_format=JSON):
+    """Encode a reading for publishing"""
+    if payload_format == COMPACT:
+        return encode_compact(data)
+    if payload_format == JSON:
+        return json.dumps(data, ensure_ascii=False)
+    raise ValueError(f"Unknown payload format: {payload_format}")
+
+
+def encode_batch(readings, payload_format=JSON, gateway_id=None):
+    """Encode several readings as one gateway message"""
+    if len(readings) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch holds at most {MAX_BATCH_SIZE} readings")
+    if payload_format == COMPACT:
+        header = BATCH_HEADER.pack(BATCH_MAGIC, COMPACT_VERSION, len(readings))
+        return header + b"".join(encode_compact(data) for data in readings)
+    if payload_format == JSON:
+        return json.dumps({"gateway_id": gateway_id, "readings": readings}, ensure_ascii=False)
+    raise ValueError(f"Unknown payload format: {payload_format}")
+
+
+def decode_compact_batch(payload):
+    """Decode a compact gateway batch into a list of readings"""
+    magic, version, count = BATCH_HEADER.unpack_from(payload)
+    if magic != BATCH_MAGIC or version != COMPACT_VERSION:
+        raise ValueError(f"Unsupported batch payload (magic {magic:#x}, version {version})")
+    readings = []
+    offset = BATCH_HEADER.size
+    for _ in range(count):
+        data, offset = decode_compact(payload, offset)
+        readings.append(data)
+    return readings
+
+
+def decode_payload(payload):
+    """Decode a received payload in either format (raises ValueError if invalid)"""
+    if payload[:1] == COMPACT_PREFIX:
+        try:
+            return decode_compact(payload)[0]
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"Truncated or corrupt compact payload: {e}") from e
+    return json.loads(payload)
+
+
+def decode_readings(payload):
+    """Decode a single reading or a gateway batch into a list of readings"""
+    if payload[:1] == BATCH_PREFIX:
+        try:
+            return decode_compact_batch(payload)
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"Truncated or corrupt batch payload: {e}") from e
+    data = decode_payload(payload)
+    if isinstance(data, dict) and isinstance(data.get('readings'), list):
+        return data['readings']
+    return [data]
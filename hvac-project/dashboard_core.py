@@ -0,0 +1,401 @@
+# dashboard_core.py
+# Dashboard state and message processing, independent of the MQTT client and web stack
+#
+# HVACDashboard (app.py, Flask + paho threads) and AsyncDashboard
+# (async_app.py, asyncio) both build on DashboardCore and only add how
+# messages arrive and how clients are served.
+
+import atexit
+import logging
+import math
+import time
+
+from aws_config import *
+from storage import create_store, to_epoch, FIELDS, RESOLUTIONS
+from stats import StatsEngine
+from alert_rules import AlertRuleEngine, load_rules
+from analytics import StreamingAnalytics
+from zone_registry import ZoneRegistry
+from aggregates import AggregateEngine
+from state import ShardedState, AlertLog
+from codec import decode_readings
+from snapshot import SnapshotCache
+from recorder import MessageRecorder
+from checkpoint import Checkpointer
+from hvac_logging import get_logger
+import metrics
+
+log = get_logger("dashboard")
+
+# Fields every sensor reading must carry
+REQUIRED_FIELDS = ('timestamp', 'temperature_celsius', 'humidity_percent', 'co2_ppm')
+NUMERIC_FIELDS = REQUIRED_FIELDS[1:]
+
+
+def parse_time(value):
+    """Parse a query-string time (ISO format or epoch seconds)"""
+    try:
+        return float(value)
+    except ValueError:
+        return to_epoch(value)
+
+
+def parse_reading(data):
+    """Check a reading's required fields; returns a copy with the measurements as floats
+
+    Raises ValueError naming the first missing or malformed field.
+    """
+    missing = [field for field in REQUIRED_FIELDS if data.get(field) is None]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    try:
+        if not math.isfinite(to_epoch(data['timestamp'])):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError(f"malformed timestamp {data['timestamp']!r}") from None
+    reading = dict(data)
+    for field in NUMERIC_FIELDS:
+        try:
+            value = float(data[field])
+        except (TypeError, ValueError):
+            value = math.nan
+        if not math.isfinite(value):
+            raise ValueError(f"{field} is not a finite number: {data[field]!r}")
+        reading[field] = value
+    return reading
+
+
+class DashboardCore:
+    """Live state, history, statistics and alerting for the dashboard
+
+    ``broadcaster`` delivers frames to web clients; subclasses feed
+    batches of ``(topic, payload, received_at)`` to ``process_batch``.
+    """
+
+    checkpoints = True  # Restore from / save to CHECKPOINT_PATH
+
+    def __init__(self, broadcaster):
+        self.connected = False
+        self.has_connected = False
+        # Live state shared by ingestion workers and web readers (locked per shard)
+        self.sensor_data = ShardedState(LIVE_HISTORY_SIZE, STATE_SHARDS)  # Hot tail for the live view
+        self.alerts = AlertLog(maxlen=20)  # Keep last 20 alerts
+        self.registry = ZoneRegistry(DEFAULT_ZONES)  # Zones register on first message
+        self.aggregates = AggregateEngine()  # Building and floor overview
+
+        # Statistics (updated incrementally per reading)
+        self.stats_engine = self.create_stats_engine()
+        self.alert_engine = AlertRuleEngine(load_rules(ALERT_RULES_PATH))
+        self.analytics = None
+        if PREDICTIVE_ALERTS:
+            self.analytics = StreamingAnalytics(self.alert_engine.rules_for,
+                                                horizon=FORECAST_HORIZON,
+                                                z_threshold=ANOMALY_Z_THRESHOLD,
+                                                min_duration=FORECAST_MIN_DURATION,
+                                                suppress_seconds=ANALYTICS_SUPPRESS_SECONDS)
+
+        # Persistent history (survives restarts); opened by open_resources()
+        self.store = None
+        self.recorder = None
+        self.warm_start()
+
+        # Pre-encoded snapshot for /api/data and initial_data
+        self.snapshots = SnapshotCache(self.snapshot_zones, self.snapshot_globals)
+        self.snapshots.mark_zones(self.sensor_data.zones())
+        metrics.REGISTRY.register(metrics.Gauge(
+            "hvac_snapshot_rebuilds", "Times the cached dashboard snapshot was re-encoded",
+            function=lambda: self.snapshots.rebuilds))
+        metrics.REGISTRY.register(metrics.Gauge(
+            "hvac_snapshot_hits", "Snapshot reads served from the cache without re-encoding",
+            function=lambda: self.snapshots.hits))
+
+        # Coalesced delta frames to web clients
+        self.broadcaster = broadcaster
+        self.broadcaster.aggregates = self.aggregates
+
+        # Multi-process mode: set in the ingestion process (see cluster.py)
+        self.state_publisher = None
+
+    def open_resources(self):
+        """Open the history store and the message recorder (from ``start``)
+
+        Kept out of the constructor so that creating a dashboard, e.g. by
+        importing ``app``, writes no files and starts no threads.
+        """
+        self.store = create_store(STORAGE_BACKEND, STORAGE_PATH,
+                                  flush_interval=STORAGE_FLUSH_INTERVAL,
+                                  batch_size=STORAGE_BATCH_SIZE)
+        atexit.register(self.store.close)
+        if not self.restored:
+            self.load_history()
+            self.snapshots.mark_zones(self.sensor_data.zones())
+
+        # Raw message log for replay.py (HVAC_RECORD_PATH)
+        if RECORD_PATH:
+            self.recorder = MessageRecorder(RECORD_PATH)
+            atexit.register(self.recorder.close)
+            log.info("⏺️ Recording incoming messages to %s", RECORD_PATH)
+
+    def create_stats_engine(self):
+        return StatsEngine(alert_window_seconds=ACTIVE_ALERT_WINDOW)
+
+    def ingestion_stats(self):
+        """Queue counters reported under ``ingestion``"""
+        return {}
+
+    def publish_state(self, update):
+        if self.state_publisher is not None:
+            self.state_publisher.publish(update)
+
+    @property
+    def zones(self):
+        """Ids of all known zones"""
+        return self.registry.ids()
+
+    @property
+    def stats(self):
+        """Current summary statistics"""
+        return self.stats_engine.snapshot()
+
+    def warm_start(self):
+        """Restore the live state from the last checkpoint
+
+        Without one, ``open_resources`` warms the history from the store.
+        """
+        self.checkpointer = None
+        self.restored = False
+        if CHECKPOINT_PATH and self.checkpoints:
+            self.checkpointer = Checkpointer(CHECKPOINT_PATH, self.checkpoint_state,
+                                             lambda: self.aggregates.version, CHECKPOINT_INTERVAL)
+            state = self.checkpointer.load()
+            if state is not None:
+                self.restore_checkpoint(state)
+                self.checkpointer.saved_version = self.aggregates.version
+                self.restored = True
+
+    def start_checkpoints(self):
+        """Save checkpoints periodically and once more at exit"""
+        if self.checkpointer is not None:
+            self.checkpointer.start()
+            atexit.register(self.checkpointer.stop)
+
+    def checkpoint_state(self):
+        """Live state for a checkpoint (latest and hot history per zone, alerts, stats)"""
+        return {
+            'saved_at': time.time(),
+            'registry': self.registry.to_list(),
+            'sensors': self.sensor_data.snapshot(),
+            'alerts': self.alerts.list(),
+            'stats': self.stats_engine.checkpoint()
+        }
+
+    def restore_checkpoint(self, state):
+        for entry in state.get('registry', []):
+            self.registry.restore(entry)
+        for zone_id, data in state.get('sensors', {}).items():
+            self.registry.add(zone_id)
+            self.sensor_data.replace(zone_id, data['latest'], data['history'])
+            if data['latest']:
+                self.aggregates.record(zone_id, data['latest'], self.registry.get(zone_id))
+        self.alerts.replace(state.get('alerts', []))
+        self.stats_engine.restore(state.get('stats', {}))
+
+    def load_history(self):
+        """Warm the in-memory history from the persistent store"""
+        try:
+            for zone in self.store.zones():
+                self.registry.add(zone)
+                self.sensor_data.extend_history(zone, self.store.tail(zone, LIVE_HISTORY_SIZE))
+        except Exception as e:
+            log.warning("⚠️ Could not load stored history: %s", e)
+
+    def process_batch(self, batch):
+        """Process a batch of queued messages"""
+        with metrics.BATCH_SECONDS.time():
+            readings = []
+            for topic, payload, received_at in batch:
+                readings.extend(self.process_message(topic, payload, received_at))
+
+            if readings:
+                # Alert rules and stats run once per batch rather than once per message
+                with metrics.ALERT_EVAL_SECONDS.time():
+                    alerts = self.check_alerts(readings)
+                stats = self.stats
+                self.broadcaster.update_stats(stats)
+                zones = {data['zone_id'] for data in readings}
+                self.snapshots.mark_zones(zones)
+
+                if self.state_publisher is not None:
+                    self.publish_state({
+                        'readings': readings,
+                        'alerts': alerts,
+                        'stats': stats,
+                        'zone_stats': self.stats_engine.zone_summary(zones),
+                        'ingestion': self.ingestion_stats(),
+                        'connected': self.connected
+                    })
+
+    def process_message(self, topic, payload, received_at=None):
+        """Handle an incoming message (one reading or a gateway batch)
+
+        Returns the readings that were processed.
+        """
+        try:
+            # Parse message
+            started = time.perf_counter()
+            readings = decode_readings(payload)  # JSON or compact, single or batch
+            metrics.DECODE_SECONDS.observe(time.perf_counter() - started)
+        except ValueError as e:
+            metrics.INVALID_MESSAGES.inc()
+            log.warning("❌ Payload decode error on %s: %s (payload: %r)", topic, e, payload[:100])
+            return []
+
+        metrics.READINGS_PER_MESSAGE.observe(len(readings))
+        processed = []
+        for data in readings:
+            data = self.process_reading(topic, data, received_at)
+            if data is not None:
+                processed.append(data)
+        return processed
+
+    def process_reading(self, topic, data, received_at=None):
+        """Handle one sensor reading
+
+        Returns the reading as processed (measurements converted to
+        floats), or None if it was rejected.
+        """
+        try:
+            zone_id = data.get('zone_id')
+
+            if zone_id:
+                # Reject malformed readings before anything is registered or recorded
+                try:
+                    data = parse_reading(data)
+                except ValueError as e:
+                    metrics.INVALID_MESSAGES.inc()
+                    log.warning("⚠️ Rejected reading for %s on %s: %s", zone_id, topic, e)
+                    return None
+
+                # Store latest data
+                self.sensor_data.record(zone_id, data)
+                if self.registry.observe(zone_id, data):
+                    log.info("🆕 New zone registered: %s", zone_id)
+                self.aggregates.record(zone_id, data, self.registry.get(zone_id))
+                if self.store is not None:
+                    self.store.append(zone_id, data['timestamp'],
+                                      data['temperature_celsius'],
+                                      data['humidity_percent'],
+                                      data['co2_ppm'])
+
+                # Update statistics
+                self.stats_engine.record_reading(zone_id, data)
+
+                # Queue for the next frame to web clients
+                self.broadcaster.update(zone_id, data, received_at)
+                metrics.MESSAGES.inc(zone_id)
+
+                # Per-message logging is DEBUG only (off on the hot path by default)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("📨 Received data from %s on %s: 🌡️%s°C 💧%s%% 🫁%sppm",
+                              zone_id, topic, data['temperature_celsius'],
+                              data['humidity_percent'], data['co2_ppm'])
+                return data
+            else:
+                metrics.INVALID_MESSAGES.inc()
+                log.warning("⚠️ No zone_id in message on %s", topic)
+
+        except Exception as e:
+            metrics.INVALID_MESSAGES.inc()
+            log.error("❌ Error processing reading on %s: %s (data: %r)", topic, e, data)
+        return None
+
+    def check_alerts(self, readings):
+        """Evaluate alert rules, forecasts and anomaly checks for a batch of readings"""
+        alerts = self.alert_engine.evaluate(readings)
+        if self.analytics is not None:
+            alerts.extend(self.analytics.update(readings))
+
+        # Add alerts and emit to clients
+        for alert in alerts:
+            self.alerts.append(alert)
+            self.stats_engine.record_alert()
+            self.broadcaster.add_alert(alert)
+        return alerts
+
+    def snapshot_zones(self, zones):
+        """Per-zone parts of the dashboard snapshot"""
+        zones = set(zones)
+        return self.sensor_data.snapshot(zones), self.stats_engine.zone_summary(zones)
+
+    def snapshot_globals(self):
+        """Parts of the dashboard snapshot shared by all zones"""
+        return {
+            'alerts': self.alerts.list(),
+            'stats': self.stats,
+            'ingestion': self.ingestion_stats(),
+            'connected': self.connected
+        }
+
+    def get_all_data(self, zones=None):
+        """Get all current sensor data (optionally only for some zones)"""
+        data = self.snapshot_globals()
+        data['alerts'] = self.alerts.list(zones)
+        data['sensors'] = self.sensor_data.snapshot(zones)
+        data['zone_stats'] = self.stats_engine.zone_summary(zones)
+        return data
+
+    def get_snapshot(self, zones=None):
+        """Cached ``(version, json_text)`` form of ``get_all_data``"""
+        return self.snapshots.get(zones)
+
+    def choose_resolution(self, zone, start, end):
+        """Pick the finest resolution that keeps the response within HISTORY_MAX_POINTS"""
+        if self.store.count(zone, start, end) <= HISTORY_MAX_POINTS:
+            return 'raw'
+        for resolution, width in sorted(RESOLUTIONS.items(), key=lambda r: r[1]):
+            if (end - start) / width <= HISTORY_MAX_POINTS:
+                return resolution
+        return max(RESOLUTIONS, key=RESOLUTIONS.get)
+
+    def query_history(self, zone, args):
+        """Zone history for the query-string ``args``
+
+        Without arguments returns the live in-memory history
+        (``format=columns``: column-wise, straight from the ring). With
+        ``start``/``end`` (ISO or epoch), ``resolution`` (raw, 1m, 15m, 1h
+        or auto) and ``fields`` (comma separated) it queries the
+        persistent store (503 in processes without one). Returns
+        ``(body, status, resolution)``.
+        """
+        history_format = args.get('format', 'rows')
+        if history_format not in ('rows', 'columns'):
+            return {'error': 'format must be rows or columns'}, 400, None
+        if not set(args) - {'format'}:
+            return self.sensor_data.history(zone, history_format == 'columns'), 200, None
+        if history_format == 'columns':
+            return {'error': 'format=columns is only available for the live history'}, 400, None
+        if self.store is None:
+            # Web workers keep no store; the ingestion process serves ranges
+            return {'error': 'Stored history is not available in this process'}, 503, None
+
+        try:
+            end = parse_time(args['end']) if 'end' in args else time.time()
+            start = parse_time(args['start']) if 'start' in args else end - 24 * 3600
+        except ValueError:
+            return {'error': 'start/end must be ISO timestamps or epoch seconds'}, 400, None
+
+        fields = tuple(args.get('fields', ','.join(FIELDS)).split(','))
+        if not set(fields) <= set(FIELDS):
+            return {'error': f'fields must be a subset of {list(FIELDS)}'}, 400, None
+
+        resolution = args.get('resolution', 'auto')
+        if resolution == 'auto':
+            resolution = self.choose_resolution(zone, start, end)
+
+        if resolution == 'raw':
+            rows = self.store.query(zone, start, end, fields)
+        elif resolution in RESOLUTIONS:
+            rows = self.store.rollup(zone, resolution, start, end, fields)
+        else:
+            return {'error': f'Unknown resolution: {resolution}'}, 400, None
+        return rows, 200, resolution
@@ -1,209 +1,479 @@
 # hvac_aws_simulator.py
 # HVAC Simulator connecting to AWS IoT Core - Updated Version
 
-import json
+import logging
 import time
-import random
 import datetime
-import ssl
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import paho.mqtt.client as mqtt
 from aws_config import *
+from transport import create_mqtt_client, broker_address, uses_tls, ReconnectBackoff
+from codec import encode_payload, encode_batch, FORMATS
+from offline_buffer import OfflineBuffer
+from simulation import BuildingSimulation
+from hvac_logging import configure_logging, get_logger
+import metrics
+
+log = get_logger("simulator")
+
+# QoS 1 publish results that mean paho has taken the message: with NO_CONN
+# (connection lost before on_disconnect ran) it stays in paho's queue and is
+# resent after the reconnect, so buffering it as well would deliver it twice
+QUEUED_BY_PAHO = (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN)
+
+def percentile(sorted_values, pct):
+    """Percentile of an already sorted list (nearest rank)"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class ReadingBatcher:
+    """Gateway-side buffer that releases readings in batches
+
+    A batch is released once it holds ``size`` readings or its oldest
+    reading has waited ``window`` seconds, whichever comes first.
+    """
+    
+    def __init__(self, size, window):
+        self.size = max(1, size)
+        self.window = window
+        self.pending = []
+        self.started = None
+    
+    def add(self, data, now=None):
+        """Buffer a reading; returns a batch when one is ready, else None"""
+        now = time.monotonic() if now is None else now
+        if not self.pending:
+            self.started = now
+        self.pending.append(data)
+        if len(self.pending) >= self.size:
+            return self.drain()
+        return self.due(now)
+    
+    def due(self, now=None):
+        """Release the pending batch if its window has elapsed"""
+        now = time.monotonic() if now is None else now
+        if self.pending and now - self.started >= self.window:
+            return self.drain()
+        return None
+    
+    def drain(self):
+        batch, self.pending = self.pending, []
+        return batch
 
 class HVACAWSSimulator:
-    def __init__(self):
-        # 4 building zones
-        self.zones = ["lobby", "office_floor_1", "office_floor_2", "conference_room"]
+    def __init__(self, seed=SIMULATION_SEED, start=None):
+        # Building zones (shared with the dashboard config)
+        self.zones = list(DEFAULT_ZONES)
+        # Thermal state of every zone; seed + start time make runs reproducible
+        self.seed = seed
+        self.start = start  # None = now
+        self.engine = self.create_engine(start)
         self.client = None
+        self.backoff = None
         self.connected = False
         self.messages_sent = 0
-        self.retry_count = 0
         self.max_retries = 5
+        self.verbose = True
+        self.payload_format = PAYLOAD_FORMAT
+        self.batch_size = GATEWAY_BATCH_SIZE  # > 1 publishes as a gateway
+        self.batch_window = GATEWAY_BATCH_WINDOW
+        self.outbox_path = OFFLINE_BUFFER_PATH  # None drops readings while offline
+        self.outbox = None
+        self.outbox_stop = threading.Event()
+        self.drain_thread = None
         
         print("🏢 HVAC AWS IoT System Ready!")
-        print(f"🔗 Connecting to: {AWS_IOT_ENDPOINT}")
+        print(f"🔗 Connecting to: {broker_address()[0]}")
+    
+    def create_engine(self, start=None):
+        """Simulation of our zones from ``start`` (epoch, default now)"""
+        engine = BuildingSimulation(self.zones, seed=self.seed, start=start,
+                                    building_id=DEFAULT_BUILDING_ID)
+        # Simulated time runs with the wall clock from the start time
+        self.clock_offset = engine.time - time.time()
+        return engine
+    
+    def simulated_time(self):
+        """Current simulated time: the start time plus the wall-clock time since"""
+        return time.time() + self.clock_offset
+    
+    def create_client(self, client_id, clean_session=True):
+        """Create an MQTT client for the configured transport (shared TLS context)"""
+        return create_mqtt_client(client_id, clean_session=clean_session)
     
     def setup_mqtt_client(self):
         """Setup MQTT client with AWS certificates"""
         try:
-            # Create MQTT client with new API
-            self.client = mqtt.Client(
-                client_id=CLIENT_ID,
-                callback_api_version=mqtt.CallbackAPIVersion.VERSION2
-            )
-            
-            # Setup SSL/TLS
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_REQUIRED
-            
-            # Load certificates
-            context.load_verify_locations(ROOT_CA)
-            context.load_cert_chain(DEVICE_CERT, PRIVATE_KEY)
-            
-            # Set TLS context
-            self.client.tls_set_context(context)
+            # Create MQTT client with new API (persistent session: unacked QoS 1 publishes are resent)
+            self.client = self.create_client(CLIENT_ID, clean_session=not MQTT_PERSISTENT_SESSION)
             
             # Setup callbacks
             self.client.on_connect = self.on_connect
             self.client.on_disconnect = self.on_disconnect
+            self.client.on_connect_fail = self.on_connect_fail
             self.client.on_publish = self.on_publish
+            self.backoff = ReconnectBackoff(self.client)
             
             return True
             
         except Exception as e:
-            print(f"❌ Error setting up MQTT client: {e}")
+            log.error("❌ Error setting up MQTT client: %s", e)
             return False
     
     def on_connect(self, client, userdata, flags, rc, properties=None):
         """Connection callback"""
         if rc == 0:
             self.connected = True
-            self.retry_count = 0  # Reset retry count on successful connection
-            print("✅ Successfully connected to AWS IoT Core!")
-            print(f"📡 Client ID: {CLIENT_ID}")
+            self.backoff.reset()
+            metrics.MQTT_CONNECTS.inc("simulator")
+            log.info("✅ Successfully connected to MQTT broker (client ID: %s%s)", CLIENT_ID,
+                     ", session resumed" if flags.session_present else "")
         else:
-            print(f"❌ Connection failed with code: {rc}")
+            log.error("❌ Connection failed with code: %s (retrying in %.1f seconds)", rc, self.backoff.failed())
             self.connected = False
     
     def on_disconnect(self, client, userdata, rc, reason_code=None, properties=None):
         """Disconnect callback"""
         self.connected = False
-        print("🔌 Disconnected from AWS IoT Core")
-        if rc != 0:
-            print(f"⚠️ Unexpected disconnection. Return code: {rc}")
-            if reason_code:
-                print(f"📋 Reason: {reason_code}")
+        metrics.MQTT_DISCONNECTS.inc("simulator")
+        if reason_code is not None and reason_code.is_failure:
+            log.warning("⚠️ Unexpected disconnection (reason: %s), reconnecting in %.1f seconds",
+                        reason_code, self.backoff.failed())
+        else:
+            log.info("🔌 Disconnected from MQTT broker")
+    
+    def on_connect_fail(self, client, userdata):
+        """Connection attempt failed; paho retries after the backoff delay"""
+        log.warning("⏳ Could not reach MQTT broker, retrying in %.1f seconds", self.backoff.failed())
     
     def on_publish(self, client, userdata, mid, reason_code=None, properties=None):
         """Message publish callback"""
         self.messages_sent += 1
-        print(f"📤 Message {self.messages_sent} sent (ID: {mid})")
+        if self.verbose and log.isEnabledFor(logging.DEBUG):
+            log.debug("📤 Message %d sent (ID: %s)", self.messages_sent, mid)
     
     def connect_to_aws(self):
-        """Connect to AWS IoT Core with retry logic"""
-        if not self.setup_mqtt_client():
-            return False
+        """Connect to AWS IoT Core, or wait for the background reconnect
         
-        while self.retry_count < self.max_retries:
-            try:
-                print(f"🔄 Attempting to connect to AWS IoT Core... (Attempt {self.retry_count + 1}/{self.max_retries})")
-                self.client.connect(AWS_IOT_ENDPOINT, MQTT_PORT, 60)
-                self.client.loop_start()
-                
-                # Wait for connection
-                timeout = 10
-                while not self.connected and timeout > 0:
-                    time.sleep(1)
-                    timeout -= 1
-                
-                if self.connected:
-                    print("🎉 Connection successful!")
-                    return True
-                else:
-                    self.retry_count += 1
-                    if self.retry_count < self.max_retries:
-                        wait_time = min(5 * self.retry_count, 30)  # Exponential backoff
-                        print(f"⏰ Connection timeout. Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-                    
-            except Exception as e:
-                self.retry_count += 1
-                print(f"❌ Connection error: {e}")
-                if self.retry_count < self.max_retries:
-                    wait_time = min(5 * self.retry_count, 30)
-                    print(f"⏳ Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
+        The client is created once; after that paho's network thread
+        reconnects on its own (jittered backoff, same client and TLS
+        context), so this only waits up to ``max_retries`` attempts.
+        """
+        if self.client is None:
+            if not self.setup_mqtt_client():
+                return False
+            log.info("🔄 Connecting to MQTT broker...")
+            self.client.connect_async(*broker_address(), 60)
+            self.client.loop_start()
+        
+        while not self.connected and self.backoff.attempt < self.max_retries:
+            time.sleep(0.1)
+        
+        if self.connected:
+            log.info("🎉 Connection successful!")
+            return True
         
-        print(f"❌ Failed to connect after {self.max_retries} attempts")
+        log.error("❌ Failed to connect after %d attempts", self.max_retries)
         return False
     
     def generate_sensor_data(self, zone_id):
-        """Generate sensor data for a zone"""
-        # More realistic temperature variations based on zone
-        base_temps = {
-            "lobby": 22.0,
-            "office_floor_1": 23.0,
-            "office_floor_2": 22.5,
-            "conference_room": 21.5
-        }
-        
-        base_temp = base_temps.get(zone_id, 22.0)
-        temp = round(base_temp + random.uniform(-2, 3), 1)
-        humidity = round(random.uniform(40, 60), 1)
-        co2 = random.randint(400, 1200)
-        
-        # Calculate air quality
-        if co2 < 600:
-            air_quality = "excellent"
-        elif co2 < 800:
-            air_quality = "good"
-        elif co2 < 1000:
-            air_quality = "moderate"
-        else:
-            air_quality = "poor"
-        
-        # HVAC status based on conditions
-        if temp > 25 or co2 > 1000:
-            hvac_status = "cooling_high"
-        elif temp < 20:
-            hvac_status = "heating"
-        elif temp > 24:
-            hvac_status = "cooling_low"
-        else:
-            hvac_status = "auto"
-        
-        return {
-            "device_id": f"hvac-sensor-{zone_id}",
-            "zone_id": zone_id,
-            "timestamp": datetime.datetime.now().isoformat(),
-            "temperature_celsius": temp,
-            "humidity_percent": humidity,
-            "co2_ppm": co2,
-            "air_quality": air_quality,
-            "hvac_status": hvac_status,
-            "building_id": "smart-office-tlv"
-        }
+        """Current reading of a zone, with the simulation brought up to ``simulated_time``"""
+        self.engine.advance(self.simulated_time() - self.engine.time)
+        return self.engine.readings([zone_id])[0]
+    
+    def open_outbox(self):
+        """Open the on-disk offline buffer and start draining it"""
+        if self.outbox_path and self.outbox is None:
+            self.outbox = OfflineBuffer(self.outbox_path, OFFLINE_BUFFER_CAPACITY)
+            self.drain_thread = threading.Thread(target=self.drain_outbox, daemon=True)
+            self.drain_thread.start()
+    
+    def close_outbox(self):
+        if self.outbox is not None:
+            self.outbox_stop.set()
+            self.drain_thread.join()
+            self.outbox.close()
+            self.outbox = None
+    
+    def buffering(self):
+        """Readings go to the offline buffer while disconnected and until it has drained (keeps order)"""
+        return self.outbox is not None and (not self.connected or self.outbox.count > 0)
+    
+    def buffer_readings(self, readings):
+        if self.outbox is None:
+            return False
+        self.outbox.extend(readings)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("📦 Buffered %d readings offline (%d pending)", len(readings), self.outbox.count)
+        return True
+    
+    def drain_outbox(self):
+        """Publish buffered readings oldest first, at most OFFLINE_DRAIN_RATE per second"""
+        while not self.outbox_stop.is_set():
+            if not self.connected or not self.outbox.count:
+                self.outbox_stop.wait(0.2)
+                continue
+            end, readings = self.outbox.peek(OFFLINE_DRAIN_BATCH)
+            if self.send_batch(readings):
+                self.outbox.commit(end)
+                if not self.outbox.count:
+                    log.info("📤 Offline buffer drained")
+                self.outbox_stop.wait(len(readings) / OFFLINE_DRAIN_RATE)
+            else:
+                self.outbox_stop.wait(1)
     
     def publish_sensor_data(self, data):
-        """Send data to AWS IoT"""
+        """Send data to AWS IoT (kept in the offline buffer while disconnected)"""
+        if self.buffering():
+            return self.buffer_readings([data])
         if not self.connected:
-            print("❌ Not connected to AWS")
+            log.warning("❌ Not connected to MQTT broker")
             return False
         
         try:
             topic = f"{MQTT_TOPICS['sensors']}/{data['zone_id']}"
-            payload = json.dumps(data, ensure_ascii=False)
+            payload = encode_payload(data, self.payload_format)
             
             result = self.client.publish(topic, payload, qos=1)
             
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            if result.rc in QUEUED_BY_PAHO:
                 return True
             else:
-                print(f"❌ Publish error: {result.rc}")
+                log.warning("❌ Publish error: %s", result.rc)
+                return self.buffer_readings([data])  # Not queued by paho (e.g. queue full)
+                
+        except Exception as e:
+            log.error("❌ Publish exception: %s", e)
+            return False
+    
+    def publish_sensor_batch(self, readings):
+        """Send several zone readings in one message (gateway mode, buffered while disconnected)"""
+        if self.buffering():
+            return self.buffer_readings(readings)
+        if not self.connected:
+            log.warning("❌ Not connected to MQTT broker")
+            return False
+        return self.send_batch(readings) or self.buffer_readings(readings)
+    
+    def send_batch(self, readings):
+        """Publish readings as one gateway message"""
+        try:
+            topic = f"{MQTT_TOPICS['batches']}/{GATEWAY_ID}"
+            payload = encode_batch(readings, self.payload_format, GATEWAY_ID)
+            
+            result = self.client.publish(topic, payload, qos=1)
+            
+            if result.rc in QUEUED_BY_PAHO:
+                return True
+            else:
+                log.warning("❌ Batch publish error: %s", result.rc)
                 return False
                 
         except Exception as e:
-            print(f"❌ Publish exception: {e}")
+            log.error("❌ Batch publish exception: %s", e)
             return False
     
+    def generate_sensor_batch(self, zone_ids, engine=None):
+        """Readings of several zones at the engine's current time, in one pass"""
+        return (engine or self.engine).readings(zone_ids)
+    
+    def run_load_test(self, num_zones=1000, rate=500, connections=8,
+                      duration_seconds=60, qos=1, tick_seconds=0.1, zone_ids=None):
+        """Publish from many simulated zones over several connections and
+        report the achieved publish rate and ack latency percentiles"""
+        self.verbose = False
+        zones = list(zone_ids) if zone_ids else [f"zone_{i:04d}" for i in range(num_zones)]
+        num_zones = len(zones)
+        
+        print(f"🚀 Load test: {num_zones} zones, {rate} msg/s target, "
+              f"{connections} connections, {duration_seconds}s"
+              + (f", batches of {self.batch_size}" if self.batch_size > 1 else ""))
+        
+        # One client (own network thread) per connection
+        clients = []
+        connected = threading.Semaphore(0)
+        for i in range(connections):
+            client = self.create_client(f"{CLIENT_ID}-load-{i}")
+            state = {'lock': threading.Lock(), 'sent_at': {}, 'acked_at': {},
+                     'latencies': [], 'published': 0, 'messages': 0, 'failed': 0}
+            
+            def on_connect(client, userdata, flags, rc, properties=None):
+                if rc == 0:
+                    connected.release()
+            
+            def on_publish(client, userdata, mid, reason_code=None, properties=None, state=state):
+                now = time.perf_counter()
+                with state['lock']:
+                    sent_at = state['sent_at'].pop(mid, None)
+                    if sent_at is not None:
+                        state['latencies'].append(now - sent_at)
+                    else:
+                        # Ack raced ahead of the publisher recording the send time
+                        state['acked_at'][mid] = now
+            
+            client.on_connect = on_connect
+            client.on_publish = on_publish
+            client.connect(*broker_address(), 60)
+            client.loop_start()
+            clients.append((client, state, zones[i::connections]))
+        
+        deadline = time.time() + 30
+        if not all(connected.acquire(timeout=max(0, deadline - time.time()))
+                   for _ in range(connections)):
+            print("❌ Not all load-test connections came up")
+            for client, state, _ in clients:
+                client.loop_stop()
+            return None
+        
+        def send(client, state, topic, payload, count):
+            # Never hold our lock across publish(): paho calls
+            # on_publish with its own locks held
+            sent_at = time.perf_counter()
+            result = client.publish(topic, payload, qos=qos)
+            with state['lock']:
+                if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                    state['published'] += count
+                    state['messages'] += 1
+                    acked_at = state['acked_at'].pop(result.mid, None)
+                    if acked_at is not None:
+                        state['latencies'].append(acked_at - sent_at)
+                    else:
+                        state['sent_at'][result.mid] = sent_at
+                else:
+                    state['failed'] += count
+        
+        def worker(client, state, worker_zones, seed):
+            # Each worker simulates its own zones, seeded from ours when we have one
+            engine = BuildingSimulation(worker_zones, building_id=DEFAULT_BUILDING_ID,
+                                        seed=None if self.seed is None else self.seed * 1000 + seed)
+            per_tick = rate / connections * tick_seconds
+            topic_prefix = MQTT_TOPICS['sensors']
+            gateway_id = f"{GATEWAY_ID}-{seed}"
+            batch_topic = f"{MQTT_TOPICS['batches']}/{gateway_id}"
+            batcher = ReadingBatcher(self.batch_size, self.batch_window) if self.batch_size > 1 else None
+            credit = 0.0
+            cursor = 0
+            next_tick = time.perf_counter()
+            end = next_tick + duration_seconds
+            
+            while next_tick < end:
+                # Bring the engine up to the wall clock, so readings are stamped
+                # when they are generated (the benchmark measures latency from it)
+                engine.advance(time.time() - engine.time)
+                credit += per_tick
+                count = int(credit)
+                credit -= count
+                if count and worker_zones:
+                    batch_zones = [worker_zones[(cursor + j) % len(worker_zones)] for j in range(count)]
+                    cursor = (cursor + count) % len(worker_zones)
+                    for data in self.generate_sensor_batch(batch_zones, engine):
+                        if batcher is None:
+                            send(client, state, f"{topic_prefix}/{data['zone_id']}",
+                                 encode_payload(data, self.payload_format), 1)
+                            continue
+                        readings = batcher.add(data)
+                        if readings:
+                            send(client, state, batch_topic,
+                                 encode_batch(readings, self.payload_format, gateway_id), len(readings))
+                if batcher is not None:
+                    readings = batcher.due()
+                    if readings:
+                        send(client, state, batch_topic,
+                             encode_batch(readings, self.payload_format, gateway_id), len(readings))
+                
+                next_tick += tick_seconds
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            
+            if batcher is not None and batcher.pending:
+                readings = batcher.drain()
+                send(client, state, batch_topic,
+                     encode_batch(readings, self.payload_format, gateway_id), len(readings))
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            for i, (client, state, worker_zones) in enumerate(clients):
+                executor.submit(worker, client, state, worker_zones, i)
+        elapsed = time.perf_counter() - started
+        
+        # Give outstanding acks a moment to arrive
+        time.sleep(2)
+        for client, _, _ in clients:
+            client.loop_stop()
+            client.disconnect()
+        
+        published = sum(state['published'] for _, state, _ in clients)
+        messages = sum(state['messages'] for _, state, _ in clients)
+        failed = sum(state['failed'] for _, state, _ in clients)
+        latencies = sorted(l for _, state, _ in clients for l in state['latencies'])
+        
+        report = {
+            'zones': num_zones,
+            'connections': connections,
+            'duration_seconds': round(elapsed, 2),
+            'published': published,
+            'messages': messages,
+            'failed': failed,
+            'acked': len(latencies),
+            'publish_rate': round(published / elapsed, 1) if elapsed else 0.0,
+            'ack_latency_ms': {
+                name: round(percentile(latencies, pct) * 1000, 2) if latencies else None
+                for name, pct in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))
+            }
+        }
+        
+        print(f"📈 Published {published} readings in {messages} messages in "
+              f"{report['duration_seconds']}s ({report['publish_rate']} msg/s), "
+              f"{failed} failed, {len(latencies)} acked")
+        print(f"⏱️  Ack latency (ms): {report['ack_latency_ms']}")
+        return report
+    
+    def send_gateway_batch(self, readings, failed_publishes):
+        """Publish a gateway batch from the simulation loop; returns the failure streak"""
+        if self.publish_sensor_batch(readings):
+            if self.buffering():
+                print(f"  📦 Buffered {len(readings)} readings offline ({self.outbox.count} pending)")
+                return 0
+            print(f"  ✅ Sent {len(readings)} readings to AWS: {MQTT_TOPICS['batches']}/{GATEWAY_ID}")
+            return 0
+        
+        print(f"  ❌ Failed to send batch of {len(readings)} readings to AWS")
+        failed_publishes += 1
+        if failed_publishes >= 3:
+            print("⚠️ Multiple publish failures. Waiting for the connection to recover...")
+            failed_publishes = 0
+        return failed_publishes
+    
     def run_simulation(self, duration_minutes=10, interval_seconds=30):
         """Run the simulation"""
         print(f"🚀 Starting simulation for {duration_minutes} minutes")
         print(f"⏱️  Send interval: {interval_seconds} seconds")
         print("=" * 70)
         
+        # Readings restored from a previous run drain once connected
+        self.open_outbox()
+        
         # Connect to AWS
         if not self.connect_to_aws():
+            self.close_outbox()
             print("❌ Cannot connect to AWS. Stopping simulation.")
             return
         
         try:
             end_time = datetime.datetime.now() + datetime.timedelta(minutes=duration_minutes)
             failed_publishes = 0
+            batcher = ReadingBatcher(self.batch_size, self.batch_window) if self.batch_size > 1 else None
             
             while datetime.datetime.now() < end_time:
-                if not self.connected:
-                    print("⚠️ Connection lost. Attempting to reconnect...")
+                if not self.connected and self.outbox is not None:
+                    print(f"⚠️ Connection lost. Buffering readings offline ({self.outbox.count} pending)...")
+                elif not self.connected:
+                    print("⚠️ Connection lost. Waiting for reconnect...")
                     if not self.connect_to_aws():
                         print("❌ Reconnection failed. Stopping simulation.")
                         break
@@ -240,22 +510,35 @@ class HVACAWSSimulator:
                           f"🫁 {data['co2_ppm']} PPM | "
                           f"{hvac_status_emoji} {data['hvac_status']}")
                     
+                    # Gateway mode: buffer readings and send them together
+                    if batcher is not None:
+                        readings = batcher.add(data)
+                        if readings:
+                            failed_publishes = self.send_gateway_batch(readings, failed_publishes)
+                        continue
+                    
                     # Send to AWS
                     if self.publish_sensor_data(data):
-                        print(f"  ✅ Sent to AWS: hvac/building/sensors/{zone}")
+                        if self.buffering():
+                            print(f"  📦 Buffered offline ({self.outbox.count} pending)")
+                        else:
+                            print(f"  ✅ Sent to AWS: hvac/building/sensors/{zone}")
                         failed_publishes = 0  # Reset failed counter
                     else:
                         failed_publishes += 1
                         print(f"  ❌ Failed to send to AWS")
                         
-                        # If too many failed publishes, try to reconnect
+                        # Reconnecting is up to the network thread; just report it
                         if failed_publishes >= 3:
-                            print("⚠️ Multiple publish failures. Attempting to reconnect...")
-                            self.connected = False
+                            print("⚠️ Multiple publish failures. Waiting for the connection to recover...")
                             failed_publishes = 0
                     
                     time.sleep(1)  # Small delay between zones
                 
+                # Don't hold a partial batch across the wait between cycles
+                if batcher is not None and batcher.pending:
+                    failed_publishes = self.send_gateway_batch(batcher.drain(), failed_publishes)
+                
                 # Summary
                 print(f"\n📊 Total messages sent: {self.messages_sent}")
                 print(f"🔗 Connection status: {'✅ Connected' if self.connected else '❌ Disconnected'}")
@@ -268,6 +551,12 @@ class HVACAWSSimulator:
             print("\n⏹️ Simulation stopped by user")
             
         finally:
+            if self.outbox is not None:
+                # Whatever is left stays on disk for the next run
+                print(f"📦 Readings left in the offline buffer: {self.outbox.count} "
+                      f"(dropped when full: {self.outbox.dropped})")
+                self.close_outbox()
+            
             if self.client:
                 print("🔌 Disconnecting from AWS IoT Core...")
                 try:
@@ -280,16 +569,78 @@ class HVACAWSSimulator:
             print(f"📤 Total messages sent: {self.messages_sent}")
             print(f"🏢 Zones monitored: {len(self.zones)}")
             print("✅ Simulation complete!")
+    
+    def run_accelerated(self, hours=24, interval_seconds=20):
+        """Publish ``hours`` of simulated readings as fast as the broker accepts them
+        
+        Nothing sleeps: each tick advances the simulation by
+        ``interval_seconds`` and sends all zones as one gateway batch,
+        stamped with the simulated time. Without a start time the run
+        covers the last ``hours`` up to now.
+        """
+        if self.start is None:
+            self.engine = self.create_engine(time.time() - hours * 3600)
+        print(f"⏩ Simulating {hours} hours of readings every {interval_seconds}s (seed: {self.seed})")
+        if not self.connect_to_aws():
+            print("❌ Cannot connect to AWS. Stopping simulation.")
+            return None
+        
+        started = time.perf_counter()
+        ticks = readings_sent = 0
+        try:
+            for readings in self.engine.run(hours * 3600, interval_seconds):
+                if self.publish_sensor_batch(readings):
+                    readings_sent += len(readings)
+                ticks += 1
+            
+            # Wait for the broker to acknowledge what is still in flight
+            deadline = time.time() + 30
+            while self.messages_sent < ticks and time.time() < deadline:
+                time.sleep(0.05)
+        except KeyboardInterrupt:
+            print("\n⏹️ Simulation stopped by user")
+        finally:
+            self.client.loop_stop()
+            self.client.disconnect()
+        
+        elapsed = time.perf_counter() - started
+        print(f"📤 {readings_sent} readings in {ticks} batches, "
+              f"{ticks * interval_seconds / 3600:.1f} simulated hours in {elapsed:.1f}s")
+        return {'ticks': ticks, 'readings': readings_sent, 'elapsed': elapsed}
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="HVAC sensor simulator")
+    parser.add_argument("--load-test", action="store_true",
+                        help="Run a load test instead of the regular simulation")
+    parser.add_argument("--zones", type=int, default=1000, help="Simulated zones (load test)")
+    parser.add_argument("--rate", type=float, default=500, help="Target messages per second (load test)")
+    parser.add_argument("--connections", type=int, default=8, help="Concurrent MQTT connections (load test)")
+    parser.add_argument("--duration", type=int, default=60, help="Load test duration in seconds")
+    parser.add_argument("--payload-format", choices=FORMATS, default=PAYLOAD_FORMAT,
+                        help="Sensor payload encoding")
+    parser.add_argument("--batch-size", type=int, default=GATEWAY_BATCH_SIZE,
+                        help="Readings per MQTT message; above 1 publishes as a gateway")
+    parser.add_argument("--batch-window", type=float, default=GATEWAY_BATCH_WINDOW,
+                        help="Seconds a partial gateway batch may wait before it is sent")
+    parser.add_argument("--seed", type=int, default=SIMULATION_SEED,
+                        help="Seed for the simulation engine (same seed and --start = same readings)")
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat, default=None,
+                        help="Simulated start time (ISO format; default now, or --accelerated-hours ago)")
+    parser.add_argument("--accelerated-hours", type=float, default=None,
+                        help="Publish this many simulated hours as fast as possible, without sleeps")
+    parser.add_argument("--no-offline-buffer", action="store_true",
+                        help="Drop readings while disconnected instead of storing them on disk")
+    args = parser.parse_args()
+    configure_logging(LOG_LEVEL, LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_INTERVAL)
+    
     print("🚀 Starting HVAC Simulator with AWS IoT Core")
     print("=" * 70)
     
     # Check certificate files
     import os
     
-    required_files = [DEVICE_CERT, PRIVATE_KEY, ROOT_CA]
+    required_files = [DEVICE_CERT, PRIVATE_KEY, ROOT_CA] if uses_tls() else []
     missing_files = []
     
     for file_path in required_files:
@@ -303,10 +654,27 @@ def main():
         print("💡 Make sure you copied all certificate files to certificates/ folder")
         return
     
-    print("✅ All certificate files found")
+    if uses_tls():
+        print("✅ All certificate files found")
     
     # Create and run simulator
-    simulator = HVACAWSSimulator()
+    simulator = HVACAWSSimulator(seed=args.seed,
+                                 start=args.start.timestamp() if args.start else None)
+    simulator.payload_format = args.payload_format
+    simulator.batch_size = args.batch_size
+    simulator.batch_window = args.batch_window
+    if args.no_offline_buffer:
+        simulator.outbox_path = None
+    
+    if args.load_test:
+        simulator.run_load_test(num_zones=args.zones, rate=args.rate,
+                                connections=args.connections,
+                                duration_seconds=args.duration)
+        return
+    
+    if args.accelerated_hours:
+        simulator.run_accelerated(hours=args.accelerated_hours)
+        return
     
     # Run simulation for longer duration with shorter intervals
     simulator.run_simulation(duration_minutes=10, interval_seconds=20)
@@ -0,0 +1,60 @@
+# hvac_logging.py
+# Leveled, rate-limited logging for the dashboard and simulator
+
+import logging
+import threading
+import time
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most ``burst`` records per message template per ``interval``
+
+    When a window closes with suppressed records, the next record that
+    gets through notes how many were dropped.
+    """
+
+    def __init__(self, burst=10, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.windows = {}  # (logger, template) -> [window_start, count, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+_configured = False
+
+
+def configure_logging(level="INFO", burst=10, interval=10.0):
+    """Configure root logging once for the process"""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(RateLimitFilter(burst, interval))
+    root = logging.getLogger("hvac")
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.addHandler(handler)
+    root.propagate = False
+
+
+def get_logger(name):
+    return logging.getLogger(f"hvac.{name}")
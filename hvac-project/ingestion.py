@@ -0,0 +1,256 @@
+# ingestion.py
+# Bounded, batched ingestion pipeline between the MQTT callback and processing
+
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+from hvac_logging import get_logger
+
+log = get_logger("ingestion")
+
+# Backpressure policies for a full queue
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+SPILL = "spill"
+POLICIES = (DROP_OLDEST, BLOCK, SPILL)
+
+# Spill record header: receive time, topic length, payload length
+SPILL_HEADER = struct.Struct("<dHI")
+OFFSET = struct.Struct("<Q")
+
+
+class SpillFile:
+    """Append-only overflow log read back in FIFO order
+
+    The log survives restarts: messages spilled before a crash are read
+    back first on the next start. The position up to which messages have
+    been handled is kept in ``<path>.offset``, and the log is only
+    truncated once everything in it has been handled, so a message is
+    processed at least once.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.offset_path = path + ".offset"
+        self.writer = open(path, "ab")
+        self.reader = open(path, "rb")
+        self.count = self._recover()
+
+    def _recover(self):
+        """Count the unhandled messages left by a previous run"""
+        try:
+            with open(self.offset_path, "rb") as f:
+                (offset,) = OFFSET.unpack(f.read(OFFSET.size))
+        except (OSError, struct.error):
+            offset = 0
+        size = os.path.getsize(self.path)
+        if offset > size:
+            offset = 0  # Log truncated under us: replay all of it
+        count, position = 0, offset
+        self.reader.seek(offset)
+        while position + SPILL_HEADER.size <= size:
+            _, topic_len, payload_len = SPILL_HEADER.unpack(self.reader.read(SPILL_HEADER.size))
+            end = position + SPILL_HEADER.size + topic_len + payload_len
+            if end > size:
+                break
+            self.reader.seek(end)
+            count, position = count + 1, end
+        if position < size:
+            self.writer.truncate(position)  # Drop a record torn by a crash mid-write
+        self.reader.seek(offset)
+        if count:
+            log.warning("♻️ Replaying %d spilled messages from %s", count, self.path)
+        return count
+
+    def write(self, item):
+        topic, payload, received_at = item
+        topic = topic.encode()
+        self.writer.write(SPILL_HEADER.pack(received_at, len(topic), len(payload)))
+        self.writer.write(topic)
+        self.writer.write(payload)
+        self.count += 1
+
+    def read(self, limit):
+        """The next messages (call ``commit`` once they have been handled)"""
+        self.writer.flush()
+        items = []
+        while self.count and len(items) < limit:
+            received_at, topic_len, payload_len = SPILL_HEADER.unpack(
+                self.reader.read(SPILL_HEADER.size))
+            topic = self.reader.read(topic_len).decode()
+            payload = self.reader.read(payload_len)
+            items.append((topic, payload, received_at))
+            self.count -= 1
+        return items
+
+    def commit(self):
+        """Mark everything read so far as handled"""
+        if not self.count:
+            # Fully drained: start the log over
+            self.writer.truncate(0)
+            self.reader.seek(0)
+            offset = 0
+        else:
+            offset = self.reader.tell()
+        temp_path = self.offset_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(OFFSET.pack(offset))
+        os.replace(temp_path, self.offset_path)
+
+    def close(self):
+        self.writer.close()
+        self.reader.close()
+
+
+class IngestionPipeline:
+    """Queue MQTT messages and hand them to a worker thread in batches
+
+    ``submit`` is called on paho's network thread and only enqueues, so
+    slow processing (alerting, Socket.IO emits) never delays message
+    intake or QoS-1 acks. ``handler`` receives lists of
+    ``(topic, payload, received_at)`` tuples.
+    """
+
+    def __init__(self, handler, max_size=10000, batch_size=200,
+                 policy=DROP_OLDEST, spill_path=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if policy == SPILL and not spill_path:
+            raise ValueError("The spill policy needs a spill_path")
+
+        self.handler = handler
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.policy = policy
+
+        self.queue = deque()
+        self.spill = SpillFile(spill_path) if policy == SPILL else None
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.batches = 0
+        self.errors = 0
+
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker.start()
+
+    def submit(self, topic, payload):
+        """Enqueue a raw message (called from the MQTT network thread)"""
+        item = (topic, payload, time.time())
+        with self.lock:
+            self.received += 1
+            if self.spill is not None and (self.spill.count or len(self.queue) >= self.max_size):
+                # Once spilling, keep spilling until the log drains to preserve order
+                self.spill.write(item)
+                self.spilled += 1
+            else:
+                if len(self.queue) >= self.max_size:
+                    if self.policy == DROP_OLDEST:
+                        self.queue.popleft()
+                        self.dropped += 1
+                    else:
+                        while len(self.queue) >= self.max_size:
+                            self.not_full.wait()
+                self.queue.append(item)
+            self.not_empty.notify()
+
+    def _next_batch(self):
+        """The next batch, and whether it was read from the spill log"""
+        with self.lock:
+            while not self.queue and not (self.spill and self.spill.count):
+                self.not_empty.wait()
+            batch = []
+            while self.queue and len(batch) < self.batch_size:
+                batch.append(self.queue.popleft())
+            spilled = False
+            if not batch and self.spill is not None:
+                batch, spilled = self.spill.read(self.batch_size), True
+            self.not_full.notify_all()
+            return batch, spilled
+
+    def _worker_loop(self):
+        while True:
+            batch, spilled = self._next_batch()
+            try:
+                self.handler(batch)
+            except Exception as e:
+                self.errors += 1
+                log.error("❌ Error processing message batch: %s", e)
+            if spilled:
+                # Only now may the log forget these messages
+                with self.lock:
+                    self.spill.commit()
+            self.processed += len(batch)
+            self.batches += 1
+
+    def get_stats(self):
+        """Counters for monitoring the pipeline"""
+        with self.lock:
+            return {
+                'policy': self.policy,
+                'queue_depth': len(self.queue),
+                'spill_depth': self.spill.count if self.spill else 0,
+                'received': self.received,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'spilled': self.spilled,
+                'batches': self.batches,
+                'errors': self.errors
+            }
+
+
+class PartitionedPipeline:
+    """Several ingestion pipelines, one worker each, partitioned by topic
+
+    A topic always maps to the same partition, so readings from one zone
+    (or one gateway) are still processed in order while different topics
+    are handled in parallel. ``handler`` must be safe to call from
+    several threads at once.
+    """
+
+    def __init__(self, handler, partitions=2, max_size=10000, batch_size=200,
+                 policy=DROP_OLDEST, spill_path=None):
+        self.policy = policy
+        self.partitions = []
+        for index in range(partitions):
+            path = f"{spill_path}.{index}" if spill_path else None
+            self.partitions.append(IngestionPipeline(
+                handler, max_size=max(1, max_size // partitions), batch_size=batch_size,
+                policy=policy, spill_path=path))
+
+    def submit(self, topic, payload):
+        self.partitions[hash(topic) % len(self.partitions)].submit(topic, payload)
+
+    @property
+    def processed(self):
+        return sum(p.processed for p in self.partitions)
+
+    @property
+    def dropped(self):
+        return sum(p.dropped for p in self.partitions)
+
+    def get_stats(self):
+        stats = {'policy': self.policy, 'partitions': len(self.partitions)}
+        for partition in self.partitions:
+            for key, value in partition.get_stats().items():
+                if key != 'policy':
+                    stats[key] = stats.get(key, 0) + value
+        return stats
+
+
+def create_pipeline(handler, workers=1, **kwargs):
+    """A single pipeline, or a partitioned one when more workers are asked for"""
+    if workers > 1:
+        return PartitionedPipeline(handler, partitions=workers, **kwargs)
+    return IngestionPipeline(handler, **kwargs)
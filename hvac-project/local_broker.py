@@ -0,0 +1,268 @@
+# local_broker.py
+# Minimal in-process MQTT 3.1.1 broker (plain TCP) for offline testing and benchmarks
+#
+# Supports CONNECT, PUBLISH (QoS 0/1), SUBSCRIBE/UNSUBSCRIBE with + and #
+# wildcards, PINGREQ and DISCONNECT, and persistent sessions
+# (clean_session=False keeps subscriptions and queues QoS 1 messages while
+# the client is away). No TLS, authentication or retained messages - it
+# stands in for AWS IoT Core, it does not replace it.
+
+import socket
+import socketserver
+import struct
+import threading
+from collections import deque
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter matching with + and # wildcards"""
+    filter_levels = topic_filter.split('/')
+    topic_levels = topic.split('/')
+    for i, level in enumerate(filter_levels):
+        if level == '#':
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != '+' and level != topic_levels[i]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value):
+    value = value.encode()
+    return struct.pack("!H", len(value)) + value
+
+
+def packet(packet_type, body=b"", flags=0):
+    return bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body
+
+
+class Session:
+    """One connected client"""
+
+    def __init__(self, broker, sock):
+        self.broker = broker
+        self.sock = sock
+        self.client_id = None
+        self.clean = True
+        self.subscriptions = {}  # topic filter -> qos
+        self.send_lock = threading.Lock()
+        self.next_id = 0
+
+    def send(self, data):
+        with self.send_lock:
+            self.sock.sendall(data)
+
+    def close(self):
+        # shutdown() first: a bare close() doesn't end the handler's blocking recv or tell the client
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+            self.sock.close()
+        except OSError:
+            pass
+
+    def deliver(self, topic, payload, qos):
+        body = encode_string(topic)
+        if qos:
+            with self.send_lock:
+                self.next_id = self.next_id % 65535 + 1
+                packet_id = self.next_id
+            body += struct.pack("!H", packet_id)
+        self.send(packet(PUBLISH, body + payload, flags=qos << 1))
+
+
+class BrokerHandler(socketserver.BaseRequestHandler):
+
+    def _read_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client closed connection")
+            data += chunk
+        return bytes(data)
+
+    def _read_packet(self):
+        header = self._read_exact(1)[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = self._read_exact(1)[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return header >> 4, header & 0x0F, self._read_exact(length)
+
+    def handle(self):
+        broker = self.server.broker
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = Session(broker, self.request)
+        try:
+            while True:
+                packet_type, flags, body = self._read_packet()
+
+                if packet_type == CONNECT:
+                    name_len = struct.unpack("!H", body[:2])[0]
+                    offset = 2 + name_len + 4  # protocol name, level, flags, keepalive
+                    session.clean = bool(body[2 + name_len + 1] & 0x02)
+                    id_len = struct.unpack("!H", body[offset:offset + 2])[0]
+                    session.client_id = body[offset + 2:offset + 2 + id_len].decode()
+                    queued = broker.add_session(session)
+                    session.send(packet(CONNACK, b"\x00\x00" if queued is None else b"\x01\x00"))
+                    for topic, payload in queued or ():
+                        session.deliver(topic, payload, 1)
+
+                elif packet_type == PUBLISH:
+                    qos = (flags >> 1) & 0x03
+                    topic_len = struct.unpack("!H", body[:2])[0]
+                    topic = body[2:2 + topic_len].decode()
+                    offset = 2 + topic_len
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                    broker.publish(topic, body[offset:], qos)
+                    if qos:
+                        session.send(packet(PUBACK, packet_id))
+
+                elif packet_type == SUBSCRIBE:
+                    packet_id, offset, granted = body[:2], 2, bytearray()
+                    while offset < len(body):
+                        filter_len = struct.unpack("!H", body[offset:offset + 2])[0]
+                        topic_filter = body[offset + 2:offset + 2 + filter_len].decode()
+                        qos = min(body[offset + 2 + filter_len], 1)
+                        offset += 3 + filter_len
+                        session.subscriptions[topic_filter] = qos
+                        granted.append(qos)
+                    session.send(packet(SUBACK, packet_id + bytes(granted)))
+
+                elif packet_type == UNSUBSCRIBE:
+                    packet_id, offset = body[:2], 2
+                    while offset < len(body):
+                        filter_len = struct.unpack("!H", body[offset:offset + 2])[0]
+                        session.subscriptions.pop(body[offset + 2:offset + 2 + filter_len].decode(), None)
+                        offset += 2 + filter_len
+                    session.send(packet(UNSUBACK, packet_id))
+
+                elif packet_type == PINGREQ:
+                    session.send(packet(PINGRESP))
+
+                elif packet_type == DISCONNECT:
+                    break
+
+                # PUBACKs from subscribers need no action
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            broker.remove_session(session)
+
+
+class ThreadedBrokerServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalBroker:
+    """Local MQTT broker running in background threads"""
+
+    def __init__(self, host="127.0.0.1", port=1883, offline_queue_size=10000):
+        self.server = ThreadedBrokerServer((host, port), BrokerHandler)
+        self.server.broker = self
+        self.host, self.port = self.server.server_address
+        self.sessions = set()
+        self.offline = {}  # client id -> (subscriptions, queued QoS 1 messages) of persistent sessions
+        self.offline_queue_size = offline_queue_size
+        self.lock = threading.Lock()
+        self.messages_routed = 0
+        self.thread = None
+
+    def add_session(self, session):
+        """Register a connection; returns the queued messages if it resumes a session, else None"""
+        with self.lock:
+            queued = None
+            # A new connection with the same client id takes over the old one
+            for existing in [s for s in self.sessions if s.client_id == session.client_id]:
+                self.sessions.discard(existing)
+                if not session.clean:
+                    session.subscriptions, queued = existing.subscriptions, []
+                existing.close()
+            parked = self.offline.pop(session.client_id, None)
+            if parked is not None and not session.clean:
+                session.subscriptions, queued = parked[0], list(parked[1])
+            self.sessions.add(session)
+            return queued
+
+    def remove_session(self, session):
+        with self.lock:
+            if session not in self.sessions:
+                return  # Taken over or broker stopped
+            self.sessions.discard(session)
+            if not session.clean:
+                self.offline[session.client_id] = (session.subscriptions,
+                                                   deque(maxlen=self.offline_queue_size))
+
+    def has_subscriber(self, topic):
+        """Whether a connected client would receive a message on ``topic``"""
+        with self.lock:
+            return any(topic_matches(topic_filter, topic)
+                       for session in self.sessions for topic_filter in session.subscriptions)
+
+    def publish(self, topic, payload, qos=0):
+        with self.lock:
+            targets = []
+            for session in self.sessions:
+                matched = [q for f, q in session.subscriptions.items() if topic_matches(f, topic)]
+                if matched:
+                    targets.append((session, min(qos, max(matched))))
+            if qos:
+                for subscriptions, queue in self.offline.values():
+                    if any(q and topic_matches(f, topic) for f, q in subscriptions.items()):
+                        queue.append((topic, payload))
+            self.messages_routed += 1
+        for session, delivery_qos in targets:
+            try:
+                session.deliver(topic, payload, delivery_qos)
+            except OSError:
+                self.remove_session(session)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        with self.lock:
+            sessions, self.sessions = list(self.sessions), set()
+        for session in sessions:
+            session.close()
+
+
+def main():
+    from aws_config import LOCAL_BROKER_HOST, LOCAL_BROKER_PORT
+    broker = LocalBroker(LOCAL_BROKER_HOST, LOCAL_BROKER_PORT)
+    print(f"🧪 Local MQTT broker listening on {broker.host}:{broker.port}")
+    try:
+        broker.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ Broker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# metrics.py
+# Lightweight Prometheus-style metrics (text exposition format 0.0.4)
+
+import bisect
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    """Monotonically increasing value, optionally per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+        super().__init__(name, description, labels)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        with self.lock:
+            items = list(self.values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, labels)} {value}"
+                                for labels, value in items]
+
+
+class Gauge(Metric):
+    """Current value, either set directly or read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, description, function=None):
+        super().__init__(name, description)
+        self.function = function
+        self.current = 0
+
+    def set(self, value):
+        self.current = value
+
+    def render(self):
+        value = self.current
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                return []
+        return self.header() + [f"{self.name} {value}"]
+
+
+class Histogram(Metric):
+    """Distribution of observations in fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the duration of a block"""
+        return _Timer(self)
+
+    def render(self):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = self.header()
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Dashboard hot-path metrics
+MESSAGES = REGISTRY.register(Counter(
+    "hvac_messages_total", "Sensor readings processed", ["zone"]))
+INVALID_MESSAGES = REGISTRY.register(Counter(
+    "hvac_invalid_messages_total", "Messages that could not be decoded or lacked a zone"))
+DECODE_SECONDS = REGISTRY.register(Histogram(
+    "hvac_decode_seconds", "Time to decode one sensor payload",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)))
+READINGS_PER_MESSAGE = REGISTRY.register(Histogram(
+    "hvac_readings_per_message", "Sensor readings carried by one MQTT message",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)))
+ALERT_EVAL_SECONDS = REGISTRY.register(Histogram(
+    "hvac_alert_evaluation_seconds", "Time to evaluate alert rules for one batch"))
+BATCH_SECONDS = REGISTRY.register(Histogram(
+    "hvac_batch_processing_seconds", "Time to process one ingestion batch"))
+EMIT_SECONDS = REGISTRY.register(Histogram(
+    "hvac_emit_fanout_seconds", "Time to emit one tick of frames to all subscription rooms"))
+RECEIVE_TO_EMIT_SECONDS = REGISTRY.register(Histogram(
+    "hvac_receive_to_emit_seconds", "Time from MQTT receive to Socket.IO emit",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)))
+MQTT_CONNECTS = REGISTRY.register(Counter(
+    "hvac_mqtt_connects_total", "Successful MQTT connections", ["client"]))
+MQTT_RECONNECTS = REGISTRY.register(Counter(
+    "hvac_mqtt_reconnects_total", "MQTT connections after the first one", ["client"]))
+MQTT_DISCONNECTS = REGISTRY.register(Counter(
+    "hvac_mqtt_disconnects_total", "MQTT disconnections", ["client"]))
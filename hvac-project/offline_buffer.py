@@ -0,0 +1,122 @@
+# offline_buffer.py
+# Bounded on-disk ring buffer of sensor readings for store-and-forward publishing
+#
+# While the publisher is offline its readings go into a fixed-size,
+# memory-mapped file instead of being dropped; after the reconnect they are
+# read back in order and published at a controlled rate. Readings keep
+# their original timestamps, and the file survives a restart of the
+# simulator, so an outage leaves no permanent hole in the history.
+
+import json
+import mmap
+import os
+import struct
+import threading
+
+from hvac_logging import get_logger
+
+log = get_logger("offline_buffer")
+
+MAGIC = b"HVOB"
+# magic, capacity, slot size, head (oldest), tail (next write), dropped
+HEADER = struct.Struct("<4sIIQQQ")
+LENGTH = struct.Struct("<H")
+
+
+class OfflineBuffer:
+    """FIFO of readings in a memory-mapped ring of fixed-size slots
+
+    When full, the oldest reading is overwritten (and counted in
+    ``dropped``). ``peek`` + ``commit`` let the reader remove readings
+    only once they have been handed to the broker. Positions are absolute,
+    so a commit never removes readings that arrived after the peek.
+    """
+
+    def __init__(self, path, capacity=20000, slot_size=512):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.lock = threading.Lock()
+        size = HEADER.size + capacity * slot_size
+
+        self.file = open(path, "a+b")
+        self.file.seek(0, os.SEEK_END)
+        existing = self.file.tell()
+        if existing != size:
+            self.file.truncate(size)  # Sparse: disk space is used as slots fill
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+        magic, stored_capacity, stored_slot, head, tail, dropped = HEADER.unpack_from(self.map, 0)
+        if existing == size and magic == MAGIC and (stored_capacity, stored_slot) == (capacity, slot_size):
+            self.head, self.tail, self.dropped = head, tail, dropped
+            if self.count:
+                log.info("📦 %d buffered readings restored from %s", self.count, path)
+        else:
+            if existing:
+                log.warning("⚠️ Offline buffer %s has a different layout, starting empty", path)
+            self.head = self.tail = self.dropped = 0
+            self._write_header()
+
+    @property
+    def count(self):
+        return self.tail - self.head
+
+    def __len__(self):
+        return self.count
+
+    def _write_header(self):
+        HEADER.pack_into(self.map, 0, MAGIC, self.capacity, self.slot_size,
+                         self.head, self.tail, self.dropped)
+
+    def _offset(self, position):
+        return HEADER.size + (position % self.capacity) * self.slot_size
+
+    def append(self, reading):
+        self.extend([reading])
+
+    def extend(self, readings):
+        """Buffer readings, overwriting the oldest ones once full"""
+        records = []
+        for reading in readings:
+            record = json.dumps(reading, separators=(',', ':')).encode()
+            if len(record) > self.slot_size - LENGTH.size:
+                raise ValueError(f"Reading of {len(record)} bytes does not fit a {self.slot_size}-byte slot")
+            records.append(record)
+
+        with self.lock:
+            for record in records:
+                if self.count == self.capacity:
+                    self.head += 1
+                    self.dropped += 1
+                offset = self._offset(self.tail)
+                LENGTH.pack_into(self.map, offset, len(record))
+                self.map[offset + LENGTH.size:offset + LENGTH.size + len(record)] = record
+                self.tail += 1
+            self._write_header()
+
+    def peek(self, limit):
+        """``(end, readings)``: up to ``limit`` of the oldest readings, not yet removed"""
+        with self.lock:
+            end = min(self.tail, self.head + limit)
+            readings = []
+            for position in range(self.head, end):
+                offset = self._offset(position)
+                length = LENGTH.unpack_from(self.map, offset)[0]
+                start = offset + LENGTH.size
+                readings.append(json.loads(self.map[start:start + length]))
+            return end, readings
+
+    def commit(self, end):
+        """Remove the readings before position ``end`` (returned by ``peek``) once sent"""
+        with self.lock:
+            self.head = max(self.head, min(end, self.tail))
+            self._write_header()
+
+    def close(self):
+        with self.lock:
+            self.map.flush()
+            self.map.close()
+            self.file.close()
@@ -0,0 +1,61 @@
+# recorder.py
+# Compact log of raw MQTT messages as the dashboard received them
+#
+# Each record is the receive time, the topic and the untouched payload, so
+# a log can be streamed back through the broker (replay.py) with the same
+# topics, payload encodings, batch sizes and inter-arrival gaps.
+
+import os
+import struct
+import threading
+
+MAGIC = b"HVACREC1"
+# Record header: receive time, topic length, payload length
+RECORD = struct.Struct("<dHI")
+
+
+class MessageRecorder:
+    """Append raw messages to a log file (buffered, safe to call from any thread)"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "ab", buffering=1 << 16)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.count = 0
+
+    def record(self, topic, payload, received_at):
+        topic = topic.encode()
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(RECORD.pack(received_at, len(topic), len(payload)))
+            self.file.write(topic)
+            self.file.write(payload)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def read_log(path):
+    """Yield ``(received_at, topic, payload)`` from a recorded log"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a message log")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return  # End of log (or a record cut short by a crash)
+            received_at, topic_len, payload_len = RECORD.unpack(header)
+            topic = f.read(topic_len)
+            payload = f.read(payload_len)
+            if len(payload) < payload_len:
+                return
+            yield received_at, topic.decode(), payload
@@ -0,0 +1,144 @@
+# replay.py
+# Stream a recorded message log (recorder.py) back through the local broker
+#
+#   python replay.py data/messages.rec --speed 10   # 10x the recorded pace
+#   python replay.py data/messages.rec --speed 0    # as fast as possible
+#
+# Run the dashboard with HVAC_MQTT_TRANSPORT=local to push recorded
+# production traffic through ingestion and alerting, then compare
+# /metrics (ingest latency, batch time, queue depth) between builds.
+
+import argparse
+import itertools
+import threading
+import time
+
+from aws_config import *
+from recorder import read_log
+from transport import create_mqtt_client, broker_address
+from hvac_logging import configure_logging, get_logger
+
+log = get_logger("replay")
+
+
+def replay(path, speed=1.0, qos=1, client_id="hvac-replay",
+           ready=None, ready_timeout=60.0, start_delay=0.0):
+    """Publish every message of the log, keeping the recorded gaps divided by ``speed``
+
+    ``speed=0`` ignores the gaps. The first message waits ``start_delay``
+    seconds and, with ``ready(topic)`` (e.g. ``LocalBroker.has_subscriber``),
+    until it returns True for the first topic; TimeoutError after
+    ``ready_timeout`` seconds. Returns a report dict.
+    """
+    connected = threading.Event()
+    acked = [0]
+
+    def on_connect(client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            connected.set()
+
+    def on_publish(client, userdata, mid, reason_code=None, properties=None):
+        acked[0] += 1
+
+    client = create_mqtt_client(client_id, "local")
+    client.on_connect = on_connect
+    client.on_publish = on_publish
+    client.connect(*broker_address("local"), 60)
+    client.loop_start()
+    if not connected.wait(10):
+        client.loop_stop()
+        raise ConnectionError("Could not connect to the local MQTT broker")
+
+    published = 0
+    max_lag = 0.0
+    first = started = None
+    try:
+        messages = read_log(path)
+        head = next(messages, None)
+        if head is not None:
+            # Nothing is queued for a client that has not subscribed yet
+            deadline = time.time() + ready_timeout
+            while ready is not None and not ready(head[1]):
+                if time.time() > deadline:
+                    raise TimeoutError(f"Nothing subscribed to {head[1]} within {ready_timeout:g}s")
+                time.sleep(0.1)
+            time.sleep(start_delay)
+            messages = itertools.chain([head], messages)
+
+        for received_at, topic, payload in messages:
+            now = time.perf_counter()
+            if first is None:
+                first, started = received_at, now
+            if speed > 0:
+                due = started + (received_at - first) / speed
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    max_lag = max(max_lag, now - due)
+            client.publish(topic, payload, qos=qos)
+            published += 1
+
+        # Wait for the broker to take everything still in flight
+        deadline = time.time() + 30
+        while qos and acked[0] < published and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        client.disconnect()  # Before loop_stop, which otherwise waits out a select timeout
+        client.loop_stop()
+
+    elapsed = (time.perf_counter() - started) if started is not None else 0.0
+    return {
+        'messages': published,
+        'elapsed': round(elapsed, 2),
+        'rate': round(published / elapsed, 1) if elapsed else 0.0,
+        'recorded_span': round(received_at - first, 2) if first is not None else 0.0,
+        'max_lag_ms': round(max_lag * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded MQTT message log through the local broker")
+    parser.add_argument("log", help="Message log written with HVAC_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Playback speed: 1 = recorded pace, 10 = ten times faster, 0 = no waiting")
+    parser.add_argument("--qos", type=int, choices=(0, 1), default=1)
+    parser.add_argument("--with-broker", action="store_true",
+                        help="Run the local MQTT broker in this process (waits for the dashboard to subscribe)")
+    parser.add_argument("--wait", type=float, default=60.0,
+                        help="Seconds to wait for a subscriber with --with-broker")
+    parser.add_argument("--start-delay", type=float, default=0.0,
+                        help="Seconds to wait before the first message (e.g. for a dashboard on another broker)")
+    args = parser.parse_args()
+    configure_logging(LOG_LEVEL, LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_INTERVAL)
+
+    broker = None
+    if args.with_broker:
+        from local_broker import LocalBroker
+        broker = LocalBroker(LOCAL_BROKER_HOST, LOCAL_BROKER_PORT).start()
+        print(f"🧪 Local broker on {LOCAL_BROKER_HOST}:{LOCAL_BROKER_PORT}")
+
+    print(f"⏯️ Replaying {args.log} at {'max' if args.speed <= 0 else f'{args.speed:g}x'} speed")
+    if broker:
+        print("⏳ Waiting for the dashboard to subscribe...")
+    try:
+        report = replay(args.log, args.speed, args.qos,
+                        ready=broker.has_subscriber if broker else None,
+                        ready_timeout=args.wait, start_delay=args.start_delay)
+    except TimeoutError as e:
+        print(f"❌ {e}; is the dashboard running with HVAC_MQTT_TRANSPORT=local?")
+        return
+    except KeyboardInterrupt:
+        print("\n⏹️ Replay stopped")
+        return
+    finally:
+        if broker:
+            broker.stop()
+
+    print(f"📤 {report['messages']} messages in {report['elapsed']}s ({report['rate']} msg/s), "
+          f"recorded over {report['recorded_span']}s")
+    if args.speed > 0:
+        print(f"⏱️  Max lag behind the recorded schedule: {report['max_lag_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# simulation.py
+# Seeded, physically plausible building simulation for the sensor simulator
+#
+# Every zone carries thermal state (air temperature, CO2, humidity,
+# occupancy and the HVAC mode) that evolves with simulated time instead of
+# being redrawn each sample:
+#
+#   - heat leaks towards a daily outdoor temperature cycle, people add heat
+#     and CO2, ventilation pulls CO2 back towards outdoor levels
+#   - occupancy follows a per-zone schedule (office hours, lobby hours,
+#     meetings in conference rooms) with a smooth lag
+#   - a thermostat with hysteresis heats or cools towards its setpoint
+#     (setback outside occupied hours)
+#
+# State is kept column-wise (one array per quantity) and every tick
+# advances all zones in one pass. All randomness comes from one seeded
+# generator and time is simulated, so a seed and start time give the same
+# readings on every run - at any speed, since nothing sleeps.
+
+import datetime
+import math
+import random
+import time
+from array import array
+
+MAX_STEP = 60.0           # seconds per integration sub-step
+OUTDOOR_CO2 = 420.0       # ppm
+
+# Per zone type; a zone uses the first profile whose key is in its id.
+# heat_gain: °C/hour at full occupancy, co2_gain: ppm/hour at full
+# occupancy and no ventilation, tau: hours for the envelope to close ~63%
+# of the indoor/outdoor gap
+PROFILES = {
+    "lobby": {"setpoint": 22.0, "hours": (7, 20), "occupancy": 0.6,
+              "heat_gain": 1.0, "co2_gain": 500.0, "tau": 3.0},
+    "conference": {"setpoint": 21.5, "hours": (8, 18), "occupancy": 1.0,
+                   "heat_gain": 2.5, "co2_gain": 1400.0, "tau": 5.0, "meetings": True},
+    "office": {"setpoint": 22.5, "hours": (8, 18), "occupancy": 0.8,
+               "heat_gain": 1.5, "co2_gain": 800.0, "tau": 4.0},
+}
+DEFAULT_PROFILE = PROFILES["office"]
+
+HVAC_RATES = {"heating": 2.5, "cooling_low": -1.5, "cooling_high": -3.0, "auto": 0.0}  # °C/hour
+VENTILATION = {"heating": 1.5, "cooling_low": 1.5, "cooling_high": 4.0, "auto": 0.8}   # air changes/hour
+SETBACK = 3.5  # °C the setpoint relaxes outside occupied hours
+DEADBAND = 0.8  # °C either side of the setpoint before the HVAC reacts
+
+
+def air_quality(co2):
+    """Air quality label for a CO2 level"""
+    if co2 < 600:
+        return "excellent"
+    if co2 < 800:
+        return "good"
+    if co2 < 1000:
+        return "moderate"
+    return "poor"
+
+
+def profile_for(zone_id):
+    for key, profile in PROFILES.items():
+        if key in zone_id:
+            return profile
+    return DEFAULT_PROFILE
+
+
+def outdoor_temperature(hour):
+    """Daily outdoor cycle: ~14°C before dawn, ~26°C mid-afternoon"""
+    return 20.0 + 6.0 * math.sin(2 * math.pi * (hour - 9.0) / 24.0)
+
+
+class BuildingSimulation:
+    """Time-stepped simulation of all zones of a building
+
+    ``advance(seconds)`` moves simulated time forward; ``readings()``
+    samples the sensors (with a little sensor noise) as reading dicts in
+    the simulator's message format. Unknown zones join on first use.
+    """
+
+    def __init__(self, zone_ids=(), seed=None, start=None, building_id="building"):
+        self.rng = random.Random(seed)
+        self.time = time.time() if start is None else start  # epoch seconds
+        self.building_id = building_id
+        self.index = {}
+        self.zone_ids = []
+        self.profiles = []
+        # Column-wise state, one entry per zone
+        self.temperature = array('d')
+        self.co2 = array('d')
+        self.humidity = array('d')
+        self.occupancy = array('d')
+        self.occupancy_target = array('d')
+        self.mode = []
+        self.hour_seen = None
+        for zone_id in zone_ids:
+            self.add_zone(zone_id)
+
+    def add_zone(self, zone_id):
+        if zone_id in self.index:
+            return self.index[zone_id]
+        profile = profile_for(zone_id)
+        self.index[zone_id] = len(self.zone_ids)
+        self.zone_ids.append(zone_id)
+        self.profiles.append(profile)
+        self.temperature.append(profile["setpoint"] + self.rng.uniform(-1.0, 1.0))
+        self.co2.append(OUTDOOR_CO2 + self.rng.uniform(0, 80))
+        self.humidity.append(self.rng.uniform(42, 55))
+        self.occupancy.append(0.0)
+        self.occupancy_target.append(self._occupancy_target(profile, self._local_time()))
+        self.mode.append("auto")
+        return self.index[zone_id]
+
+    def _local_time(self):
+        return datetime.datetime.fromtimestamp(self.time)
+
+    def _occupancy_target(self, profile, now):
+        opens, closes = profile["hours"]
+        if now.weekday() >= 5 or not opens <= now.hour < closes:
+            return 0.0
+        if profile.get("meetings"):
+            # Each hour is either a meeting or empty
+            return profile["occupancy"] * self.rng.uniform(0.6, 1.0) if self.rng.random() < 0.55 else 0.0
+        return profile["occupancy"] * self.rng.uniform(0.75, 1.0)
+
+    def advance(self, seconds):
+        """Move all zones ``seconds`` of simulated time forward"""
+        while seconds > 0:
+            dt = min(seconds, MAX_STEP)
+            self._step(dt)
+            seconds -= dt
+
+    def _step(self, dt):
+        self.time += dt
+        now = self._local_time()
+        hour = now.hour + now.minute / 60.0
+        if now.hour != self.hour_seen:
+            # New schedule slot: pick each zone's occupancy for the hour
+            self.hour_seen = now.hour
+            for i, profile in enumerate(self.profiles):
+                self.occupancy_target[i] = self._occupancy_target(profile, now)
+
+        hours = dt / 3600.0
+        outdoor = outdoor_temperature(hour)
+        noise = math.sqrt(hours)
+        gauss = self.rng.gauss
+        temperature, co2, humidity = self.temperature, self.co2, self.humidity
+        occupancy, occupancy_target, mode = self.occupancy, self.occupancy_target, self.mode
+        lag = 1.0 - math.exp(-dt / 600.0)  # occupancy settles within ~10 minutes
+
+        for i, profile in enumerate(self.profiles):
+            occ = occupancy[i] + (occupancy_target[i] - occupancy[i]) * lag
+            occ = min(1.0, max(0.0, occ + gauss(0, 0.02) * (occupancy_target[i] > 0)))
+            occupancy[i] = occ
+
+            # Thermostat with hysteresis (wider band when the zone is closed)
+            heat_to = cool_to = profile["setpoint"]
+            if occupancy_target[i] == 0.0:
+                heat_to, cool_to = heat_to - SETBACK, cool_to + SETBACK
+            temp = temperature[i]
+            state = mode[i]
+            if temp > cool_to + DEADBAND or (state.startswith("cooling") and temp > cool_to):
+                state = "cooling_high" if temp > cool_to + 2.5 or co2[i] > 1000 else "cooling_low"
+            elif temp < heat_to - DEADBAND or (state == "heating" and temp < heat_to):
+                state = "heating"
+            else:
+                state = "auto"
+            mode[i] = state
+
+            temperature[i] = temp + hours * ((outdoor - temp) / profile["tau"]
+                                             + profile["heat_gain"] * occ
+                                             + HVAC_RATES[state]) + gauss(0, 0.15) * noise
+
+            ventilation = VENTILATION[state] + 0.5 * (occ > 0)
+            level = co2[i]
+            co2[i] = max(OUTDOOR_CO2, level + hours * (profile["co2_gain"] * occ
+                                                       - ventilation * (level - OUTDOOR_CO2))
+                         + gauss(0, 8) * noise)
+
+            rh = humidity[i]
+            drying = 4.0 if state.startswith("cooling") else 0.0
+            humidity[i] = min(85.0, max(20.0, rh + hours * ((50.0 - rh) / 2.0 + 3.0 * occ - drying)
+                                        + gauss(0, 0.8) * noise))
+
+    def readings(self, zone_ids=None):
+        """Sensor readings of the given zones (all by default) at the current simulated time"""
+        if zone_ids is None:
+            zone_ids = self.zone_ids
+        timestamp = self._local_time().isoformat()
+        gauss = self.rng.gauss
+        batch = []
+        for zone_id in zone_ids:
+            i = self.index.get(zone_id)
+            if i is None:
+                i = self.add_zone(zone_id)
+            co2 = max(OUTDOOR_CO2 - 20, int(round(self.co2[i] + gauss(0, 5))))
+            batch.append({
+                "device_id": f"hvac-sensor-{zone_id}",
+                "zone_id": zone_id,
+                "timestamp": timestamp,
+                "temperature_celsius": round(self.temperature[i] + gauss(0, 0.05), 1),
+                "humidity_percent": round(self.humidity[i] + gauss(0, 0.3), 1),
+                "co2_ppm": co2,
+                "air_quality": air_quality(co2),
+                "hvac_status": self.mode[i],
+                "building_id": self.building_id
+            })
+        return batch
+
+    def step(self, seconds, zone_ids=None):
+        """Advance ``seconds`` and return the readings at the new time"""
+        self.advance(seconds)
+        return self.readings(zone_ids)
+
+    def run(self, duration, interval):
+        """Yield the readings of every ``interval`` seconds for ``duration`` simulated seconds"""
+        for _ in range(int(duration // interval)):
+            yield self.step(interval)
@@ -0,0 +1,113 @@
+# snapshot.py
+# Versioned, pre-encoded JSON snapshots of the dashboard state
+
+import json
+import threading
+import uuid
+
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class SnapshotCache:
+    """Serve the ``/api/data`` / ``initial_data`` snapshot from encoded JSON
+
+    Ingestion marks the zones it touched; the next reader re-encodes only
+    those zones and splices the cached per-zone fragments into one JSON
+    document. Readers arriving together (a reconnect storm) share a single
+    rebuild, and every later reader gets the same string until the
+    version changes.
+
+    ``build_zones(zones)`` returns ``(sensors, zone_stats)`` dicts for the
+    given zones and ``build_globals()`` the remaining top-level keys, with
+    ``alerts`` as a list of alert dicts.
+    """
+
+    def __init__(self, build_zones, build_globals):
+        self.build_zones = build_zones
+        self.build_globals = build_globals
+        self.lock = threading.Lock()        # guards version / dirty marks
+        self.build_lock = threading.Lock()  # one rebuild at a time
+
+        self.boot_id = uuid.uuid4().hex[:8]  # ETags don't survive restarts
+        self.version = 1
+        self.built_version = 0
+        self.dirty_zones = set()
+
+        self.sensor_json = {}       # zone -> encoded {latest, history}
+        self.zone_stats_json = {}   # zone -> encoded running stats
+        self.globals = {}
+        self.globals_json = {}
+        self.body = None
+        self.subsets = {}           # frozenset of zones -> encoded subset snapshot
+
+        self.hits = 0
+        self.rebuilds = 0
+
+    # ---- Invalidation (ingestion side) ----
+
+    def mark_zones(self, zones):
+        """Note that the given zones changed"""
+        with self.lock:
+            self.dirty_zones.update(zones)
+            self.version += 1
+
+    def invalidate(self):
+        """Note a change outside the per-zone data (alerts, connection)"""
+        with self.lock:
+            self.version += 1
+
+    # ---- Reads ----
+
+    def etag(self, version):
+        return f"{self.boot_id}-{version}"
+
+    def get(self, zones=None):
+        """Return ``(version, json_text)`` for all zones or a subset"""
+        with self.build_lock:
+            with self.lock:
+                version = self.version
+                dirty, self.dirty_zones = self.dirty_zones, set()
+            if version != self.built_version:
+                self._rebuild(dirty, version)
+            else:
+                self.hits += 1
+            if zones is None:
+                return version, self.body
+            zones = frozenset(zones)
+            body = self.subsets.get(zones)
+            if body is None:
+                body = self.subsets[zones] = self._compose(zones, version)
+            return version, body
+
+    def _rebuild(self, dirty, version):
+        if dirty:
+            sensors, zone_stats = self.build_zones(dirty)
+            for zone, data in sensors.items():
+                self.sensor_json[zone] = _encode(data)
+            for zone, data in zone_stats.items():
+                self.zone_stats_json[zone] = _encode(data)
+        self.globals = self.build_globals()
+        self.globals_json = {key: _encode(value) for key, value in self.globals.items()}
+        self.body = self._compose(None, version)
+        self.subsets = {}
+        self.built_version = version
+        self.rebuilds += 1
+
+    def _compose(self, zones, version):
+        if zones is None:
+            sensor_zones = self.sensor_json
+            alerts_json = self.globals_json.get('alerts', '[]')
+        else:
+            sensor_zones = [zone for zone in self.sensor_json if zone in zones]
+            alerts_json = _encode([a for a in self.globals.get('alerts', ()) if a['zone'] in zones])
+
+        sensors = ",".join(f"{_encode(zone)}:{self.sensor_json[zone]}" for zone in sensor_zones)
+        zone_stats = ",".join(f"{_encode(zone)}:{self.zone_stats_json[zone]}"
+                              for zone in sensor_zones if zone in self.zone_stats_json)
+        parts = [f'"sensors":{{{sensors}}}', f'"alerts":{alerts_json}',
+                 f'"zone_stats":{{{zone_stats}}}', f'"version":{version}']
+        parts.extend(f"{_encode(key)}:{value}" for key, value in self.globals_json.items()
+                     if key != 'alerts')
+        return "{" + ",".join(parts) + "}"
@@ -0,0 +1,230 @@
+# state.py
+# Thread-safe live dashboard state: per-zone shards and the recent-alerts log
+
+import threading
+from array import array
+from collections import deque
+
+from storage import to_epoch, to_iso
+
+
+class HistoryRing:
+    """Fixed-size ring of a zone's recent readings, stored column-wise
+
+    Like ``storage.Segment``: epoch-second timestamps in an ``array('d')``
+    and float32 ``array('f')`` measurement columns, allocated once. That
+    is 20 bytes per reading instead of a dict holding an ISO string and
+    three floats. ``columns`` hands out zero-copy memoryview slices in time
+    order; history responses convert each column from them in one go
+    instead of indexing the arrays reading by reading.
+    """
+
+    __slots__ = ('capacity', 'ts', 'temperature', 'humidity', 'co2', 'start', 'size')
+
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self.ts = array('d', bytes(8 * self.capacity))
+        self.temperature = array('f', bytes(4 * self.capacity))
+        self.humidity = array('f', bytes(4 * self.capacity))
+        self.co2 = array('f', bytes(4 * self.capacity))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, ts, temperature, humidity, co2):
+        i = (self.start + self.size) % self.capacity
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity  # Overwrite the oldest
+        else:
+            self.size += 1
+        self.ts[i] = ts
+        self.temperature[i] = temperature
+        self.humidity[i] = humidity
+        self.co2[i] = co2
+
+    def extend(self, points):
+        """Append history rows (``timestamp``, ``temperature``, ``humidity``, ``co2`` dicts)"""
+        for point in points:
+            self.append(to_epoch(point['timestamp']), point['temperature'],
+                        point['humidity'], point['co2'])
+
+    def clear(self):
+        self.start = self.size = 0
+
+    def _ranges(self):
+        # Oldest first: one index range, or two once the ring has wrapped
+        end = self.start + self.size
+        if end <= self.capacity:
+            return [(self.start, end)]
+        return [(self.start, self.capacity), (0, end - self.capacity)]
+
+    def columns(self, field):
+        """Zero-copy slices of one column (``ts``, ``temperature``, ...), oldest first"""
+        column = memoryview(getattr(self, field))
+        return [column[a:b] for a, b in self._ranges()]
+
+    def column(self, field):
+        """One column as a list, oldest first (converted in bulk from ``columns``)"""
+        values = []
+        for part in self.columns(field):
+            values.extend(part.tolist())
+        return values
+
+    def rows(self):
+        """The window as history rows (the ``/api/history`` format)"""
+        return [{'timestamp': to_iso(ts),
+                 'temperature': round(temperature, 2),
+                 'humidity': round(humidity, 2),
+                 'co2': int(round(co2))}
+                for ts, temperature, humidity, co2 in zip(self.column('ts'), self.column('temperature'),
+                                                          self.column('humidity'), self.column('co2'))]
+
+    def to_columns(self):
+        """The window column-wise: epoch ``timestamp`` and one list per field"""
+        return {'timestamp': self.column('ts'),
+                'temperature': [round(value, 2) for value in self.column('temperature')],
+                'humidity': [round(value, 2) for value in self.column('humidity')],
+                'co2': [int(round(value)) for value in self.column('co2')]}
+
+
+class ZoneState:
+    """Latest reading and hot history tail of one zone"""
+
+    __slots__ = ('latest', 'history')
+
+    def __init__(self, history_size):
+        self.latest = None
+        self.history = HistoryRing(history_size)
+
+    def to_dict(self):
+        return {'latest': self.latest, 'history': self.history.rows()}
+
+
+class Shard:
+    __slots__ = ('lock', 'zones')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.zones = {}
+
+
+class ShardedState:
+    """Live per-zone state split across independently locked shards
+
+    Writers only lock the shard that holds their zone, so ingestion
+    workers handling different zones don't contend, and readers copy one
+    shard at a time instead of stopping ingestion for a full snapshot.
+    Everything returned to readers is a copy.
+    """
+
+    def __init__(self, history_size=50, num_shards=16):
+        self.history_size = history_size
+        self.shards = [Shard() for _ in range(max(1, num_shards))]
+
+    def _shard(self, zone_id):
+        return self.shards[hash(zone_id) % len(self.shards)]
+
+    def _zone(self, shard, zone_id):
+        state = shard.zones.get(zone_id)
+        if state is None:
+            state = shard.zones[zone_id] = ZoneState(self.history_size)
+        return state
+
+    def record(self, zone_id, data):
+        """Store a zone's latest reading and append it to its history"""
+        # Parse everything first: a malformed reading raises before the zone is touched
+        point = (to_epoch(data['timestamp']), float(data['temperature_celsius']),
+                 float(data['humidity_percent']), float(data['co2_ppm']))
+        shard = self._shard(zone_id)
+        with shard.lock:
+            state = self._zone(shard, zone_id)
+            state.history.append(*point)
+            state.latest = data  # Only once the reading is in the history
+
+    def extend_history(self, zone_id, points):
+        """Append several history points (e.g. restored from storage)"""
+        shard = self._shard(zone_id)
+        with shard.lock:
+            self._zone(shard, zone_id).history.extend(points)
+
+    def replace(self, zone_id, latest, history):
+        """Overwrite a zone's state (e.g. from a full state sync)"""
+        shard = self._shard(zone_id)
+        with shard.lock:
+            state = self._zone(shard, zone_id)
+            state.latest = latest
+            state.history.clear()
+            state.history.extend(history)
+
+    def latest(self, zone_id):
+        shard = self._shard(zone_id)
+        with shard.lock:
+            state = shard.zones.get(zone_id)
+            return state.latest if state else None
+
+    def history(self, zone_id, columns=False):
+        """Copy of a zone's hot history as rows, or column-wise (empty for unknown zones)"""
+        shard = self._shard(zone_id)
+        with shard.lock:
+            state = shard.zones.get(zone_id)
+            if columns:
+                return (state.history if state else HistoryRing(0)).to_columns()
+            return state.history.rows() if state else []
+
+    def zones(self):
+        zone_ids = []
+        for shard in self.shards:
+            with shard.lock:
+                zone_ids.extend(shard.zones)
+        return zone_ids
+
+    def snapshot(self, zones=None):
+        """``{zone: {'latest', 'history'}}`` for all zones or the given ones"""
+        result = {}
+        if zones is None:
+            for shard in self.shards:
+                with shard.lock:
+                    for zone_id, state in shard.zones.items():
+                        result[zone_id] = state.to_dict()
+            return result
+        for zone_id in zones:
+            shard = self._shard(zone_id)
+            with shard.lock:
+                state = shard.zones.get(zone_id)
+                if state is not None:
+                    result[zone_id] = state.to_dict()
+        return result
+
+    def __contains__(self, zone_id):
+        shard = self._shard(zone_id)
+        with shard.lock:
+            return zone_id in shard.zones
+
+
+class AlertLog:
+    """Bounded log of recent alerts, safe to append and read concurrently"""
+
+    def __init__(self, maxlen=20):
+        self.lock = threading.Lock()
+        self.alerts = deque(maxlen=maxlen)
+
+    def append(self, alert):
+        with self.lock:
+            self.alerts.append(alert)
+
+    def replace(self, alerts):
+        with self.lock:
+            self.alerts.clear()
+            self.alerts.extend(alerts)
+
+    def list(self, zones=None):
+        with self.lock:
+            alerts = list(self.alerts)
+        if zones is not None:
+            alerts = [a for a in alerts if a['zone'] in zones]
+        return alerts
+
+    def __len__(self):
+        return len(self.alerts)
@@ -0,0 +1,167 @@
+# stats.py
+# Incremental statistics for the HVAC dashboard (O(1) per reading)
+
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class RunningStats:
+    """Running count/min/max/mean/variance (Welford's algorithm)"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def state(self):
+        return [self.count, self.mean, self.m2, self.min, self.max]
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        stats.count, stats.mean, stats.m2, stats.min, stats.max = state
+        return stats
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.mean, 2),
+            'variance': round(self.variance, 3),
+            'stddev': round(math.sqrt(self.variance), 3)
+        }
+
+
+class SlidingWindowCounter:
+    """Event count over a trailing time window, kept in fixed-width buckets"""
+
+    def __init__(self, window_seconds=600, bucket_seconds=60):
+        self.window = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.buckets = deque()  # [bucket_start, count], oldest first
+        self.total = 0
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self.buckets and self.buckets[0][0] + self.bucket_seconds <= cutoff:
+            self.total -= self.buckets.popleft()[1]
+
+    def add(self, now=None, count=1):
+        now = time.time() if now is None else now
+        start = now - now % self.bucket_seconds
+        if self.buckets and self.buckets[-1][0] == start:
+            self.buckets[-1][1] += count
+        else:
+            self.buckets.append([start, count])
+        self.total += count
+        self._expire(now)
+
+    def state(self):
+        return [list(bucket) for bucket in self.buckets]
+
+    def restore(self, buckets):
+        self.buckets = deque([start, count] for start, count in buckets)
+        self.total = sum(count for _, count in self.buckets)
+
+    def count(self, now=None):
+        self._expire(time.time() if now is None else now)
+        return self.total
+
+
+class StatsEngine:
+    """Dashboard statistics maintained incrementally as readings arrive"""
+
+    FIELDS = {
+        'temperature': 'temperature_celsius',
+        'humidity': 'humidity_percent',
+        'co2': 'co2_ppm'
+    }
+
+    def __init__(self, alert_window_seconds=600):
+        self.lock = threading.Lock()
+        self.total_messages = 0
+        self.last_update = None
+        self.zones_seen = set()
+        self.recent_alerts = SlidingWindowCounter(alert_window_seconds)
+        self.zone_stats = {}  # zone -> {field: RunningStats}
+
+    def record_reading(self, zone_id, data):
+        with self.lock:
+            self.total_messages += 1
+            self.last_update = datetime.now().isoformat()
+            self.zones_seen.add(zone_id)
+
+            fields = self.zone_stats.get(zone_id)
+            if fields is None:
+                fields = self.zone_stats[zone_id] = {f: RunningStats() for f in self.FIELDS}
+            for field, key in self.FIELDS.items():
+                value = data.get(key)
+                if value is not None:
+                    fields[field].update(value)
+
+    def record_alert(self):
+        with self.lock:
+            self.recent_alerts.add()
+
+    def snapshot(self):
+        """Summary counters (the ``stats`` dict sent to clients)"""
+        with self.lock:
+            return {
+                'total_messages': self.total_messages,
+                'connected_zones': len(self.zones_seen),
+                'active_alerts': self.recent_alerts.count(),
+                'last_update': self.last_update
+            }
+
+    def checkpoint(self):
+        """Counters and running statistics for a checkpoint (see ``restore``)"""
+        with self.lock:
+            return {
+                'total_messages': self.total_messages,
+                'last_update': self.last_update,
+                'zones_seen': sorted(self.zones_seen),
+                'recent_alerts': self.recent_alerts.state(),
+                'zone_stats': {zone: {field: stats.state() for field, stats in fields.items()}
+                               for zone, fields in self.zone_stats.items()}
+            }
+
+    def restore(self, state):
+        with self.lock:
+            self.total_messages = state.get('total_messages', 0)
+            self.last_update = state.get('last_update')
+            self.zones_seen = set(state.get('zones_seen', ()))
+            self.recent_alerts.restore(state.get('recent_alerts', ()))
+            self.zone_stats = {zone: {field: RunningStats.from_state(values)
+                                      for field, values in fields.items()}
+                               for zone, fields in state.get('zone_stats', {}).items()}
+
+    def zone_summary(self, zones=None):
+        """Per-zone running min/max/mean/variance for each field"""
+        with self.lock:
+            return {
+                zone: {field: stats.to_dict() for field, stats in fields.items()}
+                for zone, fields in self.zone_stats.items()
+                if zones is None or zone in zones
+            }
@@ -0,0 +1,477 @@
+# storage.py
+# Persistent time-series storage for HVAC sensor history
+
+import abc
+import os
+import sqlite3
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime
+
+from hvac_logging import get_logger
+
+log = get_logger("storage")
+
+# Numeric columns kept for every reading
+FIELDS = ("temperature", "humidity", "co2")
+
+# Precomputed rollup resolutions (name -> bucket width in seconds)
+RESOLUTIONS = {"1m": 60, "15m": 900, "1h": 3600}
+
+
+def to_epoch(timestamp):
+    """Convert an ISO timestamp string (or epoch number) to epoch seconds"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def to_iso(epoch):
+    """Convert epoch seconds back to the ISO format used by the sensors"""
+    return datetime.fromtimestamp(epoch).isoformat()
+
+
+class Segment:
+    """Column-oriented block of readings for a single zone"""
+
+    def __init__(self):
+        self.ts = array('d')
+        self.temperature = array('f')
+        self.humidity = array('f')
+        self.co2 = array('f')
+
+    def __len__(self):
+        return len(self.ts)
+
+    def append(self, ts, temperature, humidity, co2):
+        self.ts.append(ts)
+        self.temperature.append(temperature)
+        self.humidity.append(humidity)
+        self.co2.append(co2)
+
+    def count(self, start=None, end=None):
+        if start is None and end is None:
+            return len(self.ts)
+        return sum(1 for ts in self.ts
+                   if (start is None or ts >= start) and (end is None or ts <= end))
+
+    def rows(self, start=None, end=None, fields=FIELDS):
+        """Yield history rows (dicts) within [start, end]"""
+        for i, ts in enumerate(self.ts):
+            if start is not None and ts < start:
+                continue
+            if end is not None and ts > end:
+                continue
+            row = {'timestamp': to_iso(ts)}
+            if 'temperature' in fields:
+                row['temperature'] = round(self.temperature[i], 2)
+            if 'humidity' in fields:
+                row['humidity'] = round(self.humidity[i], 2)
+            if 'co2' in fields:
+                row['co2'] = int(round(self.co2[i]))
+            yield row
+
+    def rollups(self):
+        """Aggregate this segment into {(resolution, bucket): aggregate}
+
+        An aggregate is a flat list: count, then min/sum/max per field.
+        """
+        aggs = {}
+        columns = (self.temperature, self.humidity, self.co2)
+        for i, ts in enumerate(self.ts):
+            values = [column[i] for column in columns]
+            for resolution, width in RESOLUTIONS.items():
+                key = (resolution, ts - ts % width)
+                agg = aggs.get(key)
+                if agg is None:
+                    agg = [0]
+                    for value in values:
+                        agg += [value, 0.0, value]
+                    aggs[key] = agg
+                agg[0] += 1
+                for f, value in enumerate(values):
+                    base = 1 + f * 3
+                    if value < agg[base]:
+                        agg[base] = value
+                    agg[base + 1] += value
+                    if value > agg[base + 2]:
+                        agg[base + 2] = value
+        return aggs
+
+
+def merge_aggregate(target, other):
+    """Combine two rollup aggregates in place"""
+    target[0] += other[0]
+    for f in range(len(FIELDS)):
+        base = 1 + f * 3
+        target[base] = min(target[base], other[base])
+        target[base + 1] += other[base + 1]
+        target[base + 2] = max(target[base + 2], other[base + 2])
+    return target
+
+
+def aggregate_row(bucket, agg, fields=FIELDS):
+    """Format a rollup aggregate as a history row
+
+    ``<field>`` holds the bucket average so charts can consume raw and
+    rolled-up rows the same way; min/max are added alongside.
+    """
+    row = {'timestamp': to_iso(bucket), 'count': agg[0]}
+    for f, field in enumerate(FIELDS):
+        if field not in fields:
+            continue
+        base = 1 + f * 3
+        row[field] = round(agg[base + 1] / agg[0], 2)
+        row[f'{field}_min'] = round(agg[base], 2)
+        row[f'{field}_max'] = round(agg[base + 2], 2)
+    return row
+
+
+class TimeSeriesStore(abc.ABC):
+    """Base class for history storage backends
+
+    Backends are append-only: ``append`` must be cheap enough to call from
+    the MQTT callback thread, durability is handled by ``flush``. A backend
+    missing any abstract method fails when it is created.
+    """
+
+    @abc.abstractmethod
+    def append(self, zone_id, timestamp, temperature, humidity, co2):
+        """Add one reading (buffered until the next flush)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def query(self, zone_id, start=None, end=None, fields=FIELDS):
+        """Return raw history rows for a zone, oldest first"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def rollup(self, zone_id, resolution, start=None, end=None, fields=FIELDS):
+        """Return min/avg/max rows at a precomputed resolution, oldest first"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count(self, zone_id, start=None, end=None):
+        """Return (an upper bound of) the number of raw readings in range"""
+        raise NotImplementedError
+
+    def tail(self, zone_id, limit):
+        """Return the most recent ``limit`` rows for a zone"""
+        rows = self.query(zone_id)
+        return rows[-limit:]
+
+    @abc.abstractmethod
+    def zones(self):
+        """Return the ids of all zones with stored history"""
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class MemoryStore(TimeSeriesStore):
+    """Non-persistent backend, useful for development and tests"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.segments = defaultdict(Segment)
+        self.aggregates = defaultdict(dict)  # zone -> {(resolution, bucket): agg}
+
+    def append(self, zone_id, timestamp, temperature, humidity, co2):
+        segment = Segment()
+        segment.append(to_epoch(timestamp), temperature, humidity, co2)
+        with self.lock:
+            self.segments[zone_id].append(segment.ts[0], temperature, humidity, co2)
+            aggs = self.aggregates[zone_id]
+            for key, agg in segment.rollups().items():
+                if key in aggs:
+                    merge_aggregate(aggs[key], agg)
+                else:
+                    aggs[key] = agg
+
+    def query(self, zone_id, start=None, end=None, fields=FIELDS):
+        with self.lock:
+            if zone_id not in self.segments:
+                return []
+            return list(self.segments[zone_id].rows(start, end, fields))
+
+    def rollup(self, zone_id, resolution, start=None, end=None, fields=FIELDS):
+        with self.lock:
+            buckets = sorted((bucket, agg) for (res, bucket), agg
+                             in self.aggregates.get(zone_id, {}).items()
+                             if res == resolution
+                             and (start is None or bucket + RESOLUTIONS[res] > start)
+                             and (end is None or bucket <= end))
+        return [aggregate_row(bucket, agg, fields) for bucket, agg in buckets]
+
+    def count(self, zone_id, start=None, end=None):
+        with self.lock:
+            if zone_id not in self.segments:
+                return 0
+            return self.segments[zone_id].count(start, end)
+
+    def zones(self):
+        with self.lock:
+            return list(self.segments.keys())
+
+
+class SQLiteStore(TimeSeriesStore):
+    """SQLite backend storing per-zone columnar segments
+
+    Readings are buffered in memory and written by a background thread as
+    one segment per zone per flush, in a single transaction. The MQTT
+    thread never waits on disk I/O.
+    """
+
+    def __init__(self, path, flush_interval=2.0, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = defaultdict(Segment)
+        self.pending_count = 0
+        self.local = threading.local()
+        self.wakeup = threading.Event()
+        self.running = True
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                zone TEXT NOT NULL,
+                start_ts REAL NOT NULL,
+                end_ts REAL NOT NULL,
+                count INTEGER NOT NULL,
+                ts BLOB NOT NULL,
+                temperature BLOB NOT NULL,
+                humidity BLOB NOT NULL,
+                co2 BLOB NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_segments_zone_end "
+                     "ON segments (zone, end_ts)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollups (
+                resolution TEXT NOT NULL,
+                zone TEXT NOT NULL,
+                bucket REAL NOT NULL,
+                count INTEGER NOT NULL,
+                temperature_min REAL, temperature_sum REAL, temperature_max REAL,
+                humidity_min REAL, humidity_sum REAL, humidity_max REAL,
+                co2_min REAL, co2_sum REAL, co2_max REAL,
+                PRIMARY KEY (resolution, zone, bucket)
+            )
+        """)
+        conn.commit()
+        self._backfill_rollups(conn)
+
+        self.writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer.start()
+
+    def _connection(self):
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def append(self, zone_id, timestamp, temperature, humidity, co2):
+        with self.lock:
+            self.pending[zone_id].append(to_epoch(timestamp), temperature, humidity, co2)
+            self.pending_count += 1
+            full = self.pending_count >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def _writer_loop(self):
+        while self.running:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("❌ Error writing history segments: %s", e)
+
+    def flush(self):
+        """Write all buffered readings as one segment per zone"""
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending_count:
+                    return
+                batch = self.pending
+                self.pending = defaultdict(Segment)
+                self.pending_count = 0
+
+            conn = self._connection()
+            with conn:
+                self._write_segments(conn, batch)
+
+    def _write_segments(self, conn, batch):
+        rows = []
+        for zone_id, segment in batch.items():
+            rows.append((
+                zone_id, min(segment.ts), max(segment.ts), len(segment),
+                segment.ts.tobytes(), segment.temperature.tobytes(),
+                segment.humidity.tobytes(), segment.co2.tobytes()
+            ))
+        conn.executemany(
+            "INSERT INTO segments (zone, start_ts, end_ts, count, ts, "
+            "temperature, humidity, co2) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._write_rollups(conn, batch)
+
+    def _write_rollups(self, conn, batch):
+        """Fold a batch of segments into the rollup tables (upsert)"""
+        rows = []
+        for zone_id, segment in batch.items():
+            for (resolution, bucket), agg in segment.rollups().items():
+                rows.append((resolution, zone_id, bucket, *agg))
+        updates = ", ".join(
+            f"{field}_min = min({field}_min, excluded.{field}_min), "
+            f"{field}_sum = {field}_sum + excluded.{field}_sum, "
+            f"{field}_max = max({field}_max, excluded.{field}_max)"
+            for field in FIELDS
+        )
+        conn.executemany(
+            "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (resolution, zone, bucket) DO UPDATE SET "
+            f"count = count + excluded.count, {updates}",
+            rows
+        )
+
+    def _backfill_rollups(self, conn):
+        """Build rollups for history written before rollups existed"""
+        if conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone():
+            return
+        cursor = conn.execute("SELECT zone, ts, temperature, humidity, co2 FROM segments")
+        with conn:
+            for row in cursor.fetchall():
+                self._write_rollups(conn, {row[0]: self._decode(row[1:])})
+
+    def _decode(self, row):
+        segment = Segment()
+        segment.ts.frombytes(row[0])
+        segment.temperature.frombytes(row[1])
+        segment.humidity.frombytes(row[2])
+        segment.co2.frombytes(row[3])
+        return segment
+
+    def _segment_filter(self, zone_id, start, end):
+        sql = " FROM segments WHERE zone = ?"
+        params = [zone_id]
+        if start is not None:
+            sql += " AND end_ts >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND start_ts <= ?"
+            params.append(end)
+        return sql, params
+
+    def query(self, zone_id, start=None, end=None, fields=FIELDS):
+        where, params = self._segment_filter(zone_id, start, end)
+        sql = "SELECT ts, temperature, humidity, co2" + where + " ORDER BY id"
+
+        rows = []
+        for row in self._connection().execute(sql, params):
+            rows.extend(self._decode(row).rows(start, end, fields))
+
+        with self.lock:
+            if zone_id in self.pending:
+                rows.extend(self.pending[zone_id].rows(start, end, fields))
+
+        rows.sort(key=lambda r: r['timestamp'])
+        return rows
+
+    def count(self, zone_id, start=None, end=None):
+        # Whole-segment counts: cheap, and exact enough to choose a resolution
+        where, params = self._segment_filter(zone_id, start, end)
+        total = self._connection().execute("SELECT SUM(count)" + where, params).fetchone()[0]
+        with self.lock:
+            if zone_id in self.pending:
+                total = (total or 0) + self.pending[zone_id].count(start, end)
+        return total or 0
+
+    def rollup(self, zone_id, resolution, start=None, end=None, fields=FIELDS):
+        width = RESOLUTIONS[resolution]
+        sql = ("SELECT bucket, count, " +
+               ", ".join(f"{f}_min, {f}_sum, {f}_max" for f in FIELDS) +
+               " FROM rollups WHERE resolution = ? AND zone = ?")
+        params = [resolution, zone_id]
+        if start is not None:
+            sql += " AND bucket > ?"
+            params.append(start - width)
+        if end is not None:
+            sql += " AND bucket <= ?"
+            params.append(end)
+
+        buckets = {row[0]: list(row[1:]) for row in self._connection().execute(sql, params)}
+
+        # Readings not yet flushed are folded in on the fly
+        with self.lock:
+            pending = self.pending.get(zone_id)
+            pending_aggs = pending.rollups() if pending is not None else {}
+        for (res, bucket), agg in pending_aggs.items():
+            if res != resolution:
+                continue
+            if (start is not None and bucket + width <= start) or \
+               (end is not None and bucket > end):
+                continue
+            if bucket in buckets:
+                merge_aggregate(buckets[bucket], agg)
+            else:
+                buckets[bucket] = agg
+
+        return [aggregate_row(bucket, buckets[bucket], fields) for bucket in sorted(buckets)]
+
+    def tail(self, zone_id, limit):
+        # Walk segments backwards until we have enough readings
+        with self.lock:
+            rows = list(self.pending[zone_id].rows()) if zone_id in self.pending else []
+
+        cursor = self._connection().execute(
+            "SELECT ts, temperature, humidity, co2 FROM segments "
+            "WHERE zone = ? ORDER BY id DESC", (zone_id,)
+        )
+        for row in cursor:
+            if len(rows) >= limit:
+                break
+            rows = list(self._decode(row).rows()) + rows
+
+        rows.sort(key=lambda r: r['timestamp'])
+        return rows[-limit:]
+
+    def zones(self):
+        zones = {row[0] for row in
+                 self._connection().execute("SELECT DISTINCT zone FROM segments")}
+        with self.lock:
+            zones.update(self.pending.keys())
+        return sorted(zones)
+
+    def close(self):
+        self.running = False
+        self.wakeup.set()
+        self.writer.join(timeout=5)
+        self.flush()
+
+
+def create_store(backend, path=None, flush_interval=2.0, batch_size=500):
+    """Create a history store from configuration"""
+    if backend == "sqlite":
+        return SQLiteStore(path, flush_interval=flush_interval, batch_size=batch_size)
+    if backend == "memory":
+        return MemoryStore()
+    raise ValueError(f"Unknown storage backend: {backend}")
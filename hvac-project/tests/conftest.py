@@ -0,0 +1,24 @@
+# Make the flat modules of hvac-project importable from the tests
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Dashboards created by the tests neither restore nor save a checkpoint
+os.environ.setdefault("HVAC_CHECKPOINT_PATH", "")
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """A local MQTT broker on a free port, used as the configured broker"""
+    import transport
+    from local_broker import LocalBroker
+
+    broker = LocalBroker("127.0.0.1", 0).start()
+    monkeypatch.setattr(transport, 'MQTT_TRANSPORT', "local")
+    monkeypatch.setattr(transport, 'LOCAL_BROKER_HOST', broker.host)
+    monkeypatch.setattr(transport, 'LOCAL_BROKER_PORT', broker.port)
+    yield broker
+    broker.stop()
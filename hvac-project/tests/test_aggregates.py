@@ -0,0 +1,47 @@
+import pytest
+
+from aggregates import AggregateEngine
+
+
+def reading(zone_id, temperature, co2, status='cooling'):
+    return {'zone_id': zone_id, 'building_id': 'hq', 'floor': 1,
+            'temperature_celsius': temperature, 'humidity_percent': 45.0,
+            'co2_ppm': co2, 'hvac_status': status}
+
+
+def test_replacing_a_reading_updates_averages_and_worst_co2():
+    engine = AggregateEngine()
+    engine.record('a', reading('a', 20.0, 900))
+    engine.record('b', reading('b', 24.0, 600, 'heating'))
+    engine.record('a', reading('a', 22.0, 500))
+
+    building = engine.snapshot()['buildings']['hq']
+    assert building['zones'] == 2
+    assert building['temperature_avg'] == 23.0
+    assert building['co2_max'] == 600
+    assert building['co2_max_zone'] == 'b'
+    assert building['hvac_status'] == {'cooling': 1, 'heating': 1}
+    assert building['floors']['1'] == {k: v for k, v in building.items() if k != 'floors'}
+
+
+@pytest.mark.parametrize('bad', [
+    {'temperature_celsius': 'warm'},
+    {'co2_ppm': float('nan')},
+    {'humidity_percent': [45.0]},
+    {'hvac_status': ['cooling']},
+])
+def test_bad_reading_leaves_aggregates_unchanged(bad):
+    engine = AggregateEngine()
+    engine.record('a', reading('a', 20.0, 900))
+    engine.record('b', reading('b', 24.0, 600))
+    before = engine.snapshot()
+
+    with pytest.raises((TypeError, ValueError)):
+        engine.record('a', dict(reading('a', 21.0, 700), **bad))
+    assert engine.snapshot() == before
+
+    engine.record('a', reading('a', 22.0, 500))
+    building = engine.snapshot()['buildings']['hq']
+    assert building['zones'] == 2
+    assert building['temperature_avg'] == 23.0
+    assert building['co2_max'] == 600
@@ -0,0 +1,78 @@
+import threading
+from datetime import datetime, timedelta
+
+from alert_rules import AlertRuleEngine
+
+START = datetime(2026, 3, 2, 9)
+
+CONFIG = {
+    "defaults": {"hysteresis": 1.0, "min_duration": 60, "suppress_seconds": 600},
+    "rules": [
+        {"id": "temperature_high", "field": "temperature_celsius", "op": ">", "threshold": 26,
+         "message": "High temperature: {value}°C"},
+        {"id": "co2_rise", "type": "rate", "field": "co2_ppm", "op": ">", "threshold": 100,
+         "min_duration": 0, "suppress_seconds": 0},
+    ],
+    "zones": {"server_room": {"temperature_high": {"threshold": 24}}}
+}
+
+
+def reading(zone_id, seconds, temperature=22.0, co2=500):
+    return {'zone_id': zone_id, 'timestamp': (START + timedelta(seconds=seconds)).isoformat(),
+            'temperature_celsius': temperature, 'co2_ppm': co2}
+
+
+def feed(engine, zone_id, temperatures, step=30):
+    """Alert types raised per reading of a series 30 s apart"""
+    return [[a['type'] for a in engine.evaluate([reading(zone_id, i * step, t)])]
+            for i, t in enumerate(temperatures)]
+
+
+def test_alert_waits_for_min_duration_and_fires_once():
+    engine = AlertRuleEngine(CONFIG)
+    raised = feed(engine, "lobby", [27, 27, 27, 27, 27])
+    assert raised == [[], [], ['temperature_high'], [], []]
+
+
+def test_hysteresis_keeps_the_alert_active_inside_the_band():
+    engine = AlertRuleEngine(dict(CONFIG, defaults={"hysteresis": 1.0}))
+    # Dipping to 25.5 stays within the band (clears below 25), so no second alert
+    assert feed(engine, "lobby", [27, 25.5, 27]) == [['temperature_high'], [], []]
+    # Dropping below 25 clears it; the next breach alerts again
+    assert feed(engine, "hall", [27, 24.5, 27]) == [['temperature_high'], [], ['temperature_high']]
+
+
+def test_suppression_hides_repeats_within_the_window():
+    engine = AlertRuleEngine(dict(CONFIG, defaults={"suppress_seconds": 600}))
+    raised = feed(engine, "lobby", [27, 20, 27, 20, 27], step=200)
+    assert raised == [['temperature_high'], [], [], [], ['temperature_high']]
+
+
+def test_zone_overrides_and_rate_rules():
+    engine = AlertRuleEngine(dict(CONFIG, defaults={}))
+    assert feed(engine, "server_room", [25]) == [['temperature_high']]
+    assert feed(engine, "lobby", [25]) == [[]]
+
+    alerts = engine.evaluate([reading("lab", 0, co2=500), reading("lab", 60, co2=650)])
+    assert [a['type'] for a in alerts] == ['co2_rise']
+
+
+def test_concurrent_workers_raise_each_alert_once():
+    engine = AlertRuleEngine(dict(CONFIG, defaults={"hysteresis": 1.0}))
+    zones = [f"zone_{i}" for i in range(40)]
+    raised = []
+    barrier = threading.Barrier(4)
+
+    def worker():
+        barrier.wait()
+        for step in range(50):
+            batch = [reading(zone, step * 5, 27.0 if step % 2 else 25.5) for zone in zones]
+            raised.extend(a['zone'] for a in engine.evaluate(batch))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(raised) == sorted(zones)
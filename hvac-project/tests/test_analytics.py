@@ -0,0 +1,48 @@
+import threading
+from datetime import datetime, timedelta
+
+from alert_rules import AlertRuleEngine
+from analytics import StreamingAnalytics
+
+
+def reading(zone_id, when, temperature=22.0):
+    return {'zone_id': zone_id, 'timestamp': when.isoformat(),
+            'temperature_celsius': temperature, 'humidity_percent': 45.0, 'co2_ppm': 500}
+
+
+def test_new_zones_from_several_threads_get_distinct_slots():
+    analytics = StreamingAnalytics(AlertRuleEngine().rules_for)
+    start = datetime(2026, 3, 2, 9)
+    barrier = threading.Barrier(8)
+
+    def feed(worker):
+        barrier.wait()
+        for step in range(20):
+            batch = [reading(f"w{worker}_zone_{z}", start + timedelta(seconds=5 * step))
+                     for z in range(50)]
+            analytics.update(batch)
+
+    threads = [threading.Thread(target=feed, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(analytics.index) == 400
+    assert sorted(analytics.index.values()) == list(range(400))
+    assert len(analytics.last) == 400
+    for model in analytics.models:
+        assert len(model.count) == len(model.level) == len(model.trend) == 400
+        assert all(count == 20 for count in model.count)
+
+
+def test_rising_trend_predicts_threshold_breach():
+    analytics = StreamingAnalytics(AlertRuleEngine().rules_for, min_duration=0)
+    start = datetime(2026, 3, 2, 9)
+    alerts = []
+    for step in range(240):  # 20 minutes at +0.15°C per minute, towards the 26°C rule
+        alerts += analytics.update([reading("lobby", start + timedelta(seconds=5 * step),
+                                            22.0 + 0.0125 * step)])
+    predicted = [a for a in alerts if a['type'] == 'predicted_temperature_high']
+    assert len(predicted) == 1
+    assert predicted[0]['zone'] == "lobby"
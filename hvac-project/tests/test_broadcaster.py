@@ -0,0 +1,67 @@
+from broadcaster import ALL_ZONES_ROOM, DeltaBroadcaster
+
+
+def reading(temperature, co2=600):
+    return {'temperature_celsius': temperature, 'humidity_percent': 45.0, 'co2_ppm': co2}
+
+
+def test_updates_within_a_tick_coalesce_into_changed_fields():
+    broadcaster = DeltaBroadcaster(socketio=None)
+    broadcaster.update('a', reading(20.0))
+    broadcaster.collect_frames()
+
+    broadcaster.update('a', reading(21.0))
+    broadcaster.update('a', reading(22.0, co2=650))
+    frames, _ = broadcaster.collect_frames()
+
+    assert frames == [(ALL_ZONES_ROOM, {'zones': {'a': {'temperature_celsius': 22.0, 'co2_ppm': 650}}})]
+    assert broadcaster.collect_frames() == ([], {})
+
+
+def test_unchanged_reading_sends_no_zone_delta():
+    broadcaster = DeltaBroadcaster(socketio=None)
+    broadcaster.update('a', reading(20.0))
+    broadcaster.collect_frames()
+
+    broadcaster.update('a', reading(20.0))
+    frames, _ = broadcaster.collect_frames()
+    assert frames == []
+
+
+def test_rooms_only_receive_their_zones_and_alerts():
+    broadcaster = DeltaBroadcaster(socketio=None)
+    room, zones = broadcaster.assign_room('sid1', ['a'])
+    assert broadcaster.assign_room('sid2', ['a']) == (room, zones)
+
+    broadcaster.update('a', reading(20.0), received_at=1.0)
+    broadcaster.update('b', reading(25.0), received_at=2.0)
+    broadcaster.add_alert({'zone': 'b', 'message': 'hot'})
+    frames, received_at = broadcaster.collect_frames()
+    frames = dict(frames)
+
+    assert set(frames[room]['zones']) == {'a'}
+    assert 'alerts' not in frames[room]
+    assert set(frames[ALL_ZONES_ROOM]['zones']) == {'a', 'b'}
+    assert frames[ALL_ZONES_ROOM]['alerts'] == [{'zone': 'b', 'message': 'hot'}]
+    assert received_at == {'a': 1.0, 'b': 2.0}
+
+
+def test_released_room_stops_receiving_frames():
+    broadcaster = DeltaBroadcaster(socketio=None)
+    room, _ = broadcaster.assign_room('sid1', ['a'])
+    assert broadcaster.release_room('sid1') == room
+    assert broadcaster.zones_for('sid1') is None
+
+    broadcaster.update('a', reading(20.0))
+    frames, _ = broadcaster.collect_frames()
+    assert [r for r, _ in frames] == [ALL_ZONES_ROOM]
+
+
+def test_stats_frame_carries_only_changed_counters():
+    broadcaster = DeltaBroadcaster(socketio=None)
+    broadcaster.update_stats({'received': 1, 'dropped': 0})
+    broadcaster.collect_frames()
+
+    broadcaster.update_stats({'received': 5, 'dropped': 0})
+    frames, _ = broadcaster.collect_frames()
+    assert frames == [(ALL_ZONES_ROOM, {'stats': {'received': 5}})]
@@ -0,0 +1,27 @@
+from checkpoint import load_checkpoint, save_checkpoint
+from stats import StatsEngine
+
+
+def test_stats_round_trip_through_checkpoint(tmp_path):
+    stats = StatsEngine(alert_window_seconds=600)
+    for temperature in (21.0, 22.5, 24.0):
+        stats.record_reading("lobby", {'temperature_celsius': temperature,
+                                       'humidity_percent': 45.0, 'co2_ppm': 600})
+    for _ in range(4):
+        stats.record_alert()
+
+    path = str(tmp_path / "checkpoint.json.gz")
+    save_checkpoint(path, {'stats': stats.checkpoint()})
+    restored = StatsEngine(alert_window_seconds=600)
+    restored.restore(load_checkpoint(path)['stats'])
+
+    assert restored.snapshot() == stats.snapshot()
+    assert restored.snapshot()['active_alerts'] == 4
+    assert restored.zone_summary() == stats.zone_summary()
+
+
+def test_unreadable_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / "checkpoint.json.gz"
+    path.write_bytes(b"not a checkpoint")
+    assert load_checkpoint(str(path)) is None
+    assert load_checkpoint(str(tmp_path / "missing.json.gz")) is None
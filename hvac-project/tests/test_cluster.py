@@ -0,0 +1,28 @@
+import dashboard_core
+from app import ReplicaDashboard
+
+
+def test_web_workers_open_no_store_or_recording(tmp_path, monkeypatch):
+    monkeypatch.setattr(dashboard_core, 'STORAGE_PATH', str(tmp_path / "history.db"))
+    monkeypatch.setattr(dashboard_core, 'RECORD_PATH', str(tmp_path / "messages.rec"))
+    replica = ReplicaDashboard()
+    replica.open_resources()
+
+    assert replica.store is None and replica.recorder is None
+    assert list(tmp_path.iterdir()) == []
+    body, status, _ = replica.query_history('lobby', {'start': '0'})
+    assert status == 503
+    assert replica.query_history('lobby', {})[1] == 200
+
+
+def test_only_the_ingestion_process_gets_the_record_path(monkeypatch):
+    import cluster
+    launched = {}
+    monkeypatch.setenv("HVAC_RECORD_PATH", "data/messages.rec")
+    monkeypatch.setattr(cluster.subprocess, 'Popen',
+                        lambda args, cwd, env: launched.setdefault(env['HVAC_ROLE'], env))
+    cluster.spawn("ingest", 5000, ".")
+    cluster.spawn("web", 5001, ".")
+
+    assert launched['ingest']['HVAC_RECORD_PATH'] == "data/messages.rec"
+    assert 'HVAC_RECORD_PATH' not in launched['web']
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from codec import (BATCH_MAGIC, COMPACT, COMPACT_MAGIC, JSON, decode_payload, decode_readings,
+                   encode_batch, encode_payload)
+
+READING = {
+    "device_id": "hvac-sensor-lobby",
+    "zone_id": "lobby",
+    "timestamp": "2026-03-02T09:00:05.250000",
+    "temperature_celsius": 22.4,
+    "humidity_percent": 45.1,
+    "co2_ppm": 612,
+    "air_quality": "good",
+    "hvac_status": "cooling_low",
+    "building_id": "smart-office-tlv"
+}
+
+
+def readings():
+    return [READING,
+            dict(READING, zone_id="לובי_2", device_id="thermostat-7", building_id="annex",
+                 temperature_celsius=-3.5, air_quality="unknown", hvac_status=None)]
+
+
+def test_compact_record_round_trip():
+    payload = encode_payload(READING, COMPACT)
+    assert payload[0] == COMPACT_MAGIC
+    assert len(payload) < len(encode_payload(READING, JSON).encode()) / 5
+    assert decode_payload(payload) == READING
+    assert decode_readings(payload) == [READING]
+
+
+def test_compact_batch_round_trip():
+    payload = encode_batch(readings(), COMPACT, "gw-1")
+    assert payload[0] == BATCH_MAGIC
+    decoded = decode_readings(payload)
+    assert decoded[0] == READING
+    assert decoded[1]['zone_id'] == "לובי_2"
+    assert decoded[1]['device_id'] == "thermostat-7"
+    assert decoded[1]['building_id'] == "annex"
+    assert decoded[1]['temperature_celsius'] == -3.5
+    assert decoded[1]['air_quality'] is None and decoded[1]['hvac_status'] is None
+
+
+def test_json_single_and_batch():
+    assert decode_readings(encode_payload(READING).encode()) == [READING]
+    payload = encode_batch(readings(), JSON, "gw-1")
+    assert json.loads(payload)['gateway_id'] == "gw-1"
+    assert decode_readings(payload.encode()) == readings()
+
+
+@pytest.mark.parametrize('payload', [encode_payload(dict(READING, building_id="annex",
+                                                         device_id="thermostat-7"), COMPACT),
+                                     encode_batch(readings(), COMPACT)],
+                         ids=['record', 'batch'])
+def test_truncated_frames_are_rejected(payload):
+    for length in range(1, len(payload)):
+        with pytest.raises(ValueError):
+            decode_readings(payload[:length])
+
+
+def test_unknown_version_and_format_are_rejected():
+    payload = bytearray(encode_payload(READING, COMPACT))
+    payload[1] = 99
+    with pytest.raises(ValueError, match="version 99"):
+        decode_readings(bytes(payload))
+    with pytest.raises(ValueError):
+        encode_payload(READING, "xml")
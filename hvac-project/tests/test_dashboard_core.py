@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from broadcaster import DeltaBroadcaster
+from dashboard_core import DashboardCore, parse_reading
+
+TOPIC = "hvac/building/sensors/lobby"
+
+
+def reading(**overrides):
+    data = {'zone_id': 'atrium', 'building_id': 'hq', 'timestamp': '2026-03-02T09:00:00',
+            'temperature_celsius': 22.5, 'humidity_percent': 45.0, 'co2_ppm': 600}
+    data.update(overrides)
+    return data
+
+
+@pytest.fixture
+def dashboard():
+    return DashboardCore(DeltaBroadcaster(socketio=None))
+
+
+@pytest.mark.parametrize('bad', [
+    {'co2_ppm': None},
+    {'timestamp': 'yesterday'},
+    {'timestamp': ['2026-03-02T09:00:00']},
+    {'temperature_celsius': 'warm'},
+    {'humidity_percent': float('inf')},
+    {'co2_ppm': {'value': 600}},
+])
+def test_rejected_reading_leaves_no_trace(dashboard, bad):
+    before = dashboard.aggregates.snapshot()
+    processed = dashboard.process_message(TOPIC, json.dumps(reading(**bad)).encode())
+
+    assert processed == []
+    assert 'atrium' not in dashboard.registry
+    assert 'atrium' not in dashboard.sensor_data
+    assert dashboard.aggregates.snapshot() == before
+    assert dashboard.stats_engine.zone_summary() == {}
+
+
+def test_numeric_strings_are_converted_once(dashboard):
+    batch = {'gateway_id': 'gw', 'readings': [
+        reading(temperature_celsius='23.5', co2_ppm='700'),
+        reading(zone_id='hall', humidity_percent='damp'),
+    ]}
+    processed = dashboard.process_message(TOPIC, json.dumps(batch).encode())
+
+    assert [data['zone_id'] for data in processed] == ['atrium']
+    assert processed[0]['temperature_celsius'] == 23.5
+    assert processed[0]['co2_ppm'] == 700.0
+    assert dashboard.sensor_data.latest('atrium') == processed[0]
+    assert dashboard.aggregates.snapshot()['buildings']['hq']['temperature_avg'] == 23.5
+    assert 'hall' not in dashboard.registry
+
+
+def test_parse_reading_does_not_modify_its_input():
+    data = reading(co2_ppm='650')
+    assert parse_reading(data)['co2_ppm'] == 650.0
+    assert data['co2_ppm'] == '650'
+
+
+def test_live_history_in_rows_or_columns(dashboard):
+    dashboard.process_message(TOPIC, json.dumps(reading(co2_ppm=640)).encode())
+
+    rows, status, _ = dashboard.query_history('atrium', {})
+    assert status == 200 and rows[0]['co2'] == 640
+    columns, status, _ = dashboard.query_history('atrium', {'format': 'columns'})
+    assert status == 200 and columns['co2'] == [640]
+    assert dashboard.query_history('atrium', {'format': 'csv'})[1] == 400
+
+
+def test_auto_resolution_keeps_responses_small(dashboard, monkeypatch):
+    import dashboard_core
+    from storage import MemoryStore
+
+    monkeypatch.setattr(dashboard_core, 'HISTORY_MAX_POINTS', 50)
+    dashboard.store = MemoryStore()
+    base = 472222 * 3600
+    for i in range(360):  # Two hours, every 20 s
+        dashboard.store.append('lobby', base + 20 * i, 22.0, 45.0, 600)
+
+    def query(**args):
+        body, status, resolution = dashboard.query_history('lobby', args)
+        assert status == 200
+        return len(body), resolution
+
+    assert query(start=str(base), end=str(base + 600)) == (31, 'raw')
+    assert query(start=str(base), end=str(base + 7200)) == (8, '15m')  # 120 minutes > 50
+    assert query(start=str(base), end=str(base + 7200), resolution='1m') == (120, '1m')
+    assert dashboard.query_history('lobby', {'resolution': '5m'})[1] == 400
+    assert dashboard.query_history('lobby', {'fields': 'pressure'})[1] == 400
+    assert dashboard.query_history('lobby', {'start': 'soon'})[1] == 400
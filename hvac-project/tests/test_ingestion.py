@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from ingestion import SPILL_HEADER, IngestionPipeline, PartitionedPipeline, SpillFile
+
+
+class Handler:
+    """Records batches; holds the worker inside the first batch until released"""
+
+    def __init__(self, hold=False):
+        self.batches = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self, batch):
+        self.entered.set()
+        self.release.wait()
+        self.batches.append([payload for _, payload, _ in batch])
+
+    def payloads(self):
+        return [payload for batch in self.batches for payload in batch]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def busy_pipeline(policy, **kwargs):
+    """A pipeline whose worker is stuck in the first message's batch"""
+    handler = Handler(hold=True)
+    pipeline = IngestionPipeline(handler, max_size=2, batch_size=10, policy=policy, **kwargs)
+    pipeline.submit("t", b"m0")
+    assert handler.entered.wait(5)
+    return pipeline, handler
+
+
+def test_drop_oldest_keeps_the_newest_messages():
+    pipeline, handler = busy_pipeline("drop_oldest")
+    for i in range(1, 6):
+        pipeline.submit("t", f"m{i}".encode())
+    handler.release.set()
+    wait_for(lambda: pipeline.processed == 3)
+    assert handler.payloads() == [b"m0", b"m4", b"m5"]
+    assert pipeline.get_stats()['dropped'] == 3
+
+
+def test_block_waits_for_room_instead_of_dropping():
+    pipeline, handler = busy_pipeline("block")
+    submitter = threading.Thread(target=lambda: [pipeline.submit("t", f"m{i}".encode())
+                                                 for i in range(1, 6)])
+    submitter.start()
+    time.sleep(0.1)
+    assert submitter.is_alive()  # The queue is full
+    handler.release.set()
+    submitter.join(5)
+    wait_for(lambda: pipeline.processed == 6)
+    assert handler.payloads() == [f"m{i}".encode() for i in range(6)]
+    assert pipeline.get_stats()['dropped'] == 0
+
+
+def test_spill_keeps_order_and_drains(tmp_path):
+    pipeline, handler = busy_pipeline("spill", spill_path=str(tmp_path / "spill.log"))
+    for i in range(1, 8):
+        pipeline.submit("t", f"m{i}".encode())
+    assert pipeline.get_stats()['spill_depth'] == 5
+    handler.release.set()
+    wait_for(lambda: pipeline.processed == 8)
+    assert handler.payloads() == [f"m{i}".encode() for i in range(8)]
+    assert (tmp_path / "spill.log").stat().st_size == 0
+
+
+def test_spilled_messages_survive_a_restart(tmp_path):
+    path = str(tmp_path / "spill.log")
+    pipeline, handler = busy_pipeline("spill", spill_path=path)
+    for i in range(1, 6):
+        pipeline.submit("t", f"m{i}".encode())
+    pipeline.spill.writer.flush()  # The process dies here, m3-m5 only on disk
+
+    handler = Handler()
+    restarted = IngestionPipeline(handler, max_size=2, policy="spill", spill_path=path)
+    wait_for(lambda: restarted.processed == 3)
+    assert handler.payloads() == [b"m3", b"m4", b"m5"]
+
+
+def test_spill_resumes_after_the_handled_messages(tmp_path):
+    path = str(tmp_path / "spill.log")
+    spill = SpillFile(path)
+    for i in range(5):
+        spill.write(("t", f"m{i}".encode(), float(i)))
+    assert [p for _, p, _ in spill.read(2)] == [b"m0", b"m1"]
+    spill.commit()
+    spill.read(1)  # Read but not handled before the crash
+    spill.writer.write(SPILL_HEADER.pack(9.0, 1, 100) + b"t" + b"torn")
+    spill.close()
+
+    reopened = SpillFile(path)
+    assert reopened.count == 3
+    assert reopened.read(10) == [("t", b"m2", 2.0), ("t", b"m3", 3.0), ("t", b"m4", 4.0)]
+    reopened.commit()
+    reopened.close()
+    assert SpillFile(path).count == 0
+
+
+def test_partitions_keep_each_topic_in_order():
+    handler = Handler()
+    pipeline = PartitionedPipeline(handler, partitions=3)
+    for i in range(30):
+        pipeline.submit(f"zone_{i % 5}", f"{i % 5}:{i}".encode())
+    wait_for(lambda: pipeline.processed == 30)
+    for zone in range(5):
+        sequence = [int(p.split(b":")[1]) for p in handler.payloads() if p.startswith(b"%d:" % zone)]
+        assert sequence == sorted(sequence) and len(sequence) == 6
+
+
+def test_spill_policy_needs_a_path():
+    with pytest.raises(ValueError):
+        IngestionPipeline(Handler(), policy="spill")
@@ -0,0 +1,54 @@
+from offline_buffer import OfflineBuffer
+
+
+def reading(n):
+    return {'zone_id': 'a', 'timestamp': f't{n}', 'temperature_celsius': 20.0 + n}
+
+
+def test_full_ring_overwrites_the_oldest(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path / 'buffer.bin'), capacity=4, slot_size=128)
+    buffer.extend(reading(n) for n in range(6))
+
+    assert buffer.count == 4
+    assert buffer.dropped == 2
+    end, readings = buffer.peek(10)
+    assert [r['timestamp'] for r in readings] == ['t2', 't3', 't4', 't5']
+    buffer.close()
+
+
+def test_commit_only_removes_what_was_peeked(tmp_path):
+    buffer = OfflineBuffer(str(tmp_path / 'buffer.bin'), capacity=8, slot_size=128)
+    buffer.extend(reading(n) for n in range(3))
+    end, readings = buffer.peek(2)
+    buffer.extend([reading(3)])
+    buffer.commit(end)
+
+    assert [r['timestamp'] for r in readings] == ['t0', 't1']
+    assert [r['timestamp'] for r in buffer.peek(10)[1]] == ['t2', 't3']
+    buffer.close()
+
+
+def test_readings_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'buffer.bin')
+    buffer = OfflineBuffer(path, capacity=4, slot_size=128)
+    buffer.extend(reading(n) for n in range(5))
+    buffer.commit(buffer.peek(1)[0])
+    buffer.close()
+
+    buffer = OfflineBuffer(path, capacity=4, slot_size=128)
+    assert buffer.count == 3
+    assert buffer.dropped == 1
+    assert [r['timestamp'] for r in buffer.peek(10)[1]] == ['t2', 't3', 't4']
+    buffer.close()
+
+
+def test_different_layout_starts_empty(tmp_path):
+    path = str(tmp_path / 'buffer.bin')
+    buffer = OfflineBuffer(path, capacity=4, slot_size=128)
+    buffer.extend([reading(0)])
+    buffer.close()
+
+    buffer = OfflineBuffer(path, capacity=8, slot_size=128)
+    assert buffer.count == 0
+    assert buffer.peek(10) == (0, [])
+    buffer.close()
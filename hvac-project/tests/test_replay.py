@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from recorder import MessageRecorder
+from replay import replay
+from transport import create_mqtt_client, broker_address
+
+TOPIC = "hvac/building/sensors/lobby"
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / "messages.rec")
+    recorder = MessageRecorder(path)
+    for i in range(20):
+        recorder.record(TOPIC, f"m{i}".encode(), 1000.0 + i * 0.01)
+    recorder.close()
+    return path
+
+
+def test_replay_waits_for_a_late_subscriber(broker, recording):
+    received = []
+
+    def subscribe_later():
+        time.sleep(0.5)  # The dashboard is still (re)connecting when the replay starts
+        client = create_mqtt_client("late-dashboard", "local")
+        client.on_message = lambda c, u, msg: received.append(msg.payload)
+        client.on_connect = lambda c, *args: c.subscribe("hvac/building/sensors/+", qos=1)
+        client.connect(*broker_address("local"))
+        client.loop_start()
+        return client
+
+    result = {}
+    subscriber = threading.Thread(target=lambda: result.setdefault('client', subscribe_later()))
+    subscriber.start()
+    report = replay(recording, speed=0, ready=broker.has_subscriber, ready_timeout=10)
+    subscriber.join()
+
+    deadline = time.time() + 5
+    while len(received) < 20 and time.time() < deadline:
+        time.sleep(0.05)
+    result['client'].disconnect()
+    result['client'].loop_stop()
+    assert report['messages'] == 20
+    assert received == [f"m{i}".encode() for i in range(20)]
+
+
+def test_replay_without_a_subscriber_times_out(broker, recording):
+    with pytest.raises(TimeoutError):
+        replay(recording, speed=0, ready=broker.has_subscriber, ready_timeout=0.3)
@@ -0,0 +1,48 @@
+import json
+import time
+
+from hvac_aws_simulator import HVACAWSSimulator
+from storage import to_epoch
+
+
+def test_load_test_readings_are_not_stamped_ahead_of_the_clock(broker, monkeypatch):
+    arrivals = []
+    publish = broker.publish
+
+    def record(topic, payload, qos=0):
+        arrivals.append((time.time(), payload))
+        publish(topic, payload, qos)
+
+    monkeypatch.setattr(broker, 'publish', record)
+    simulator = HVACAWSSimulator(seed=1)
+    report = simulator.run_load_test(num_zones=20, rate=100, connections=2, duration_seconds=1)
+
+    assert report['published'] == len(arrivals) > 50
+    for received_at, payload in arrivals:
+        assert to_epoch(json.loads(payload)['timestamp']) <= received_at
+
+
+def test_simulated_time_runs_from_the_start_time():
+    start = time.time() - 30 * 24 * 3600
+    simulator = HVACAWSSimulator(seed=1, start=start)
+    first = to_epoch(simulator.generate_sensor_data("lobby")['timestamp'])
+    time.sleep(0.05)
+    second = to_epoch(simulator.generate_sensor_data("lobby")['timestamp'])
+
+    assert start <= first < start + 1  # No catching up to the wall clock
+    assert first < second < first + 1
+
+
+def test_readings_from_a_future_start_move_forward():
+    simulator = HVACAWSSimulator(seed=1, start=time.time() + 3600)
+    first = simulator.generate_sensor_data("lobby")['timestamp']
+    time.sleep(0.05)
+    assert to_epoch(simulator.generate_sensor_data("lobby")['timestamp']) > to_epoch(first)
+
+
+def test_accelerated_run_without_start_ends_now(broker):
+    simulator = HVACAWSSimulator(seed=1)
+    report = simulator.run_accelerated(hours=1, interval_seconds=60)
+
+    assert report['ticks'] == 60
+    assert time.time() - 5 < simulator.engine.time <= time.time()
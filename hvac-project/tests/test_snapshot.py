@@ -0,0 +1,92 @@
+import json
+import time
+
+import pytest
+
+from snapshot import SnapshotCache
+
+
+class Source:
+    """Dashboard stand-in that counts which zones get re-encoded"""
+
+    def __init__(self):
+        self.sensors = {'lobby': {'latest': {'co2_ppm': 600}, 'history': []},
+                        'hall': {'latest': {'co2_ppm': 700}, 'history': []}}
+        self.alerts = [{'zone': 'hall', 'type': 'co2_high'}]
+        self.built = []
+
+    def build_zones(self, zones):
+        self.built.append(set(zones))
+        return ({zone: self.sensors[zone] for zone in zones},
+                {zone: {'count': 1} for zone in zones})
+
+    def build_globals(self):
+        return {'alerts': self.alerts, 'stats': {'total_messages': 2}, 'connected': True}
+
+
+@pytest.fixture
+def source():
+    return Source()
+
+
+@pytest.fixture
+def cache(source):
+    cache = SnapshotCache(source.build_zones, source.build_globals)
+    cache.mark_zones(source.sensors)
+    return cache
+
+
+def test_unchanged_snapshot_is_served_from_cache(cache, source):
+    version, body = cache.get()
+    assert json.loads(body) == {'sensors': source.sensors, 'alerts': source.alerts,
+                                'zone_stats': {'lobby': {'count': 1}, 'hall': {'count': 1}},
+                                'version': version, 'stats': {'total_messages': 2},
+                                'connected': True}
+    assert cache.get() == (version, body)
+    assert (cache.rebuilds, cache.hits) == (1, 1)
+
+
+def test_only_changed_zones_are_reencoded(cache, source):
+    version, _ = cache.get()
+    source.sensors['lobby']['latest']['co2_ppm'] = 650
+    cache.mark_zones(['lobby'])
+    new_version, body = cache.get()
+
+    assert new_version > version
+    assert source.built[-1] == {'lobby'}
+    assert json.loads(body)['sensors']['lobby']['latest']['co2_ppm'] == 650
+
+
+def test_zone_subsets_carry_only_their_alerts(cache):
+    _, body = cache.get(['lobby'])
+    data = json.loads(body)
+    assert list(data['sensors']) == ['lobby']
+    assert data['alerts'] == []
+    assert json.loads(cache.get(['hall'])[1])['alerts'] == [{'zone': 'hall', 'type': 'co2_high'}]
+
+
+def test_etags_change_with_the_version_and_the_process(cache, source):
+    version, _ = cache.get()
+    cache.invalidate()
+    assert cache.get()[0] == version + 1
+    assert cache.etag(version) != cache.etag(version + 1)
+    assert cache.etag(version) != SnapshotCache(source.build_zones, source.build_globals).etag(version)
+
+
+def test_api_data_answers_304_until_the_data_changes(monkeypatch):
+    import app
+    monkeypatch.setattr(app.dashboard, 'started', True)  # No MQTT, store or threads
+    client = app.app.test_client()
+
+    first = client.get('/api/data')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+    again = client.get('/api/data', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+
+    app.dashboard.process_batch([("hvac/building/sensors/lobby", json.dumps({
+        'zone_id': 'lobby', 'timestamp': '2026-03-02T09:00:00', 'temperature_celsius': 22.0,
+        'humidity_percent': 45.0, 'co2_ppm': 600}).encode(), time.time())])
+    changed = client.get('/api/data', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert json.loads(changed.data)['sensors']['lobby']['latest']['co2_ppm'] == 600
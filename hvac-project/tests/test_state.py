@@ -0,0 +1,70 @@
+import pytest
+
+from state import HistoryRing, ShardedState
+from storage import to_epoch
+
+
+def reading(**overrides):
+    data = {'zone_id': 'lobby', 'timestamp': '2026-03-02T09:00:00',
+            'temperature_celsius': 22.5, 'humidity_percent': 45.0, 'co2_ppm': 600}
+    data.update(overrides)
+    return data
+
+
+@pytest.mark.parametrize('bad', [
+    {'timestamp': 'not a time'},
+    {'temperature_celsius': 'warm'},
+    {'co2_ppm': None},
+])
+def test_malformed_reading_leaves_no_trace(bad):
+    state = ShardedState(history_size=5, num_shards=2)
+    with pytest.raises((KeyError, TypeError, ValueError)):
+        state.record('lobby', reading(**bad))
+    assert state.zones() == []
+    assert state.latest('lobby') is None
+
+
+def test_malformed_reading_keeps_previous_state():
+    state = ShardedState(history_size=5, num_shards=2)
+    good = reading()
+    state.record('lobby', good)
+    with pytest.raises(ValueError):
+        state.record('lobby', reading(timestamp='2026-03-02T09:00:05', humidity_percent='damp'))
+    assert state.latest('lobby') is good
+    assert len(state.history('lobby')) == 1
+
+
+def test_ring_keeps_the_newest_readings_in_order_after_wrapping():
+    ring = HistoryRing(4)
+    for i in range(10):
+        ring.append(1000.0 + i, 20.0 + i, 40.0 + i, 500.0 + i)
+
+    assert len(ring) == 4
+    assert [len(part) for part in ring.columns('ts')] == [2, 2]  # Wrapped: two slices
+    assert ring.column('ts') == [1006.0, 1007.0, 1008.0, 1009.0]
+    assert ring.to_columns() == {'timestamp': [1006.0, 1007.0, 1008.0, 1009.0],
+                                 'temperature': [26.0, 27.0, 28.0, 29.0],
+                                 'humidity': [46.0, 47.0, 48.0, 49.0],
+                                 'co2': [506, 507, 508, 509]}
+    assert [row['co2'] for row in ring.rows()] == [506, 507, 508, 509]
+
+
+def test_columns_are_views_of_the_ring():
+    ring = HistoryRing(3)
+    ring.append(1000.0, 21.5, 45.0, 600.0)
+    (view,) = ring.columns('temperature')
+    ring.temperature[0] = 23.0
+    assert view[0] == 23.0
+
+
+def test_history_rows_and_columns_agree():
+    state = ShardedState(history_size=3, num_shards=2)
+    for second in range(5):
+        state.record('lobby', reading(timestamp=f'2026-03-02T09:00:0{second}', co2_ppm=600 + second))
+
+    rows = state.history('lobby')
+    columns = state.history('lobby', columns=True)
+    assert [row['co2'] for row in rows] == columns['co2'] == [602, 603, 604]
+    assert [to_epoch(row['timestamp']) for row in rows] == columns['timestamp']
+    assert state.history('hall', columns=True) == {'timestamp': [], 'temperature': [],
+                                                   'humidity': [], 'co2': []}
@@ -0,0 +1,84 @@
+import pytest
+
+from storage import MemoryStore, SQLiteStore, TimeSeriesStore, to_epoch
+
+
+def test_incomplete_backend_fails_on_creation():
+    class NoRollups(TimeSeriesStore):
+        def append(self, zone_id, timestamp, temperature, humidity, co2):
+            pass
+
+        def query(self, zone_id, start=None, end=None, fields=()):
+            return []
+
+        def count(self, zone_id, start=None, end=None):
+            return 0
+
+        def zones(self):
+            return []
+
+    with pytest.raises(TypeError, match="rollup"):
+        NoRollups()
+
+
+def test_backends_implement_the_interface(tmp_path):
+    stores = [MemoryStore(), SQLiteStore(str(tmp_path / "history.db"))]
+    for store in stores:
+        store.append("lobby", "2026-03-02T09:00:00", 22.5, 45.0, 600)
+        store.flush()
+        assert store.zones() == ["lobby"]
+        assert store.count("lobby") == 1
+        store.close()
+
+
+BASE = 472222 * 3600  # On an hour boundary
+
+
+def fill(store, start=0, end=360):
+    """Readings every 20 s; temperature cycles 20, 21, 22 within each minute"""
+    for i in range(start, end):
+        store.append("lobby", BASE + 20 * i, 20.0 + i % 3, 40.0 + i % 2, 500 + i)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryStore() if request.param == "memory" else SQLiteStore(
+        str(tmp_path / "history.db"), flush_interval=60)
+    yield store
+    store.close()
+
+
+def test_rollups_hold_min_avg_max_per_bucket(store):
+    fill(store, 0, 200)
+    store.flush()
+    fill(store, 200, 360)  # Unflushed readings are folded in on the fly
+
+    minutes = store.rollup("lobby", "1m")
+    assert len(minutes) == 120
+    assert all(row['count'] == 3 for row in minutes)
+    assert minutes[0]['temperature'] == 21.0
+    assert (minutes[0]['temperature_min'], minutes[0]['temperature_max']) == (20.0, 22.0)
+    assert [row['count'] for row in store.rollup("lobby", "15m")] == [45] * 8
+    (hour, second_hour) = store.rollup("lobby", "1h")
+    assert hour['count'] == second_hour['count'] == 180
+    assert (hour['co2_min'], hour['co2_max']) == (500, 679)
+    assert hour['co2'] == pytest.approx(589.5)
+
+
+def test_rollup_range_and_fields(store):
+    fill(store)
+    store.flush()
+    rows = store.rollup("lobby", "15m", start=BASE + 1000, end=BASE + 2700, fields=("co2",))
+    # Buckets overlapping [start, end]: 900-1800, 1800-2700 and the one starting at 2700
+    assert [to_epoch(row['timestamp']) - BASE for row in rows] == [900, 1800, 2700]
+    assert set(rows[0]) == {'timestamp', 'count', 'co2', 'co2_min', 'co2_max'}
+
+
+def test_raw_queries_and_counts(store):
+    fill(store, 0, 30)
+    store.flush()
+    fill(store, 30, 60)
+    assert store.count("lobby") == 60
+    rows = store.query("lobby", start=BASE + 100, end=BASE + 200)
+    assert [to_epoch(row['timestamp']) - BASE for row in rows] == [100, 120, 140, 160, 180, 200]
+    assert [to_epoch(row['timestamp']) - BASE for row in store.tail("lobby", 2)] == [1160, 1180]
@@ -0,0 +1,90 @@
+# transport.py
+# MQTT transport selection: AWS IoT Core (TLS + X.509) or a local plain-TCP broker
+
+import random
+import ssl
+import threading
+import paho.mqtt.client as mqtt
+from aws_config import *
+
+_ssl_context = None
+_ssl_lock = threading.Lock()
+
+
+def get_ssl_context():
+    """Build the AWS TLS context once and share it between clients"""
+    global _ssl_context
+    with _ssl_lock:
+        if _ssl_context is None:
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_REQUIRED
+
+            # Load certificates
+            context.load_verify_locations(ROOT_CA)
+            context.load_cert_chain(DEVICE_CERT, PRIVATE_KEY)
+            _ssl_context = context
+        return _ssl_context
+
+
+def uses_tls(transport=None):
+    return (transport or MQTT_TRANSPORT) == "aws"
+
+
+def broker_address(transport=None):
+    """(host, port) of the configured broker (or of the given transport)"""
+    transport = transport or MQTT_TRANSPORT
+    if transport == "aws":
+        return AWS_IOT_ENDPOINT, MQTT_PORT
+    if transport == "local":
+        return LOCAL_BROKER_HOST, LOCAL_BROKER_PORT
+    raise ValueError(f"Unknown MQTT transport: {transport}")
+
+
+def create_mqtt_client(client_id, transport=None, clean_session=True):
+    """Create a paho client configured for the selected transport
+
+    With ``clean_session=False`` the broker keeps the session (subscriptions
+    and QoS 1 messages for it) while the client is away.
+    """
+    client = mqtt.Client(
+        client_id=client_id,
+        clean_session=clean_session,
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2
+    )
+    if uses_tls(transport):
+        client.tls_set_context(get_ssl_context())
+    return client
+
+
+def backoff_delay(attempt, min_delay=MQTT_RECONNECT_MIN_DELAY, max_delay=MQTT_RECONNECT_MAX_DELAY):
+    """Exponential reconnect delay for the given attempt, with +/-50% jitter"""
+    return min(min_delay * 2 ** attempt, max_delay) * random.uniform(0.5, 1.5)
+
+
+class ReconnectBackoff:
+    """Jittered exponential backoff for a paho client's automatic reconnect
+
+    With ``connect_async`` + ``loop_start`` paho's network thread notices a
+    lost connection itself and reconnects straight after ``on_disconnect``
+    (or a failed attempt), reusing the client and its TLS context. Call
+    ``failed()`` from those callbacks to pick the wait before the next
+    attempt, and ``reset()`` once connected. The jitter keeps clients
+    dropped by the same broker blip from reconnecting in lockstep.
+    """
+
+    def __init__(self, client, min_delay=MQTT_RECONNECT_MIN_DELAY, max_delay=MQTT_RECONNECT_MAX_DELAY):
+        self.client = client
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.attempt = 0
+
+    def failed(self):
+        """Schedule the next attempt; returns its delay in seconds"""
+        delay = backoff_delay(self.attempt, self.min_delay, self.max_delay)
+        self.attempt += 1
+        self.client.reconnect_delay_set(delay, delay)
+        return delay
+
+    def reset(self):
+        self.attempt = 0
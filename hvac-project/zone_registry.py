@@ -0,0 +1,104 @@
+# zone_registry.py
+# Registry of known building zones, populated automatically from incoming messages
+
+import re
+import threading
+import time
+
+FLOOR_PATTERN = re.compile(r"floor_(\d+)")
+
+
+class ZoneInfo:
+    """Metadata for one zone"""
+
+    __slots__ = ('zone_id', 'device_id', 'building_id', 'floor',
+                 'first_seen', 'last_seen', 'message_count')
+
+    def __init__(self, zone_id):
+        self.zone_id = zone_id
+        self.device_id = None
+        self.building_id = None
+        match = FLOOR_PATTERN.search(zone_id)
+        self.floor = int(match.group(1)) if match else None
+        self.first_seen = None
+        self.last_seen = None
+        self.message_count = 0
+
+    def to_dict(self):
+        return {
+            'zone_id': self.zone_id,
+            'device_id': self.device_id,
+            'building_id': self.building_id,
+            'floor': self.floor,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'message_count': self.message_count
+        }
+
+
+class ZoneRegistry:
+    """O(1) zone lookup; new zones register themselves on their first message"""
+
+    def __init__(self, zone_ids=()):
+        self.lock = threading.Lock()
+        self.zones = {}
+        for zone_id in zone_ids:
+            self.zones[zone_id] = ZoneInfo(zone_id)
+
+    def add(self, zone_id):
+        """Register a zone without a message (e.g. restored from history)"""
+        with self.lock:
+            if zone_id not in self.zones:
+                self.zones[zone_id] = ZoneInfo(zone_id)
+
+    def restore(self, entry):
+        """Register a zone with the metadata of ``ZoneInfo.to_dict`` (e.g. from a checkpoint)"""
+        with self.lock:
+            info = self.zones.get(entry['zone_id'])
+            if info is None:
+                info = self.zones[entry['zone_id']] = ZoneInfo(entry['zone_id'])
+            for key in ZoneInfo.__slots__[1:]:
+                if entry.get(key) is not None:
+                    setattr(info, key, entry[key])
+
+    def observe(self, zone_id, data):
+        """Record a message from a zone; returns True if the zone is new"""
+        now = time.time()
+        with self.lock:
+            info = self.zones.get(zone_id)
+            is_new = info is None
+            if is_new:
+                info = self.zones[zone_id] = ZoneInfo(zone_id)
+            if info.first_seen is None:
+                info.first_seen = now
+            info.last_seen = now
+            info.message_count += 1
+
+            # Metadata carried in the reading itself
+            device_id = data.get('device_id')
+            if device_id:
+                info.device_id = device_id
+            building_id = data.get('building_id')
+            if building_id:
+                info.building_id = building_id
+            if data.get('floor') is not None:
+                info.floor = data['floor']
+        return is_new
+
+    def get(self, zone_id):
+        with self.lock:
+            return self.zones.get(zone_id)
+
+    def ids(self):
+        with self.lock:
+            return list(self.zones)
+
+    def to_list(self):
+        with self.lock:
+            return [info.to_dict() for info in self.zones.values()]
+
+    def __contains__(self, zone_id):
+        return zone_id in self.zones
+
+    def __len__(self):
+        return len(self.zones)